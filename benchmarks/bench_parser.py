@@ -0,0 +1,76 @@
+"""
+Peak memory and time of the tree and the streaming mechanism parsers on synthetic xml files
+
+Usage: python benchmarks/bench_parser.py
+"""
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from chemkin.parser import DataParser
+
+from bench_stoichiometry import NoThermo
+
+REACTION = """    <reaction reversible="no" type="Elementary" id="r{j}">
+      <equation>{a} + {b} [=] {c} + {d}</equation>
+      <rateCoeff>
+        <Arrhenius>
+          <A>{A:.6e}</A>
+          <E>{E:.6e}</E>
+        </Arrhenius>
+      </rateCoeff>
+      <reactants>{a}:1 {b}:1</reactants>
+      <products>{c}:1 {d}:1</products>
+    </reaction>
+"""
+
+
+def write_mechanism(filename, num_species, num_reactions, seed=0):
+    """
+    Write a mechanism of 2 reactants -> 2 products reactions between random species
+    """
+    rng = np.random.RandomState(seed)
+    species = ['S{}'.format(i) for i in range(num_species)]
+    with open(filename, 'w') as f:
+        f.write('<?xml version="1.0"?>\n<ctml>\n  <phase>\n    <speciesArray> {} </speciesArray>\n  </phase>\n'
+                .format(' '.join(species)))
+        f.write('  <reactionData id="synthetic">\n')
+        for j in range(num_reactions):
+            a, b, c, d = (species[i] for i in rng.choice(num_species, 4, replace=False))
+            f.write(REACTION.format(j=j, a=a, b=b, c=c, d=d, A=rng.uniform(1e5, 1e8), E=rng.uniform(1e3, 1e5)))
+        f.write('  </reactionData>\n</ctml>\n')
+
+
+def measure(parse):
+    tracemalloc.start()
+    start = time.time()
+    rd = parse()
+    seconds = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return rd, seconds, peak
+
+
+def run(num_species, num_reactions, folder):
+    filename = os.path.join(folder, 'mechanism_{}.xml'.format(num_reactions))
+    write_mechanism(filename, num_species, num_reactions)
+    print("{} species, {} reactions ({:.1f} MB of xml)".format(
+        num_species, num_reactions, os.path.getsize(filename) / 1e6))
+    for streaming in (False, True):
+        rd, seconds, peak = measure(lambda: DataParser().parse_file(filename, NoThermo(), stoichiometry='sparse',
+                                                                    streaming=streaming))
+        print("  {:9s} peak memory {:10.3f} MB   time {:9.3f} s".format(
+            'streaming' if streaming else 'tree', peak / 1e6, seconds))
+
+
+if __name__ == '__main__':
+    folder = tempfile.mkdtemp()
+    try:
+        for sizes in ((50, 2000), (500, 20000), (2000, 100000)):
+            run(*sizes, folder=folder)
+    finally:
+        shutil.rmtree(folder)
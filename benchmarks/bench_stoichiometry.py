@@ -0,0 +1,54 @@
+"""
+Memory and speed of the dense and sparse stoichiometry formats on synthetic mechanisms
+
+Usage: python benchmarks/bench_stoichiometry.py
+"""
+import timeit
+
+import numpy as np
+
+from chemkin.rate_coeff import Arrhenius
+from chemkin.reaction import Reaction, ReactionData
+
+
+class NoThermo:
+    """
+    Thermo source without any species; the synthetic mechanisms are irreversible
+    """
+
+    def get_coeffs(self, species_name, temp_range):
+        raise KeyError(species_name)
+
+
+def synthetic_mechanism(num_species, num_reactions, stoichiometry, seed=0):
+    """
+    Mechanism of 2 reactants -> 2 products reactions between random species
+    """
+    rng = np.random.RandomState(seed)
+    species = ['S{}'.format(i) for i in range(num_species)]
+    reactions = []
+    for j in range(num_reactions):
+        picked = rng.choice(num_species, 4, replace=False)
+        reactions.append(Reaction('r{}'.format(j), False, 'Elementary',
+                                  {species[picked[0]]: 1, species[picked[1]]: 1},
+                                  {species[picked[2]]: 1, species[picked[3]]: 1},
+                                  Arrhenius(rng.uniform(1e5, 1e8), rng.uniform(1e3, 1e5)), ''))
+    return ReactionData('synthetic', species, reactions, NoThermo(), stoichiometry=stoichiometry)
+
+
+def run(num_species, num_reactions, batch=100, repeat=5):
+    concs = np.random.RandomState(1).uniform(0, 1, (batch, num_species))
+    print("{} species, {} reactions".format(num_species, num_reactions))
+    for stoichiometry in ('dense', 'sparse'):
+        rd = synthetic_mechanism(num_species, num_reactions, stoichiometry)
+        single = min(timeit.repeat(lambda: rd.get_reaction_rate(rd.get_progress_rate(concs[0], 1500.0)),
+                                   number=1, repeat=repeat))
+        batched = min(timeit.repeat(lambda: rd.get_reaction_rate(rd.get_progress_rate_batch(concs, 1500.0)),
+                                    number=1, repeat=repeat))
+        print("  {:6s} memory {:10.3f} MB   single state {:9.3f} ms   {} states {:9.3f} ms".format(
+            stoichiometry, rd.stoichiometry.nbytes / 1e6, single * 1e3, batch, batched * 1e3))
+
+
+if __name__ == '__main__':
+    for sizes in ((50, 200), (500, 2000), (2000, 10000)):
+        run(*sizes, batch=10 if sizes[0] > 1000 else 100)
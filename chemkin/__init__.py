@@ -4,3 +4,4 @@ import chemkin.reaction
 import chemkin.webserver
 import chemkin.time_evo
 import chemkin.plot
+import chemkin.reactor
@@ -0,0 +1,478 @@
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def private_directory(path):
+    """
+    Create a directory accessible only by the current user, or check that an existing one is
+
+    Caches of pickled objects must live in such a directory: whoever can write to it can make this
+    process run arbitrary code when an entry is loaded.
+
+    Parameters
+    ----------
+    path: str
+        path of the directory
+
+    Returns
+    -------
+    str
+        path
+
+    Raises
+    ------
+    PermissionError
+        if the directory is a symbolic link, is owned by another user, or is accessible by other users
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    stat = os.lstat(path)
+    if os.path.islink(path):
+        raise PermissionError("Cache directory {} must not be a symbolic link".format(path))
+    if hasattr(os, 'getuid') and (stat.st_uid != os.getuid() or stat.st_mode & 0o077):
+        raise PermissionError("Cache directory {} must be owned by the current user and private (mode 0700)".format(
+            path))
+    return path
+
+
+class LRUCache:
+    """
+    Thread-safe, bounded least recently used cache with hit and miss counters
+
+    Attributes
+    ----------
+    maxsize: int
+        maximum number of entries
+    hits, misses: int
+        number of successful and failed lookups
+
+    Examples
+    --------
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.put('a', 1)
+    >>> cache.put('b', 2)
+    >>> cache.get('a')
+    1
+    >>> cache.put('c', 3)
+    >>> cache.get('b') is None
+    True
+    >>> cache.stats()['hits'], cache.stats()['misses']
+    (1, 1)
+    """
+
+    def __init__(self, maxsize=128):
+        """
+        Create an empty cache
+
+        Parameters
+        ----------
+        maxsize: int
+            maximum number of entries, must be positive
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the value of key and marks it as recently used, or default if it is not cached
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries beyond maxsize
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drop all entries; the counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            hits, misses, hit_rate, size and maxsize of the cache
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'size': len(self._entries), 'maxsize': self.maxsize}
+
+    def __getstate__(self):
+        with self._lock:
+            state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+def content_key(*parts):
+    """
+    Returns the SHA-256 hex digest of a sequence of values, e.g. the content hash of a mechanism and
+    the inputs of a computation on it
+
+    Parameters
+    ----------
+    parts: bytes, str, np.ndarray or any value with an exact repr (numbers, tuples, None)
+
+    Examples
+    --------
+    >>> content_key('plot', np.array([1.0, 2.0]), 1500.0) == content_key('plot', [1.0, 2.0], 1500.0)
+    False
+    >>> content_key('plot', np.array([1.0, 2.0])) == content_key('plot', np.array([1.0, 2.0]))
+    True
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            header = "ndarray:{}:{}".format(part.dtype.str, part.shape).encode()
+            data = part.tobytes()
+        elif isinstance(part, bytes):
+            header, data = b"bytes", part
+        elif isinstance(part, str):
+            header, data = b"str", part.encode()
+        else:
+            header, data = b"repr", repr(part).encode()
+        # length prefixes keep the boundaries between parts unambiguous
+        digest.update(struct.pack("<QQ", len(header), len(data)))
+        digest.update(header)
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """
+    Two-tier least recently used cache of results keyed by content hashes (see `content_key`)
+
+    Values must be JSON serializable (tuples are read back from disk as lists). They are kept in
+    memory up to max_bytes and, with a directory, written to disk as JSON up to disk_max_bytes, so
+    that they outlive the process and are shared by all processes using the same directory. The size
+    of a value is the length of its JSON encoding. Values found on disk are moved back into memory.
+
+    The files of the disk tier, their sizes and their order of use are recorded in a SQLite index
+    (DISK_INDEX) in the directory. All processes update it in transactions, so the disk limit holds
+    for the directory as a whole and no put or stats call has to list the directory.
+
+    Attributes
+    ----------
+    max_bytes: int
+        maximum total size of the values in memory
+    directory: str
+        directory of the disk tier, or None
+    disk_max_bytes: int
+        maximum total size of the files of the disk tier
+    memory_hits, disk_hits, misses: int
+        number of lookups served from memory, from disk, and not served
+
+    Examples
+    --------
+    >>> cache = ContentCache(max_bytes=1000)
+    >>> key = content_key('square', 3)
+    >>> cache.get_or_compute(key, lambda: 3 ** 2)
+    9
+    >>> cache.get_or_compute(key, lambda: 3 ** 2)
+    9
+    >>> cache.stats()['memory_hits'], cache.stats()['misses']
+    (1, 1)
+    """
+
+    DISK_INDEX = "index.sqlite"
+
+    def __init__(self, max_bytes=64 * 2 ** 20, directory=None, disk_max_bytes=1024 * 2 ** 20):
+        """
+        Create an empty cache
+
+        Parameters
+        ----------
+        max_bytes: int
+            maximum total size of the values in memory (optional; default 64 MB)
+        directory: str
+            directory of the disk tier, created private to the current user if needed, see
+            `private_directory` (optional; default memory only)
+        disk_max_bytes: int
+            maximum total size of the files of the disk tier (optional; default 1 GB)
+        """
+        self.max_bytes = max_bytes
+        self.directory = None if directory is None else private_directory(directory)
+        self.disk_max_bytes = disk_max_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.nbytes = 0
+        # key -> (value, size), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self._create_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    @contextlib.contextmanager
+    def _index(self):
+        """
+        Returns a cursor on the disk index inside a write transaction, committed on exit
+        """
+        db = sqlite3.connect(os.path.join(self.directory, self.DISK_INDEX), timeout=30, isolation_level=None)
+        try:
+            cursor = db.cursor()
+            # take the write lock up front, other processes wait for the whole read-modify-write
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            cursor.close()
+        finally:
+            db.close()
+
+    def _create_index(self):
+        """
+        Create the disk index, recording the files already in the directory if it is new
+        """
+        with self._index() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS files (key TEXT PRIMARY KEY, size INTEGER, used INTEGER)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS files_used ON files (used)")
+            # a single row with the number and total size of the files and the counter ordering their use
+            cursor.execute("CREATE TABLE IF NOT EXISTS totals (files INTEGER, nbytes INTEGER, clock INTEGER)")
+            if cursor.execute("SELECT COUNT(*) FROM totals").fetchone()[0] == 0:
+                cursor.execute("INSERT INTO totals VALUES (0, 0, 0)")
+                for (_, size, path) in sorted(self._disk_files()):
+                    self._record(cursor, os.path.basename(path)[:-len(".json")], size)
+
+    @staticmethod
+    def _record(cursor, key, size):
+        """
+        Record a file of the disk tier as most recently used
+        """
+        cursor.execute("UPDATE totals SET clock = clock + 1")
+        row = cursor.execute("SELECT size FROM files WHERE key = ?", (key,)).fetchone()
+        cursor.execute("INSERT OR REPLACE INTO files VALUES (?, ?, (SELECT clock FROM totals))", (key, size))
+        if row is None:
+            cursor.execute("UPDATE totals SET files = files + 1, nbytes = nbytes + ?", (size,))
+        else:
+            cursor.execute("UPDATE totals SET nbytes = nbytes + ?", (size - row[0],))
+
+    @staticmethod
+    def _forget(cursor, key):
+        """
+        Remove a file of the disk tier from the index
+        """
+        row = cursor.execute("SELECT size FROM files WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            cursor.execute("DELETE FROM files WHERE key = ?", (key,))
+            cursor.execute("UPDATE totals SET files = files - 1, nbytes = nbytes - ?", (row[0],))
+
+    def _update_index(self, update, *args):
+        """
+        Apply update(cursor, *args) to the disk index, ignoring a missing or locked index
+        """
+        try:
+            with self._index() as cursor:
+                update(cursor, *args)
+        except (OSError, sqlite3.Error):
+            pass
+
+    def get(self, key, default=None):
+        """
+        Returns the value of key from memory or disk and marks it as recently used, or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+        if self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                value = json.loads(data.decode('utf8'))
+            except FileNotFoundError:
+                # evicted, possibly by another process after this one indexed the file
+                self._update_index(self._forget, key)
+            except Exception:
+                # corrupt file
+                pass
+            else:
+                self._update_index(self._record, key, len(data))
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, value, len(data))
+                return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """
+        Store a value in memory and on disk, evicting the least recently used values beyond the limits
+        """
+        data = json.dumps(value, separators=(',', ':')).encode('utf8')
+        with self._lock:
+            self._store(key, value, len(data))
+        if self.directory is not None and len(data) <= self.disk_max_bytes:
+            try:
+                path = self._path(key)
+                temp = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+                with open(temp, "wb") as f:
+                    f.write(data)
+                os.replace(temp, path)
+                with self._index() as cursor:
+                    self._record(cursor, key, len(data))
+                    evicted = self._evict_disk(cursor)
+            except (OSError, sqlite3.Error):
+                return
+            for evicted_key in evicted:
+                try:
+                    os.remove(self._path(evicted_key))
+                except OSError:
+                    # removed by another process
+                    pass
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the value of key, computing and storing it with compute() on a miss
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _store(self, key, value, size):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def _disk_files(self):
+        """
+        Returns [(modification time, size, path)] of the files of the disk tier
+        """
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict_disk(self, cursor):
+        """
+        Remove the least recently used files beyond disk_max_bytes from the index
+
+        Returns
+        -------
+        list
+            keys of the files to remove once the transaction is committed
+        """
+        evicted = []
+        while cursor.execute("SELECT nbytes FROM totals").fetchone()[0] > self.disk_max_bytes:
+            key = cursor.execute("SELECT key FROM files ORDER BY used LIMIT 1").fetchone()[0]
+            self._forget(cursor, key)
+            evicted.append(key)
+        return evicted
+
+    def clear(self):
+        """
+        Drop all values from memory and disk; the counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+        if self.directory is not None and os.path.isdir(self.directory):
+            with self._index() as cursor:
+                cursor.execute("DELETE FROM files")
+                cursor.execute("UPDATE totals SET files = 0, nbytes = 0")
+            for (_, _, path) in self._disk_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            memory_hits, disk_hits, misses, hit_rate, size and nbytes (memory tier),
+            disk_files and disk_nbytes (disk tier, all processes sharing the directory) of the cache
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            result = {'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                      'hit_rate': hits / lookups if lookups else 0.0, 'size': len(self._entries),
+                      'nbytes': self.nbytes, 'max_bytes': self.max_bytes, 'disk_files': 0, 'disk_nbytes': 0}
+        if self.directory is not None and os.path.isdir(self.directory):
+            with self._index() as cursor:
+                result['disk_files'], result['disk_nbytes'] = cursor.execute(
+                    "SELECT files, nbytes FROM totals").fetchone()
+        return result
+
+    def __getstate__(self):
+        with self._lock:
+            state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
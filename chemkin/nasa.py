@@ -1,8 +1,66 @@
+import hashlib
 import os
 import sqlite3
+import threading
+import time
+
+import numpy as np
 
 from . import nasa as n
 
+TEMP_RANGES = ('low', 'high')
+
+# process-wide cache of the coefficient tables, shared by every NASACoeffs of the same database file:
+# absolute path -> (file version, {'low': {species: (coeffs, Tmin, Tmax)}, 'high': {...}})
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _file_version(database_file):
+    """
+    Returns (modification time, size) of the database file, or None if it does not exist
+    """
+    try:
+        stat = os.stat(database_file)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_tables(database_file):
+    """
+    Read the low and high temperature range tables of a database, one query per table
+
+    Returns
+    -------
+    dict
+        'low' and 'high' to {species name: (coefficients, Tmin, Tmax)}
+    """
+    db = sqlite3.connect(database_file)
+    try:
+        cursor = db.cursor()
+        tables = {}
+        for temp_range in TEMP_RANGES:
+            query = '''SELECT SPECIES_NAME,COEFF_1,COEFF_2,COEFF_3,COEFF_4,COEFF_5,COEFF_6,COEFF_7,TLOW,THIGH
+                       FROM {}'''.format(temp_range.upper())
+            tables[temp_range] = {row[0]: (tuple(float(c) for c in row[1:8]), float(row[8]), float(row[9]))
+                                  for row in cursor.execute(query).fetchall()}
+        cursor.close()
+    finally:
+        db.close()
+    return tables
+
+
+def clear_cache(database_file=None):
+    """
+    Drop the cached coefficients of a database file, or of all database files if None
+    """
+    with _cache_lock:
+        if database_file is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(database_file), None)
+
 
 class NASACoeffs:
     def __init__(self, database_file=None):
@@ -20,77 +78,161 @@ class NASACoeffs:
         else:
             self.database_file = database_file
 
-    def create_db(self, filename):
+    def create_db(self, filename, update=False, batch_size=1000):
         """
-        Parse the given reaction xml file and write to the sql database
-            
+        Parse the given thermo xml file and write to the sql database
+
+        The file is parsed incrementally and rows are inserted in batches, so that large thermo
+        libraries are imported in constant memory. The whole import is a single transaction: if the
+        file can not be parsed or lists a species twice, the database is left unchanged.
+
         Parameters
         ----------
         filename: str
                 the path of the xml file to be read from
+        update: bool
+                insert new species and replace existing ones instead of recreating the tables
+                (optional; default False)
+        batch_size: int
+                number of species inserted per statement (optional; default 1000)
+
+        Returns
+        -------
+        dict
+            import statistics: species, rows, seconds and rows_per_second
         """
-        db = sqlite3.connect(self.database_file)
-        # create a cursor object
-        cursor = db.cursor()
-        cursor.execute("DROP TABLE IF EXISTS high")
-        cursor.execute("DROP TABLE IF EXISTS low")
-        cursor.execute("DROP TABLE IF EXISTS all_temps")
-        cursor.execute('''CREATE TABLE high (
-                       SPECIES_NAME TEXT PRIMARY KEY NOT NULL, 
-                       TLOW REAL, 
-                       THIGH REAL, 
-                       `COEFF_1` REAL,
-                       `COEFF_2` REAL,
-                       `COEFF_3` REAL,
-                       `COEFF_4` REAL,
-                       `COEFF_5` REAL,
-                       `COEFF_6` REAL,
-                       `COEFF_7` REAL)''')
-        cursor.execute('''CREATE TABLE low (
-                       SPECIES_NAME TEXT PRIMARY KEY NOT NULL, 
-                       TLOW REAL, 
-                       THIGH REAL, 
-                       `COEFF_1` REAL,
-                       `COEFF_2` REAL,
-                       `COEFF_3` REAL,
-                       `COEFF_4` REAL,
-                       `COEFF_5` REAL,
-                       `COEFF_6` REAL,
-                       `COEFF_7` REAL)''')
+        start = time.time()
+        # manage the transaction explicitly, so that dropping and creating the tables is part of it
+        db = sqlite3.connect(self.database_file, isolation_level=None)
+        try:
+            cursor = db.cursor()
+            cursor.execute("BEGIN")
+            try:
+                num_species = self._load(cursor, filename, update, batch_size)
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+            cursor.close()
+        finally:
+            db.close()
+            clear_cache(self.database_file)
+        seconds = time.time() - start
+        return {'species': num_species, 'rows': 2 * num_species, 'seconds': seconds,
+                'rows_per_second': 2 * num_species / seconds if seconds > 0 else float('inf')}
+
+    def _load(self, cursor, filename, update, batch_size):
+        """
+        Write the species of a thermo xml file inside the open transaction of cursor, see `create_db`
+
+        Returns
+        -------
+        int
+            number of species written
+        """
+        if not update:
+            cursor.execute("DROP TABLE IF EXISTS high")
+            cursor.execute("DROP TABLE IF EXISTS low")
+            cursor.execute("DROP TABLE IF EXISTS all_temps")
+        for table in TEMP_RANGES:
+            cursor.execute('''CREATE TABLE IF NOT EXISTS {} (
+                           SPECIES_NAME TEXT NOT NULL,
+                           TLOW REAL,
+                           THIGH REAL,
+                           `COEFF_1` REAL,
+                           `COEFF_2` REAL,
+                           `COEFF_3` REAL,
+                           `COEFF_4` REAL,
+                           `COEFF_5` REAL,
+                           `COEFF_6` REAL,
+                           `COEFF_7` REAL)'''.format(table))
+            if update:
+                # replacing rows needs the unique index up front
+                self._create_index(cursor, table)
+
+        insert = "INSERT OR REPLACE" if update else "INSERT"
+        rows = {'low': [], 'high': []}
+        names = set()
+
+        def flush():
+            for table in TEMP_RANGES:
+                cursor.executemany('''{} INTO {}
+                                   (SPECIES_NAME, TLOW, THIGH, COEFF_1, COEFF_2, COEFF_3, COEFF_4, COEFF_5,
+                                   COEFF_6, COEFF_7)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''.format(insert, table), rows[table])
+                del rows[table][:]
+
         import xml.etree.ElementTree as et
-        with open(filename) as f:
-            root = et.fromstring(f.read())
-        speciesData = root.find("speciesData")
-        high_data = []
-        low_data = []
-        for species in speciesData.findall("species"):
-            sname = species.attrib['name']
-            NASAs = species.find('thermo').findall('NASA')
+        path = []
+        for event, elem in et.iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                path.append(elem)
+                continue
+            path.pop()
+            if elem.tag != 'species' or not path or path[-1].tag != 'speciesData':
+                continue
+            sname = elem.attrib['name']
+            if sname in names:
+                raise ValueError("Species {} is defined more than once in {}".format(sname, filename))
+            names.add(sname)
+            NASAs = elem.find('thermo').findall('NASA')
             assert (len(NASAs) == 2)
-            max0 = NASAs[0].attrib['Tmax']
-            max1 = NASAs[1].attrib['Tmax']
-            if max0 > max1:
-                high = NASAs[0]
-                low = NASAs[1]
-            else:
-                high = NASAs[1]
-                low = NASAs[0]
-            get_data = lambda d: tuple(
-                [sname, d.attrib['Tmin'], d.attrib['Tmax']] + [
-                    float(e.strip()) for e in d.find('floatArray').text.split(',')])
-            high_data.append(get_data(high))
-            low_data.append(get_data(low))
-
-        cursor.executemany('''INSERT INTO high 
-                          (SPECIES_NAME, TLOW, THIGH, COEFF_1, COEFF_2, COEFF_3, COEFF_4, COEFF_5, COEFF_6, COEFF_7)
-                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', high_data)
-        cursor.executemany('''INSERT INTO low 
-                          (SPECIES_NAME, TLOW, THIGH, COEFF_1, COEFF_2, COEFF_3, COEFF_4, COEFF_5, COEFF_6, COEFF_7)
-                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', low_data)
-        db.commit()
-        cursor.execute('''SELECT * FROM high''').fetchall()
-        cursor.close()
-        db.close()
+            low, high = sorted(NASAs, key=lambda d: float(d.attrib['Tmax']))
+            for table, d in (('low', low), ('high', high)):
+                rows[table].append(tuple(
+                    [sname, float(d.attrib['Tmin']), float(d.attrib['Tmax'])] + [
+                        float(e.strip()) for e in d.find('floatArray').text.split(',')]))
+            # drop the parsed species from the tree
+            path[-1].clear()
+            if len(rows['low']) >= batch_size:
+                flush()
+        flush()
+
+        for table in TEMP_RANGES:
+            self._create_index(cursor, table)
+        return len(names)
+
+    @staticmethod
+    def _create_index(cursor, table):
+        """
+        Create the unique species name index of a coefficient table
+        """
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS {0}_species ON {0} (SPECIES_NAME)".format(table))
+
+    def get_tables(self):
+        """
+        Coefficient tables of the database, bulk loaded on first use and shared by all instances
+        using the same database file. They are reloaded when the file is modified.
+
+        Returns
+        -------
+        dict
+            'low' and 'high' to {species name: (coefficients, Tmin, Tmax)}; must not be modified
+        """
+        key = os.path.abspath(self.database_file)
+        version = _file_version(key)
+        entry = _cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            tables = _load_tables(key)
+            if version is not None:
+                _cache[key] = (version, tables)
+        return tables
+
+    def version(self):
+        """
+        Identifier of the database content, changing whenever the file is modified
+
+        Returns
+        -------
+        str
+            path, modification time and size of the database file
+        """
+        return "{}:{}".format(os.path.abspath(self.database_file), _file_version(self.database_file))
 
     def get_coeffs(self, species_name, temp_range):
         """
@@ -110,22 +252,185 @@ class NASACoeffs:
             coefficients is a numpy array of the coefficients
             Tmin/Tmax is the min/temperature of given range
         """
-        db = sqlite3.connect(self.database_file)
-        cursor = db.cursor()
-        # get the coeffs based on temp range
-        if temp_range == 'low':
-            query = '''SELECT COEFF_1,COEFF_2,COEFF_3,COEFF_4,COEFF_5,COEFF_6,COEFF_7,TLOW,THIGH FROM LOW WHERE SPECIES_NAME = ? '''
-        elif temp_range == 'high':
-            query = '''SELECT COEFF_1,COEFF_2,COEFF_3,COEFF_4,COEFF_5,COEFF_6,COEFF_7,TLOW,THIGH FROM HIGH WHERE SPECIES_NAME = ? '''
-        else:  # make sure temp range is correctly inputed
+        # make sure temp range is correctly inputed
+        if temp_range not in TEMP_RANGES:
             raise ValueError("Must input 'low' or 'high' for temp_range")
-        results = cursor.execute(query, (species_name,)).fetchall()
-        if len(results) != 1:
+        result = self.get_tables()[temp_range].get(species_name)
+        if result is None:
             raise KeyError("NASA coefficients for {} is not defined".format(species_name))
-        result = [float(i) for i in results[0]]
-        coeffs = result[:7]
-        tmin = result[7]
-        tmax = result[8]
-        cursor.close()
-        db.close()
-        return coeffs, tmin, tmax
+        coeffs, tmin, tmax = result
+        return list(coeffs), tmin, tmax
+
+
+class NASATable:
+    """
+    NASA coefficients of many species stored as arrays
+
+    The table can be saved to a single .npy file of a structured dtype and loaded back memory-mapped,
+    so that many processes share one read-only copy without parsing anything at startup.
+
+    Attributes
+    ----------
+    species: List[str]
+        names of the species
+    index: dict
+        species name to row index
+    coeffs: np.ndarray
+        size: num_species X 2 X 7
+        low (index 0) and high (index 1) temperature range coefficients
+    tmin, tmid, tmax: np.ndarray
+        size: num_species
+        bounds of the low ([Tmin, Tmid]) and high ([Tmid, Tmax]) temperature ranges
+
+    Examples
+    --------
+    >>> table = NASATable.from_nasa(NASACoeffs(), ['H', 'O2'])
+    >>> table.coeffs.shape
+    (2, 2, 7)
+    >>> table.get_coeffs('O2', 'low')[1:]
+    (200.0, 1000.0)
+    """
+
+    def __init__(self, species, coeffs, tmin, tmid, tmax):
+        """
+        Create a new NASATable
+
+        Parameters
+        ----------
+        species: List[str]
+            names of the species
+        coeffs: array-like
+            size: num_species X 2 X 7, low and high temperature range coefficients
+        tmin, tmid, tmax: array-like
+            size: num_species, bounds of the temperature ranges
+        """
+        self.species = list(species)
+        self.index = {s: i for (i, s) in enumerate(self.species)}
+        self.coeffs = np.asarray(coeffs, dtype=float)
+        self.tmin = np.asarray(tmin, dtype=float)
+        self.tmid = np.asarray(tmid, dtype=float)
+        self.tmax = np.asarray(tmax, dtype=float)
+        if self.coeffs.shape != (len(self.species), 2, 7):
+            raise ValueError("coeffs must be an array of size {} X 2 X 7".format(len(self.species)))
+
+    @classmethod
+    def from_nasa(cls, nasa, species=None):
+        """
+        Build a table from a coefficient source with a `get_coeffs` method
+
+        Parameters
+        ----------
+        nasa: NASACoeffs
+            source of the coefficients
+        species: List[str]
+            species to include; every species of the database (NASACoeffs only) if None
+
+        Returns
+        -------
+        NASATable
+        """
+        if species is None:
+            tables = nasa.get_tables()
+            species = sorted(set(tables['low']) & set(tables['high']))
+        coeffs = np.zeros((len(species), 2, 7))
+        tmin, tmid, tmax = (np.zeros(len(species)) for _ in range(3))
+        for (i, s) in enumerate(species):
+            coeffs[i, 0], tmin[i], tmid[i] = nasa.get_coeffs(s, 'low')
+            coeffs[i, 1], _, tmax[i] = nasa.get_coeffs(s, 'high')
+        return cls(species, coeffs, tmin, tmid, tmax)
+
+    def _dtype(self):
+        length = max([len(s) for s in self.species] + [1])
+        return np.dtype([('name', 'U{}'.format(length)), ('coeffs', float, (2, 7)),
+                         ('tmin', float), ('tmid', float), ('tmax', float)])
+
+    def save(self, file):
+        """
+        Write the table to a .npy file
+
+        Parameters
+        ----------
+        file: str
+            path of the file
+        """
+        records = np.empty(len(self.species), dtype=self._dtype())
+        records['name'] = self.species
+        records['coeffs'] = self.coeffs
+        records['tmin'] = self.tmin
+        records['tmid'] = self.tmid
+        records['tmax'] = self.tmax
+        np.save(file, records)
+
+    @classmethod
+    def load(cls, file, mmap=True):
+        """
+        Load a table written by `save`
+
+        Parameters
+        ----------
+        file: str
+            path of the .npy file
+        mmap: bool
+            map the file read-only into memory instead of reading it (optional; default True)
+
+        Returns
+        -------
+        NASATable
+            the coefficient arrays are views of the (mapped) file
+        """
+        records = np.load(file, mmap_mode='r' if mmap else None)
+        return cls(records['name'], records['coeffs'], records['tmin'], records['tmid'], records['tmax'])
+
+    def version(self):
+        """
+        Identifier of the table content
+
+        Returns
+        -------
+        str
+            SHA-1 digest of the species names and coefficient arrays
+        """
+        digest = hashlib.sha1("\n".join(self.species).encode())
+        for values in (self.coeffs, self.tmin, self.tmid, self.tmax):
+            digest.update(np.ascontiguousarray(values).tobytes())
+        return digest.hexdigest()
+
+    def get_coeffs(self, species_name, temp_range):
+        """
+        Get the nasa coefficients for given species at specified temperature range (low or high),
+        see `NASACoeffs.get_coeffs`
+        """
+        if temp_range not in TEMP_RANGES:
+            raise ValueError("Must input 'low' or 'high' for temp_range")
+        i = self.index.get(species_name)
+        if i is None:
+            raise KeyError("NASA coefficients for {} is not defined".format(species_name))
+        if temp_range == 'low':
+            return list(self.coeffs[i, 0]), float(self.tmin[i]), float(self.tmid[i])
+        return list(self.coeffs[i, 1]), float(self.tmid[i]), float(self.tmax[i])
+
+    def lookup(self, species):
+        """
+        Gather the coefficients of many species at once
+
+        Parameters
+        ----------
+        species: List[str]
+            names of the species
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+            coefficients (num_species X 2 X 7, zero for unknown species) and Tmin, Tmid, Tmax
+            (num_species, NaN for unknown species)
+        """
+        rows = np.array([self.index.get(s, -1) for s in species], dtype=int)
+        known = rows >= 0
+        coeffs = np.zeros((len(species), 2, 7))
+        coeffs[known] = self.coeffs[rows[known]]
+        bounds = []
+        for values in (self.tmin, self.tmid, self.tmax):
+            column = np.full(len(species), np.nan)
+            column[known] = values[rows[known]]
+            bounds.append(column)
+        return (coeffs,) + tuple(bounds)
@@ -1,15 +1,55 @@
 from chemkin.reaction import *
 from chemkin.rate_coeff import *
+from chemkin.cache import private_directory
+import array
+import hashlib
+import os
+import pickle
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+# bump when the pickled layout of ReactionData changes, so that old cache entries are not used
+CACHE_FORMAT = 3
+
+
+def _parse_job(parser, filename, nasa, stoichiometry, streaming):
+    """
+    Parse one file of `DataParser.parse_files` in a worker process
+
+    Returns
+    -------
+    (ReactionData, Exception)
+        the parsed mechanism and None, or None and the error raised while parsing it
+    """
+    try:
+        return parser.parse_file(filename, nasa, stoichiometry=stoichiometry, streaming=streaming), None
+    except Exception as err:
+        return None, err
 
 
 class DataParser:
     """
     XML parser for reaction data xml files.
+
+    Attributes
+    ----------
+    cache_dir: str
+        directory of the parsed-mechanism cache, or None to always parse
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, cache_dir=None):
+        """
+        Create a new parser
+
+        Parameters
+        ----------
+        cache_dir: str
+            directory in which parsed and compiled mechanisms are cached, keyed by the SHA-256 of the
+            xml file, the NASA coefficient version and the stoichiometry format (optional; no cache).
+            Entries are pickles, so the directory is created private to the current user; an existing
+            directory that other users can access is refused with PermissionError.
+        """
+        self.cache_dir = None if cache_dir is None else private_directory(cache_dir)
 
     def _parse_rate_coeff(self, root):
         """
@@ -25,25 +65,42 @@ class DataParser:
         RateCoeff
             RateCoeff object
         """
-        root = root.getchildren()[0]
+        rc_type, params = self._parse_rate_params(root)
+        return rc_type(*params)
+
+    def _parse_rate_params(self, root):
+        """
+        Parse 'rateCoeff' element into the type and parameters of its rate coefficient
+
+        Parameters
+        ----------
+        root: Element
+            rateCoeff Element
+
+        Returns
+        ----------
+        (type, List[float])
+            RateCoeff subclass and its parameters in the order of its `param_names`
+        """
+        root = list(root)[0]
         if root.tag == "Arrhenius":
             A = float(root.find('A').text)
             E = float(root.find('E').text)
             if root.find('R') is not None:
                 R = root.find('R')
-                return Arrhenius(a=A, E=E, R=float(R.text))
-            return Arrhenius(a=A, E=E)
+                return Arrhenius, [A, E, float(R.text)]
+            return Arrhenius, [A, E, DEFAULT_R]
         elif root.tag == "modifiedArrhenius":
             A = float(root.find('A').text)
             b = float(root.find('b').text)
             E = float(root.find('E').text)
             if root.find('R') is not None:
                 R = root.find('R')
-                return ModifiedArrhenius(a=A, b=b, E=E, R=float(R.text))
-            return ModifiedArrhenius(a=A, b=b, E=E)
+                return ModifiedArrhenius, [A, b, E, float(R.text)]
+            return ModifiedArrhenius, [A, b, E, DEFAULT_R]
         elif root.tag == "Constant":
             k = float(root.find('k').text)
-            return Constant(k)
+            return Constant, [k]
         else:
             raise NotImplementedError("{} rate coefficient is not supported".format(root.tag))
 
@@ -113,20 +170,147 @@ class DataParser:
         return Reaction(id, reversible=reversible, type_=type_, reactants=reactants, products=products,
                         rate_coeff=rate_coeff, equation=equation)
 
-    def parse_file(self, filename, nasa):
+    def parse_file(self, filename, nasa, stoichiometry='dense', streaming=False, key=None):
         """
         Parse a reaction xml file and return ReactionData object
 
+        With a `cache_dir`, a mechanism parsed before with the same NASA coefficients is loaded from
+        the cache in one read; stale or corrupt cache entries fall back to parsing the file.
+
         Parameters
         ----------
         filename: str
             filename of reaction xml file
+        nasa: chemkin.nasa.NASACoeffs or chemkin.nasa.NASATable
+            NASA coefficients
+        stoichiometry: str
+            storage of the stoichiometric coefficients, 'dense' (default) or 'sparse'
+        streaming: bool
+            parse incrementally into columnar arrays (see `parse_arrays`) instead of building the
+            whole tree and a Reaction object per reaction; suits very large files (optional; default False)
+        key: str
+            `mechanism_key` of the file if the caller computed it already, so that the file is not
+            hashed again (optional)
 
         Returns
         ----------
         ReactionData
             parsed ReactionData object
         """
+        if self.cache_dir is None:
+            key = None
+        elif key is None:
+            key = self._cache_key(filename, nasa, stoichiometry)
+        if key is None:
+            return self._parse_file(filename, nasa, stoichiometry, streaming)
+
+        path = os.path.join(self.cache_dir, key + ".pickle")
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            if entry['format'] == CACHE_FORMAT and entry['key'] == key:
+                return entry['reaction_data']
+        except Exception:
+            # missing, stale or corrupt entry: parse the file again
+            pass
+
+        reaction_data = self._parse_file(filename, nasa, stoichiometry, streaming)
+        try:
+            temp = "{}.{}.tmp".format(path, os.getpid())
+            with open(temp, "wb") as f:
+                pickle.dump({'format': CACHE_FORMAT, 'key': key, 'reaction_data': reaction_data}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, path)
+        except OSError:
+            pass
+        return reaction_data
+
+    def parse_files(self, filenames, nasa, stoichiometry='dense', streaming=False, processes=None):
+        """
+        Parse and compile many reaction xml files across a pool of processes
+
+        A file that fails to parse does not abort the others; its error is collected instead.
+        With a `cache_dir`, the workers share the parsed-mechanism cache.
+
+        Parameters
+        ----------
+        filenames: List[str]
+            filenames of reaction xml files
+        nasa: chemkin.nasa.NASACoeffs or chemkin.nasa.NASATable
+            NASA coefficients, sent to every worker
+        stoichiometry: str
+            see `parse_file`
+        streaming: bool
+            see `parse_file`
+        processes: int
+            number of worker processes (optional; default the number of CPUs); 1 parses in this process
+
+        Returns
+        ----------
+        (List[ReactionData], dict)
+            parsed ReactionData objects in the order of filenames, None for the files that failed,
+            and the index of every failed file to its exception
+
+        Examples
+        --------
+        >>> from chemkin.nasa import NASACoeffs
+        >>> files = ["chemkin/example_data/rxns.xml", "chemkin/example_data/test_wrongSp.xml"]
+        >>> results, errors = DataParser().parse_files(files, NASACoeffs(), processes=2)
+        >>> len(results[0]), results[1], sorted(errors)
+        (3, None, [1])
+        >>> type(errors[1]).__name__, str(errors[1])
+        ('ValueError', 'C is not in species array.')
+        """
+        filenames = list(filenames)
+        if processes is None:
+            processes = os.cpu_count() or 1
+        processes = max(1, min(processes, len(filenames)))
+        jobs = ([self] * len(filenames), filenames, [nasa] * len(filenames), [stoichiometry] * len(filenames),
+                [streaming] * len(filenames))
+        if processes == 1:
+            outcomes = list(map(_parse_job, *jobs))
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                outcomes = list(executor.map(_parse_job, *jobs))
+        results = [reaction_data for (reaction_data, _) in outcomes]
+        errors = {i: err for (i, (_, err)) in enumerate(outcomes) if err is not None}
+        return results, errors
+
+    def _cache_key(self, filename, nasa, stoichiometry):
+        """
+        Returns the cache key of a mechanism, or None if it can not be cached
+        """
+        if self.cache_dir is None:
+            return None
+        return self.mechanism_key(filename, nasa, stoichiometry)
+
+    def mechanism_key(self, filename, nasa, stoichiometry='dense'):
+        """
+        Content hash of a mechanism: the SHA-256 of the xml file, the NASA coefficient version and the
+        stoichiometry format
+
+        Returns
+        ----------
+        str
+            hex digest, equal for every copy of the same mechanism, or None if the NASA coefficients
+            have no `version`
+        """
+        if not hasattr(nasa, 'version'):
+            return None
+        digest = hashlib.sha256()
+        with open(filename, "rb") as f:
+            digest.update(f.read())
+        digest.update("\n{}\n{}\n{}\n{}".format(CACHE_FORMAT, type(nasa).__name__, nasa.version(),
+                                                 stoichiometry).encode())
+        return digest.hexdigest()
+
+    def _parse_file(self, filename, nasa, stoichiometry, streaming=False):
+        """
+        Parse a reaction xml file without the cache, see `parse_file`
+        """
+        if streaming:
+            id, species, arrays = self.parse_arrays(filename)
+            return ReactionData.from_arrays(id, species, arrays, nasa, stoichiometry=stoichiometry)
         tree = ET.parse(filename)
         id = tree.find("reactionData").get("id")
         species = []
@@ -136,4 +320,81 @@ class DataParser:
         for (i, r) in enumerate(tree.find('reactionData').findall('reaction')):
             reaction = self._parse_reaction(r)
             reactions.append(reaction)
-        return ReactionData(id, species, reactions, nasa)
+        return ReactionData(id, species, reactions, nasa, stoichiometry=stoichiometry)
+
+    def parse_arrays(self, filename):
+        """
+        Parse a reaction xml file incrementally into columnar arrays
+
+        Reaction elements are converted as soon as they are read and then released, and no Reaction
+        objects are created, so that memory stays proportional to the number of coefficients.
+
+        Parameters
+        ----------
+        filename: str
+            filename of reaction xml file
+
+        Returns
+        ----------
+        (str, List[str], chemkin.reaction.ReactionArrays)
+            identifier, species and reactions of the mechanism
+
+        Examples
+        --------
+        >>> id, species, arrays = DataParser().parse_arrays("chemkin/example_data/rxns.xml")
+        >>> arrays.J, arrays.entries['react'][0]
+        (3, array([0, 5, 3, 1, 3, 2]))
+        """
+        id = None
+        species = None
+        reaction_data = None
+        ids, equations, types, reversible = [], [], [], []
+        entries = {'react': ([], array.array('l'), array.array('d')),
+                   'prod': ([], array.array('l'), array.array('d'))}
+        rate_params = {}
+        path = []
+        for event, elem in ET.iterparse(filename, events=('start', 'end')):
+            if event == 'start':
+                if len(path) == 1 and elem.tag == 'reactionData' and reaction_data is None:
+                    reaction_data = elem
+                    id = elem.get('id')
+                path.append(elem)
+                continue
+            path.pop()
+            if len(path) == 1 and elem.tag == 'phase' and species is None:
+                species = []
+                for child in elem:
+                    species += child.text.split()
+            elif elem.tag == 'reaction' and path and path[-1] is reaction_data:
+                j = len(ids)
+                ids.append(elem.get('id'))
+                reversible.append(self._get_bool(elem.get('reversible')))
+                types.append(elem.get('type'))
+                equations.append(elem.find('equation').text.strip())
+                for which, tag in (('react', 'reactants'), ('prod', 'products')):
+                    names, cols, values = entries[which]
+                    for name, coeff in self._get_reactants(elem.find(tag)).items():
+                        names.append(name)
+                        cols.append(j)
+                        values.append(coeff)
+                rc_type, params = self._parse_rate_params(elem.find('rateCoeff'))
+                indices, columns = rate_params.setdefault(rc_type, (array.array('l'), [array.array('d') for _ in params]))
+                indices.append(j)
+                for column, p in zip(columns, params):
+                    column.append(p)
+                # release the converted reaction
+                reaction_data.remove(elem)
+        if reaction_data is None or species is None:
+            raise ValueError("{} must contain a phase and a reactionData element".format(filename))
+
+        species_index = {s: i for (i, s) in enumerate(species)}
+        for which, (names, cols, values) in entries.items():
+            for name in names:
+                if name not in species_index:
+                    raise ValueError("{} is not in species array.".format(name))
+            entries[which] = (np.array([species_index[name] for name in names], dtype=int),
+                              np.array(cols, dtype=int),
+                              np.array(values, dtype=float))
+        rate_groups = [(rc_type, np.array(indices, dtype=int), [np.array(column, dtype=float) for column in columns])
+                       for rc_type, (indices, columns) in rate_params.items()]
+        return id, species, ReactionArrays(ids, equations, types, reversible, entries, rate_groups)
@@ -1,14 +1,119 @@
 import base64
+import threading
 from io import BytesIO
 
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
+# resolution of the rendered png images, in dots per inch
+DEFAULT_DPI = 100
 
-def range_data_collection(user_data, input_concentration, lower_T, upper_T, current_T):
+# Agg canvas of every thread, reused by all plots rendered on that thread
+_local = threading.local()
+
+
+def _attach(figure):
+    """
+    Attach a figure to the Agg canvas of the current thread, creating the canvas if needed
+    """
+    canvas = getattr(_local, 'canvas', None)
+    if canvas is None:
+        _local.canvas = FigureCanvasAgg(figure)
+    else:
+        canvas.figure = figure
+        figure.set_canvas(canvas)
+    return figure
+
+
+def get_figure(pic_width, pic_length, dpi=DEFAULT_DPI):
+    """
+    Returns a new figure drawn on the canvas of the current thread
+
+    Figures are created with the object oriented matplotlib API and never registered with pyplot,
+    so they are freed as soon as they are rendered. Every thread (e.g. a render worker) keeps a single
+    Agg canvas, whose renderer buffer is reused by all plots of the same size and resolution.
+    The figure itself is not reused: matplotlib transforms keep an entry for every transform ever
+    derived from them, which grows without bound on a long-lived figure.
+
+    The canvas is shared, so it only shows the figure attached last; `encode_png` attaches its
+    figure again before rendering it.
+
+    Parameters
+    ----------
+    pic_width, pic_length: float
+        size of the figure in inches
+    dpi: float
+        resolution of the figure in dots per inch (optional; default DEFAULT_DPI)
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+        an empty figure attached to the FigureCanvasAgg of the current thread
+
+    Examples
+    --------
+    >>> figure = get_figure(4, 3, dpi=50)
+    >>> figure.canvas.get_width_height()
+    (200, 150)
+    >>> get_figure(2, 2).canvas is figure.canvas
+    True
+    """
+    return _attach(Figure(figsize=(pic_width, pic_length), dpi=dpi))
+
+
+def encode_png(figure):
+    """
+    Returns the base64-encoded png image of a figure, rendered on the canvas of the current thread
+    """
+    figfile = BytesIO()
+    _attach(figure).canvas.print_png(figfile)
+    return base64.b64encode(figfile.getvalue()).decode('utf8')
+
+
+# spacings of the temperatures of range_data_collection
+GRIDS = ('linear', 'log', 'adaptive')
+
+
+def _sweep(reaction_data, concentration, temps):
+    """
+    Returns the progress rates (num_temps X num_reactions) and reaction rates (num_temps X num_species)
+    of one set of concentrations at many temperatures, evaluated in one batch
+    """
+    concs = np.broadcast_to(np.asarray(concentration, dtype=float), (len(temps), len(reaction_data.species)))
+    progress_rates = reaction_data.get_progress_rate_batch(concs, temps)
+    return progress_rates, reaction_data.get_reaction_rate(progress_rates)
+
+
+def _refine(reaction_data, concentration, lower_T, upper_T, num):
+    """
+    Adaptive grid of num temperatures: starting from a coarse even grid, midpoints are inserted into
+    the intervals over which the rates change the most, relative to their range
+    """
+    temps = np.linspace(lower_T, upper_T, max(2, min(num, (num + 3) // 4)))
+    progress_rates, reaction_rates = _sweep(reaction_data, concentration, temps)
+    while len(temps) < num:
+        values = np.hstack([progress_rates, reaction_rates])
+        scale = np.ptp(values, axis=0)
+        scale[scale == 0] = 1.0
+        change = np.max(np.abs(np.diff(values, axis=0)) / scale, axis=1)
+        # split at most half of the intervals per round, so the new points are measured before splitting further
+        count = min(num - len(temps), max(1, len(change) // 2))
+        intervals = np.sort(np.argsort(-change, kind='mergesort')[:count])
+        midpoints = 0.5 * (temps[intervals] + temps[intervals + 1])
+        new_progress_rates, new_reaction_rates = _sweep(reaction_data, concentration, midpoints)
+        temps = np.insert(temps, intervals + 1, midpoints)
+        progress_rates = np.insert(progress_rates, intervals + 1, new_progress_rates, axis=0)
+        reaction_rates = np.insert(reaction_rates, intervals + 1, new_reaction_rates, axis=0)
+    return temps, progress_rates, reaction_rates
+
+
+def range_data_collection(user_data, input_concentration, lower_T, upper_T, current_T, num=100, grid='linear'):
     """
     Returns all processed data required for the progress/reaction rates plots
 
+    The rates at all temperatures of the range are evaluated in one batch.
+
     Parameters
     ----------
     user_data:              ReactionData class object
@@ -21,16 +126,22 @@ def range_data_collection(user_data, input_concentration, lower_T, upper_T, curr
                             the upper bound of temperature range
     current_T:              float or integer
                             The temperature of the current reaction
+    num:                    integer
+                            The number of temperatures of the range (optional; default 100)
+    grid:                   string
+                            'linear' for evenly spaced temperatures, 'log' for evenly spaced logarithms of the
+                            temperatures, or 'adaptive' for temperatures refined where the rates change the most
+                            (optional; default 'linear')
 
     Returns
     -------
-    temp_range:             python list of 100 floats
-                            100 temperatures evenly spaced within the given temperature range
-    progress_rates_list:    python list of  100 numpy arrays
-                            100 progress rate arrays for 100 temperatures to be plotted respectively. Each array contains n floats
+    temp_range:             numpy array of num floats
+                            increasing temperatures within the given temperature range, including its bounds
+    progress_rates_list:    numpy array of size num X n
+                            the progress rates at every temperature of the range, one row per temperature,
                             where n is the number of elementary reactions in the given system
-    reaction_rates_list:    python list of  100 numpy arrays
-                            100 reaction rate arrays for 100 temperatures to be plotted respectively. Each array contains n floats
+    reaction_rates_list:    numpy array of size num X n
+                            the reaction rates at every temperature of the range, one row per temperature,
                             where n is the number of species in the given system
     current_T:              float or integer
                             The temperature of the current reaction
@@ -57,39 +168,54 @@ def range_data_collection(user_data, input_concentration, lower_T, upper_T, curr
     >>> pic_width = 0.1
     >>> pic_length = 0.1
     >>> result = range_data_collection(user_data, input_concentration, lower_T, upper_T, current_T)
+    >>> result[0].shape, result[1].shape, result[2].shape
+    ((100,), (100, 3), (100, 6))
+    >>> range_data_collection(user_data, input_concentration, lower_T, upper_T, current_T, num=40, grid='adaptive')[1].shape
+    (40, 3)
     """
-
+    if num < 2:
+        raise ValueError("num must be at least 2")
+    if grid not in GRIDS:
+        raise ValueError("grid must be one of {}".format(GRIDS))
     reaction_data = user_data
     species = reaction_data.species
     equations = [reaction.equation for reaction in reaction_data.reactions]
     concentration = input_concentration
-    temp_range = list(np.linspace(lower_T, upper_T, num=100))
-    progress_rates_list = [None] * len(temp_range)
-    reaction_rates_list = [None] * len(temp_range)
-
-    for i, temp in enumerate(temp_range):
-        progress_rates = reaction_data.get_progress_rate(concentration, temp)
-        progress_rates_list[i] = progress_rates
-        reaction_rates_list[i] = reaction_data.get_reaction_rate(progress_rates)
-    # print(len(temp_range),len(progress_rates_list))
 
-    progress_rates_current = reaction_data.get_progress_rate(concentration, current_T)
-    reaction_rates_current = reaction_data.get_reaction_rate(progress_rates_current)
-    return temp_range, progress_rates_list, reaction_rates_list, current_T, species, progress_rates_current, reaction_rates_current, equations
+    if grid == 'adaptive':
+        temp_range, progress_rates_list, reaction_rates_list = _refine(reaction_data, concentration, lower_T,
+                                                                       upper_T, num)
+        progress_rates_current, reaction_rates_current = _sweep(reaction_data, concentration, [current_T])
+    else:
+        if grid == 'log':
+            if lower_T <= 0:
+                raise ValueError("A log grid needs positive temperatures")
+            temp_range = np.logspace(np.log10(lower_T), np.log10(upper_T), num=num)
+            # exact bounds, without the rounding of 10 ** log10(T)
+            temp_range[[0, -1]] = lower_T, upper_T
+        else:
+            temp_range = np.linspace(lower_T, upper_T, num=num)
+        # the current temperature is evaluated in the same batch
+        progress_rates, reaction_rates = _sweep(reaction_data, concentration, np.append(temp_range, current_T))
+        progress_rates_list, progress_rates_current = progress_rates[:-1], progress_rates[-1:]
+        reaction_rates_list, reaction_rates_current = reaction_rates[:-1], reaction_rates[-1:]
+    return (temp_range, progress_rates_list, reaction_rates_list, current_T, species, progress_rates_current[0],
+            reaction_rates_current[0], equations)
 
 
 def progress_rate_plot_generation(temp_range, progress_rates_list, current_T, progress_rates_current, equations,
                                   pic_width,
-                                  pic_length):
+                                  pic_length,
+                                  dpi=DEFAULT_DPI):
     """
     Returns the base64-encoded plot for progress rates of all elementary reacitons vs temperature range
 
     Parameters
     ----------
-    temp_range:                python list of 100 floats
-                            100 temperatures evenly spaced within the given temperature range
-    progress_rates_list:   python list of  100 numpy arrays
-                            100 progress rate arrays for 100 temperatures to be plotted respectively. Each array contains n floats
+    temp_range:             numpy array of m floats
+                            temperatures of the range, see `range_data_collection`
+    progress_rates_list:    numpy array of size m X n
+                            the progress rates at every temperature of the range, one row per temperature,
                             where n is the number of elementary reactions in the given system
     current_T:              float or integer
                             The temperature of the current reaction
@@ -101,6 +227,8 @@ def progress_rate_plot_generation(temp_range, progress_rates_list, current_T, pr
                             the desired width of the output plot image(pixel/dpi)
     pic_length:             float
                             the desired lengthth of the output plot image(pixel/dpi)
+    dpi:                    float
+                            the resolution of the output plot image (optional; default DEFAULT_DPI)
 
     Returns
     -------
@@ -128,44 +256,42 @@ def progress_rate_plot_generation(temp_range, progress_rates_list, current_T, pr
     curr_T = current_T
 
     # generate plot
-    plt.figure(figsize=(pic_width, pic_length))
+    figure = get_figure(pic_width, pic_length, dpi)
+    ax = figure.add_subplot(111)
 
-    reaction_num = len(progress_rates_list[0])
+    progress_rates = np.asarray(progress_rates_list)
+    reaction_num = progress_rates.shape[1]
     for i in range(reaction_num):
         # generate a curve for each elementary reaction
-        y = [e[i] for e in progress_rates_list]
-        plt.plot(x, y, alpha=0.6)
-        plt.scatter(x, y, label=equations[i], alpha=0.6)
+        y = progress_rates[:, i]
+        ax.plot(x, y, alpha=0.6)
+        ax.scatter(x, y, label=equations[i], alpha=0.6)
         if i == 0:
-            plt.plot(curr_T, progress_rates_current[i], '^r', label='Current Temperature', markersize=12)
+            ax.plot(curr_T, progress_rates_current[i], '^r', label='Current Temperature', markersize=12)
         else:
-            plt.plot(curr_T, progress_rates_current[i], '^r', markersize=12)
-    plt.xlabel("Temperature")
-    plt.ylabel("Progress Rate")
-    plt.title("Progress Rate vs Temperature by Reactions")
-    plt.legend()
+            ax.plot(curr_T, progress_rates_current[i], '^r', markersize=12)
+    ax.set_xlabel("Temperature")
+    ax.set_ylabel("Progress Rate")
+    ax.set_title("Progress Rate vs Temperature by Reactions")
+    ax.legend()
 
     # output plot in base64 format
-    figfile = BytesIO()
-    plt.savefig(figfile, format='png')
-    figfile.seek(0)  # rewind to beginning of file
-    figdata_png = base64.b64encode(figfile.getvalue())
-    encoded_png = figdata_png.decode('utf8')
-    return encoded_png
+    return encode_png(figure)
 
 
 def reaction_rate_plot_generation(temp_range, reaction_rates_list, current_T, reaction_rates_current, species,
                                   pic_width,
-                                  pic_length):
+                                  pic_length,
+                                  dpi=DEFAULT_DPI):
     """
     Returns the base64-encoded plot for reaction rates of all species vs temperature range
 
     Parameters
     ----------
-    temp_range:                python list of 100 floats
-                            100 temperatures evenly spaced within the given temperature range
-    reaction_rates_list:   python list of  100 numpy arrays
-                            100 reaction rate arrays for 100 temperatures to be plotted respectively. Each array contains n floats
+    temp_range:             numpy array of m floats
+                            temperatures of the range, see `range_data_collection`
+    reaction_rates_list:    numpy array of size m X n
+                            the reaction rates at every temperature of the range, one row per temperature,
                             where n is the number of species in the given system
     current_T:              float or integer
                             The temperature of the current reaction
@@ -177,6 +303,8 @@ def reaction_rate_plot_generation(temp_range, reaction_rates_list, current_T, re
                             the desired width of the output plot image(pixel/dpi)
     pic_length:             float
                             the desired length of the output plot image(pixel/dpi)
+    dpi:                    float
+                            the resolution of the output plot image (optional; default DEFAULT_DPI)
 
     Returns
     -------
@@ -203,27 +331,54 @@ def reaction_rate_plot_generation(temp_range, reaction_rates_list, current_T, re
     curr_T = current_T
 
     # generate plot
-    plt.figure(figsize=(pic_width, pic_length))
+    figure = get_figure(pic_width, pic_length, dpi)
+    ax = figure.add_subplot(111)
 
-    species_num = len(reaction_rates_list[0])
+    reaction_rates = np.asarray(reaction_rates_list)
+    species_num = reaction_rates.shape[1]
     for i in range(species_num):
-        # generate a curve for each elementary reaction
-        y = [e[i] for e in reaction_rates_list]
-        plt.plot(x, y, label=None, alpha=0.6)
-        plt.scatter(x, y, label=species[i], alpha=0.6)
+        # generate a curve for each species
+        y = reaction_rates[:, i]
+        ax.plot(x, y, label=None, alpha=0.6)
+        ax.scatter(x, y, label=species[i], alpha=0.6)
         if i == 0:
-            plt.plot(curr_T, reaction_rates_current[i], '^r', label='Current Temperature', markersize=12)
+            ax.plot(curr_T, reaction_rates_current[i], '^r', label='Current Temperature', markersize=12)
         else:
-            plt.plot(curr_T, reaction_rates_current[i], '^r', markersize=12)
-    plt.xlabel("Temperature")
-    plt.ylabel("Reaction Rate")
-    plt.title("Reaction Rate vs Temperature by Species")
-    plt.legend()
+            ax.plot(curr_T, reaction_rates_current[i], '^r', markersize=12)
+    ax.set_xlabel("Temperature")
+    ax.set_ylabel("Reaction Rate")
+    ax.set_title("Reaction Rate vs Temperature by Species")
+    ax.legend()
 
     # output plot in base64 format
-    figfile = BytesIO()
-    plt.savefig(figfile, format='png')
-    figfile.seek(0)  # rewind to beginning of file
-    figdata_png = base64.b64encode(figfile.getvalue())
-    encoded_png = figdata_png.decode('utf8')
-    return encoded_png
+    return encode_png(figure)
+
+
+def rate_plots(user_data, input_concentration, lower_T, upper_T, current_T, pic_width, pic_length, dpi=DEFAULT_DPI,
+               num=100, grid='linear'):
+    """
+    Returns the base64-encoded progress and reaction rate plots of a temperature range, see
+    `range_data_collection`, `progress_rate_plot_generation` and `reaction_rate_plot_generation`
+
+    The arguments and results can be pickled, so that the plots can be rendered in a worker process.
+
+    Returns
+    -------
+    (str, str)
+        the base64-encoded png images of the progress and the reaction rates vs temperature
+
+    Examples
+    --------
+    >>> from .parser import DataParser
+    >>> from .nasa import NASACoeffs
+    >>> user_data = DataParser().parse_file('chemkin/example_data/rxns.xml', NASACoeffs())
+    >>> progress_plot, reaction_plot = rate_plots(user_data, [10,30,30,40,50,60], 1000, 2000, 150, 0.1, 0.1)
+    """
+    (temp_range, progress_rates_list, reaction_rates_list, current_T, species, progress_rates_current,
+     reaction_rates_current, equations) = range_data_collection(user_data, input_concentration, lower_T, upper_T,
+                                                                current_T, num, grid)
+    progress_plot = progress_rate_plot_generation(temp_range, progress_rates_list, current_T, progress_rates_current,
+                                                  equations, pic_width, pic_length, dpi)
+    reaction_plot = reaction_rate_plot_generation(temp_range, reaction_rates_list, current_T, reaction_rates_current,
+                                                  species, pic_width, pic_length, dpi)
+    return progress_plot, reaction_plot
@@ -1,10 +1,118 @@
 import numpy as np
 
+# ideal gas constant used by Arrhenius rate coefficients unless given
+DEFAULT_R = 8.314
+
+
+def _check_arrhenius(A, R):
+    """
+    Validate Arrhenius parameter(s) once, at construction or when a mechanism is built
+    """
+    negative = np.flatnonzero(np.asarray(A) < 0.0)
+    if len(negative) > 0:
+        raise ValueError("A = {0:18.16e}:  Negative Arrhenius prefactor is prohibited!".format(
+            np.ravel(A)[negative[0]]))
+
+    negative = np.flatnonzero(np.asarray(R) < 0.0)
+    if len(negative) > 0:
+        raise ValueError("R = {0:18.16e}:  Negative ideal gas constant is prohibited!".format(
+            np.ravel(R)[negative[0]]))
+
+
+def _check_temperature(T):
+    """
+    Validate temperature(s) given to get_K
+    """
+    negative = np.flatnonzero(np.asarray(T) < 0.0)
+    if len(negative) > 0:
+        raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(np.ravel(T)[negative[0]]))
+
 
 class RateCoeff:
+    """
+    Base class of rate coefficients
+
+    Subclasses that can be evaluated for many reactions at once list the names of their
+    parameter attributes in `param_names` and implement `vectorized_K` and `vectorized_dlnK_dT`.
+    """
+    param_names = None
+
     def get_K(self, T):
         raise NotImplementedError()
 
+    @staticmethod
+    def check_params(*params):
+        """
+        Validate the packed parameters of many reactions of the same type
+
+        Parameters
+        ----------
+        params: np.ndarray
+           one array per name in `param_names`
+
+        Raises
+        ------
+        ValueError
+           if a parameter is out of its valid range
+        """
+        pass
+
+    def get_dlnK_dT(self, T):
+        """
+        Temperature derivative of the logarithm of the rate coefficient, by central differences
+
+        Parameters
+        ----------
+        T: float
+           Temperature
+           Must be positive
+
+        Returns
+        -------
+        float
+           d(ln k)/dT
+        """
+        dT = 1e-6 * T
+        return (np.log(self.get_K(T + dT)) - np.log(self.get_K(T - dT))) / (2 * dT)
+
+    @staticmethod
+    def vectorized_K(T, *params):
+        """
+        Calculates the rate coefficients of many reactions of the same type
+
+        Parameters
+        ----------
+        T: np.ndarray
+           Temperature, broadcastable against the parameter arrays
+        params: np.ndarray
+           one array per name in `param_names`
+
+        Returns
+        -------
+        np.ndarray
+           rate coefficients
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def vectorized_dlnK_dT(T, *params):
+        """
+        Calculates d(ln k)/dT of many reactions of the same type
+
+        Parameters
+        ----------
+        T: np.ndarray
+           Temperature, broadcastable against the parameter arrays
+        params: np.ndarray
+           one array per name in `param_names`
+
+        Returns
+        -------
+        np.ndarray
+           temperature derivatives of the logarithm of the rate coefficients
+        """
+        raise NotImplementedError()
+
 
 class ModifiedArrhenius(RateCoeff):
     """
@@ -21,8 +129,9 @@ class ModifiedArrhenius(RateCoeff):
     R: float
      ideal gas constant (optional; default 8.314). must be positive
     """
+    param_names = ('A', 'b', 'E', 'R')
 
-    def __init__(self, a, b, E, R=8.314):
+    def __init__(self, a, b, E, R=DEFAULT_R):
         """
         Create a new instance of ModifiedArrhenius
 
@@ -37,6 +146,7 @@ class ModifiedArrhenius(RateCoeff):
         R: float
          ideal gas constant (optional; default 8.314). must be positive
         """
+        _check_arrhenius(a, R)
         self.b = b
         self.A = a
         self.E = E
@@ -62,16 +172,23 @@ class ModifiedArrhenius(RateCoeff):
         >>> ModifiedArrhenius(10,20,30).get_K(50)
         8.872748484824047e+34
         """
-        if self.A < 0.0:
-            raise ValueError("A = {0:18.16e}:  Negative Arrhenius prefactor is prohibited!".format(self.A))
+        _check_temperature(T)
+        return self.vectorized_K(T, self.A, self.b, self.E, self.R)
+
+    def get_dlnK_dT(self, T):
+        return self.vectorized_dlnK_dT(T, self.A, self.b, self.E, self.R)
 
-        if T < 0.0:
-            raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(T))
+    @staticmethod
+    def check_params(A, b, E, R):
+        _check_arrhenius(A, R)
 
-        if self.R < 0.0:
-            raise ValueError("R = {0:18.16e}:  Negative ideal gas constant is prohibited!".format(self.R))
+    @staticmethod
+    def vectorized_K(T, A, b, E, R):
+        return A * T ** b * np.exp(-E / R / T)
 
-        return self.A * T ** self.b * np.exp(-self.E / self.R / T)
+    @staticmethod
+    def vectorized_dlnK_dT(T, A, b, E, R):
+        return b / T + E / R / T ** 2
 
 
 class Arrhenius(RateCoeff):
@@ -87,8 +204,9 @@ class Arrhenius(RateCoeff):
     R: float
      ideal gas constant (optional; default 8.314). must be positive
     """
+    param_names = ('A', 'E', 'R')
 
-    def __init__(self, a, E, R=8.314):
+    def __init__(self, a, E, R=DEFAULT_R):
         """
         Create a new Arrhenius instance
 
@@ -101,6 +219,7 @@ class Arrhenius(RateCoeff):
         R: float
          ideal gas constant (optional; default 8.314). must be positive
         """
+        _check_arrhenius(a, R)
         self.A = a
         self.E = E
         self.R = R
@@ -125,17 +244,23 @@ class Arrhenius(RateCoeff):
         >>> Arrhenius(10,20,30).get_K(50)
         9.8675516180719569
         """
+        _check_temperature(T)
+        return self.vectorized_K(T, self.A, self.E, self.R)
 
-        if self.A < 0.0:
-            raise ValueError("A = {0:18.16e}:  Negative Arrhenius prefactor is prohibited!".format(self.A))
+    def get_dlnK_dT(self, T):
+        return self.vectorized_dlnK_dT(T, self.A, self.E, self.R)
 
-        if T < 0.0:
-            raise ValueError("T = {0:18.16e}:  Negative temperatures are prohibited!".format(T))
+    @staticmethod
+    def check_params(A, E, R):
+        _check_arrhenius(A, R)
 
-        if self.R < 0.0:
-            raise ValueError("R = {0:18.16e}:  Negative ideal gas constant is prohibited!".format(self.R))
+    @staticmethod
+    def vectorized_K(T, A, E, R):
+        return A * np.exp(-E / R / T)
 
-        return self.A * np.exp(-self.E / self.R / T)
+    @staticmethod
+    def vectorized_dlnK_dT(T, A, E, R):
+        return E / R / T ** 2
 
 
 class Constant(RateCoeff):
@@ -147,6 +272,7 @@ class Constant(RateCoeff):
     k: float
         constant rate coefficient, must be positive
     """
+    param_names = ('k',)
 
     def __init__(self, const):
         """
@@ -157,6 +283,7 @@ class Constant(RateCoeff):
         const: float
             constant rate coefficient, must be positive
         """
+        self.check_params(const)
         self.k = const
 
     def get_K(self, T):
@@ -179,7 +306,165 @@ class Constant(RateCoeff):
         >>> Constant(1).get_K(50)
         1
         """
-        if self.k < 0:
+        return self.k
+
+    def get_dlnK_dT(self, T):
+        return 0.0
+
+    @staticmethod
+    def check_params(k):
+        if np.any(np.asarray(k) < 0):
             raise ValueError("Negative reaction rate coefficients are prohibited.")
 
-        return self.k
+    @staticmethod
+    def vectorized_K(T, k):
+        return k * np.ones_like(T)
+
+    @staticmethod
+    def vectorized_dlnK_dT(T, k):
+        return 0.0 * k * T
+
+
+class RateCoeffSet:
+    """
+    Rate coefficients of a whole mechanism stored as struct-of-arrays
+
+    Reactions are grouped by rate-law type and the parameters of each group are packed into
+    contiguous arrays, so that the rate coefficients of all reactions (at one or many temperatures)
+    are computed with one vectorized expression per group. Rate coefficient types without
+    `param_names` fall back to calling their own `get_K`.
+
+    Attributes
+    ----------
+    J: int
+        number of reactions
+    groups: List[(type, np.ndarray, List[np.ndarray])]
+        (rate coefficient type, reaction indices, parameter arrays)
+    others: List[(int, RateCoeff)]
+        (reaction index, rate coefficient) for types that can not be vectorized
+    """
+
+    def __init__(self, rate_coeffs):
+        """
+        Create a new RateCoeffSet
+
+        Parameters
+        ----------
+        rate_coeffs: List[RateCoeff]
+            rate coefficient of each reaction
+        """
+        self.J = len(rate_coeffs)
+        by_type = {}
+        self.others = []
+        for (j, rc) in enumerate(rate_coeffs):
+            if type(rc).param_names is None:
+                self.others.append((j, rc))
+            else:
+                by_type.setdefault(type(rc), []).append(j)
+        self.groups = []
+        for cls, indices in by_type.items():
+            params = [np.array([float(getattr(rate_coeffs[j], name)) for j in indices]) for name in cls.param_names]
+            self.groups.append((cls, np.array(indices, dtype=int), params))
+
+    @classmethod
+    def from_groups(cls, J, groups, others=()):
+        """
+        Create a RateCoeffSet from parameters already packed by type
+
+        Parameters
+        ----------
+        J: int
+            number of reactions
+        groups: List[(type, np.ndarray, List[np.ndarray])]
+            (rate coefficient type, reaction indices, parameter arrays in the order of `param_names`)
+        others: List[(int, RateCoeff)]
+            (reaction index, rate coefficient) for types that can not be vectorized
+
+        Returns
+        -------
+        RateCoeffSet
+        """
+        self = cls([])
+        self.J = J
+        self.groups = [(rc_type, np.asarray(indices, dtype=int), [np.asarray(p, dtype=float) for p in params])
+                       for (rc_type, indices, params) in groups]
+        self.others = list(others)
+        return self
+
+    def validate(self):
+        """
+        Validate the packed parameters of every group once, so that rate evaluations do not have to
+
+        Returns
+        -------
+        RateCoeffSet
+            self
+
+        Raises
+        ------
+        ValueError
+            if a parameter is out of its valid range
+        """
+        for cls, indices, params in self.groups:
+            cls.check_params(*params)
+        return self
+
+    def get_K(self, T, check=True):
+        """
+        Calculates the rate coefficients of all reactions
+
+        Parameters
+        ----------
+        T: float or np.ndarray
+           Temperature(s), must be positive
+        check: bool
+           validate the temperature(s) (optional; default True)
+
+        Returns
+        -------
+        np.ndarray
+           size: num_reactions for a scalar T, or T.shape + (num_reactions,) for an array of temperatures
+
+        Examples
+        --------
+        >>> rc = RateCoeffSet([Arrhenius(10, 20, 30), Constant(1), ModifiedArrhenius(10, 20, 30)])
+        >>> rc.get_K([50, 100]).shape
+        (2, 3)
+        """
+        T = np.asarray(T, dtype=float)
+        if check:
+            _check_temperature(T)
+        result = np.empty(T.shape + (self.J,))
+        T_column = T[..., np.newaxis]
+        for cls, indices, params in self.groups:
+            result[..., indices] = cls.vectorized_K(T_column, *params)
+        for j, rc in self.others:
+            result[..., j] = np.reshape([rc.get_K(t) for t in T.flat], T.shape)
+        return result
+
+    def get_dlnK_dT(self, T, check=True):
+        """
+        Calculates d(ln k)/dT of all reactions
+
+        Parameters
+        ----------
+        T: float or np.ndarray
+           Temperature(s), must be positive
+        check: bool
+           validate the temperature(s) (optional; default True)
+
+        Returns
+        -------
+        np.ndarray
+           size: num_reactions for a scalar T, or T.shape + (num_reactions,) for an array of temperatures
+        """
+        T = np.asarray(T, dtype=float)
+        if check:
+            _check_temperature(T)
+        result = np.empty(T.shape + (self.J,))
+        T_column = T[..., np.newaxis]
+        for cls, indices, params in self.groups:
+            result[..., indices] = cls.vectorized_dlnK_dT(T_column, *params)
+        for j, rc in self.others:
+            result[..., j] = np.reshape([rc.get_dlnK_dT(t) for t in T.flat], T.shape)
+        return result
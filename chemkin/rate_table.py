@@ -0,0 +1,189 @@
+import numpy as np
+
+METHODS = ('linear', 'cubic')
+
+
+class RateTable:
+    """
+    Rate coefficients of a mechanism tabulated over a temperature window
+
+    log kf of every reaction and log Kc of every reversible reaction are stored at nodes evenly spaced
+    in 1/T, where both are smooth (exactly linear for Arrhenius rates), together with their exact
+    derivatives. Backward rate coefficients follow as kf / Kc.
+
+    Kc is only as smooth as the NASA polynomials: their two temperature ranges do not join exactly at
+    Tmid, which bounds the accuracy of the interpolated backward rate coefficients (about 1e-7 for the
+    example data) whatever the number of nodes. Refining towards a smaller rtol stops with ValueError
+    as soon as doubling the nodes no longer reduces the error.
+
+    Attributes
+    ----------
+    T_min, T_max: float
+        temperature window
+    method: str
+        'linear' or 'cubic' (Hermite) interpolation in 1/T
+    x: np.ndarray
+        size: num, nodes in 1/T
+    log_kf, dlog_kf: np.ndarray
+        size: num X num_reactions, log kf and its derivative w.r.t. 1/T at the nodes
+    log_Kc, dlog_Kc: np.ndarray
+        size: num X num_reversible, log Kc and its derivative w.r.t. 1/T at the nodes
+    kf_zero: np.ndarray
+        size: num_reactions, mask of reactions whose rate coefficient is zero
+    max_rel_error: dict
+        'kf' and 'kb' to the maximum relative error against the exact rate coefficients,
+        sampled between the nodes
+    """
+
+    def __init__(self, reaction_data, T_min, T_max, num=256, method='cubic', rtol=None, max_num=65536):
+        """
+        Tabulate the rate coefficients of a mechanism
+
+        Parameters
+        ----------
+        reaction_data: chemkin.reaction.ReactionData
+            mechanism, evaluated exactly at the nodes
+        T_min, T_max: float
+            temperature window, 0 < T_min < T_max
+        num: int
+            number of nodes (optional; default 256)
+        method: str
+            'cubic' or 'linear' (optional; default 'cubic')
+        rtol: float
+            double the number of nodes until the maximum relative error is below rtol (optional)
+        max_num: int
+            maximum number of nodes when refining (optional; default 65536)
+        """
+        if not 0 < T_min < T_max:
+            raise ValueError("The temperature window must satisfy 0 < T_min < T_max")
+        if method not in METHODS:
+            raise ValueError("method must be one of {}".format(METHODS))
+        if num < 2:
+            raise ValueError("num must be at least 2")
+        self.T_min = float(T_min)
+        self.T_max = float(T_max)
+        self.method = method
+        previous_error = None
+        while True:
+            self._build(reaction_data, num)
+            self.max_rel_error = self._measure(reaction_data)
+            error = max(self.max_rel_error.values())
+            if rtol is None or error <= rtol:
+                break
+            # doubling the nodes divides the error of smooth data by 4 (linear) or 16 (cubic)
+            if previous_error is not None and error > 0.5 * previous_error:
+                raise ValueError("A relative error of {} can not be reached: the error stalls at {} with {} nodes, "
+                                 "e.g. where the NASA polynomials switch temperature ranges".format(rtol, error, num))
+            if 2 * num > max_num:
+                raise ValueError("A relative error of {} is not reached with {} nodes (error {})".format(
+                    rtol, num, error))
+            previous_error = error
+            num *= 2
+
+    def _build(self, rd, num):
+        """
+        Evaluate the exact rate coefficients and their derivatives at num nodes
+        """
+        self.x = np.linspace(1.0 / self.T_max, 1.0 / self.T_min, num)
+        self.h = self.x[1] - self.x[0]
+        T = 1.0 / self.x
+        kf = rd.rate_coeffs.get_K(T)
+        self.kf_zero = (kf == 0).all(axis=0)
+        if ((kf <= 0) & ~self.kf_zero).any():
+            raise ValueError("Rate coefficients must be positive or zero over the whole temperature window")
+        # d/d(1/T) = -T^2 d/dT
+        self.log_kf = np.log(np.where(self.kf_zero, 1.0, kf))
+        self.dlog_kf = np.where(self.kf_zero, 0.0, -T[:, np.newaxis] ** 2 * rd.rate_coeffs.get_dlnK_dT(T))
+        self.log_Kc = np.zeros((num, 0))
+        self.dlog_Kc = np.zeros((num, 0))
+        if rd.reversible.any():
+            equilibrium, dlnKc_dT = rd._equilibrium(T, tabulated=False)
+            self.log_Kc = np.log(equilibrium)
+            self.dlog_Kc = -T[:, np.newaxis] ** 2 * dlnKc_dT
+
+    def _measure(self, rd):
+        """
+        Maximum relative errors of kf and kb at points between the nodes
+        """
+        x = (self.x[:-1, np.newaxis] + self.h * np.array([0.25, 0.5, 0.75])).ravel()
+        T = 1.0 / x
+        kf = rd.rate_coeffs.get_K(T)
+        kf_table = self.get_k(T)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            errors = {'kf': np.nanmax(np.append(np.abs(kf_table / kf - 1), 0.0)), 'kb': 0.0}
+        if rd.reversible.any():
+            rev = rd.reversible
+            equilibrium = rd._equilibrium(T, tabulated=False)[0]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                kb = kf[:, rev] / equilibrium
+                kb_table = kf_table[:, rev] / self.equilibrium(T)[0]
+                errors['kb'] = np.nanmax(np.append(np.abs(kb_table / kb - 1), 0.0))
+        return errors
+
+    def covers(self, T):
+        """
+        Whether all temperature(s) T are inside the window of the table
+        """
+        T = np.asarray(T)
+        return T.size > 0 and self.T_min <= np.min(T) and np.max(T) <= self.T_max
+
+    def _interpolate(self, values, slopes, T):
+        """
+        Interpolate tabulated values (num X n) at temperature(s) T
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            interpolated values and their derivatives w.r.t. T, size T.shape + (n,)
+        """
+        x = 1.0 / np.asarray(T, dtype=float)
+        position = (x - self.x[0]) / self.h
+        n = np.clip(np.floor(position).astype(int), 0, len(self.x) - 2)
+        t = (position - n)[..., np.newaxis]
+        y0, y1 = values[n], values[n + 1]
+        if self.method == 'linear':
+            y = y0 + t * (y1 - y0)
+            dy_dx = (y1 - y0) / self.h
+        else:
+            m0, m1 = slopes[n] * self.h, slopes[n + 1] * self.h
+            t2 = t * t
+            t3 = t2 * t
+            y = ((2 * t3 - 3 * t2 + 1) * y0 + (t3 - 2 * t2 + t) * m0
+                 + (-2 * t3 + 3 * t2) * y1 + (t3 - t2) * m1)
+            dy_dx = ((6 * t2 - 6 * t) * (y0 - y1) + (3 * t2 - 4 * t + 1) * m0 + (3 * t2 - 2 * t) * m1) / self.h
+        # d/dT = -(1/T)^2 d/d(1/T)
+        return y, -x[..., np.newaxis] ** 2 * dy_dx
+
+    def get_k(self, T):
+        """
+        Interpolated forward rate coefficients
+
+        Parameters
+        ----------
+        T: float or array-like
+            temperature(s) inside the window
+
+        Returns
+        -------
+        np.ndarray
+            size: T.shape + (num_reactions,)
+        """
+        log_kf = self._interpolate(self.log_kf, self.dlog_kf, T)[0]
+        return np.where(self.kf_zero, 0.0, np.exp(log_kf))
+
+    def equilibrium(self, T):
+        """
+        Interpolated equilibrium constants of the reversible reactions and their derivatives d(ln Kc)/dT
+
+        Parameters
+        ----------
+        T: float or array-like
+            temperature(s) inside the window
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+            size: T.shape + (num_reversible,) each
+        """
+        log_Kc, dlnKc_dT = self._interpolate(self.log_Kc, self.dlog_Kc, T)
+        return np.exp(log_Kc), dlnKc_dT
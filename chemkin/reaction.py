@@ -1,6 +1,31 @@
 import numpy as np
 
 from . import thermochem
+from .cache import LRUCache
+from .nasa import NASATable
+from .rate_coeff import RateCoeffSet
+from .rate_table import RateTable
+from .stoichiometry import DenseStoichiometry, SparseStoichiometry, _freeze, _read_only
+
+STOICHIOMETRY_FORMATS = {'dense': DenseStoichiometry, 'sparse': SparseStoichiometry}
+
+
+def _nbytes(value):
+    """
+    Returns the total size of the arrays in value and in its nested dicts, lists and tuples
+
+    Examples
+    --------
+    >>> _nbytes({'a': np.zeros(3), 'b': (np.zeros((2, 2), dtype=np.int64), 'text')})
+    56
+    """
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return 0
 
 
 class ReactionData:
@@ -15,9 +40,43 @@ class ReactionData:
         reactants & product
     reactions: List[Reaction]
         an array of the reactions
+    arrays: ReactionArrays
+        columnar reactions of reaction data created `from_arrays`, until `reactions` is accessed; else None
+    species_index: dict
+        species name to row index
+    stoichiometry: chemkin.stoichiometry.Stoichiometry
+        compiled stoichiometric coefficients in the selected (dense or sparse) format
+    nu_react, nu_prod, nu: np.ndarray
+        size: num_species X num_reactions, read-only
+        stoichiometric coefficients for reactants, products and their difference (products - reactants);
+        built on first access for the sparse format
+    reversible: np.ndarray
+        size: num_reactions, read-only mask of reversible reactions
+    reversible_species: np.ndarray
+        size: num_species, read-only mask of species taking part in a reversible reaction
+    gamma: np.ndarray
+        size: num_reactions, read-only net change of moles of each reaction
+    rate_coeffs: chemkin.rate_coeff.RateCoeffSet
+        rate coefficient parameters of all reactions packed by rate-law type
+    rate_table: chemkin.rate_table.RateTable
+        tabulated rate coefficients (see `tabulate_rates`), or None
+    nasa_coeffs: np.ndarray
+        size: num_species X 2 X 7
+        low (index 0) and high (index 1) temperature range NASA coefficients of each species
+    nasa_tmin, nasa_tmid, nasa_tmax: np.ndarray
+        size: num_species
+        bounds of the low ([Tmin, Tmid]) and high ((Tmid, Tmax]) temperature ranges, NaN if unknown
+    nasa_known: np.ndarray
+        size: num_species, mask of species with NASA coefficients
+    trusted: bool
+        skip the per-call validation of inputs in rate evaluations by default
+    rate_cache: chemkin.cache.LRUCache
+        forward rate and equilibrium coefficients by temperature (see `set_rate_cache`), or None
+    nbytes: int
+        estimated size of the mechanism: its columnar reactions and compiled arrays
     """
 
-    def __init__(self, id, species, reactions, nasa):
+    def __init__(self, id, species, reactions, nasa, stoichiometry='dense', trusted=False, rate_cache_size=None):
         """
         Creates a new instance of reaction data
 
@@ -29,33 +88,24 @@ class ReactionData:
             list of reactants & products
         reactions: List[Reaction]
             list of reactions
-        nasa: chemkin.nasa.NASACoeffs
-            NASA coefficients
+        nasa: chemkin.nasa.NASACoeffs or chemkin.nasa.NASATable
+            NASA coefficients; a NASATable is gathered from directly, without per-species lookups
+        stoichiometry: str
+            storage of the stoichiometric coefficients, 'dense' (default) or 'sparse'.
+            'sparse' only stores the non-zero coefficients and suits mechanisms with many species.
+        trusted: bool
+            skip the per-call validation of temperatures, concentrations and coefficients in rate
+            evaluations unless a method is explicitly asked to `check` (optional; default False).
+            The mechanism itself is always validated once, when it is compiled.
+        rate_cache_size: int
+            number of temperatures whose rate coefficients are memoized, worthwhile when the same
+            temperatures recur (optional; default None, no cache), see `set_rate_cache`
         """
-        self.id = id
+        self._setup(id, species, nasa, stoichiometry, trusted, rate_cache_size)
         self.reactions = reactions
-        self.species = species
-        self.I = len(self.species)
         self.J = len(self.reactions)
         species_set = set(self.species)
-        self.nasa = {}
         ids = set()
-        for s in self.species:
-            try:
-                low_coeffs, low_tmin, low_tmax = nasa.get_coeffs(s, 'low')
-                high_coeffs, high_tmin, high_tmax = nasa.get_coeffs(s, 'high')
-            except KeyError:
-                # don't raise exception here, possible to have mixed system
-                continue
-
-            self.nasa[s] = {'l': {}, 'h': {}}
-            self.nasa[s]['l']['Tmax'] = low_tmax
-            self.nasa[s]['l']['Tmin'] = low_tmin
-            self.nasa[s]['l']['coeffs'] = low_coeffs
-            self.nasa[s]['h']['Tmax'] = high_tmax
-            self.nasa[s]['h']['Tmin'] = high_tmin
-            self.nasa[s]['h']['coeffs'] = high_coeffs
-
         for r in self.reactions:
             if r.id in ids:
                 raise ValueError("Duplicate id: {}".format(r.id))
@@ -67,6 +117,281 @@ class ReactionData:
                 if k not in species_set:
                     raise ValueError("{} is not in species array.".format(k))
 
+        self.compile()
+
+    @classmethod
+    def from_arrays(cls, id, species, arrays, nasa, stoichiometry='dense', trusted=False, rate_cache_size=None):
+        """
+        Creates reaction data from the columnar description of the reactions, without Reaction objects.
+        The `reactions` list is only built if it is accessed.
+
+        Parameters
+        ----------
+        id: str
+            identifier
+        species: List[str]
+            list of reactants & products
+        arrays: ReactionArrays
+            reactions in columnar form, species indices referring to `species`
+        nasa, stoichiometry, trusted, rate_cache_size:
+            see `ReactionData.__init__`
+
+        Returns
+        -------
+        ReactionData
+        """
+        self = cls.__new__(cls)
+        self._setup(id, species, nasa, stoichiometry, trusted, rate_cache_size)
+        self._reactions = None
+        self.arrays = arrays
+        self.J = arrays.J
+        if len(set(arrays.ids)) != arrays.J:
+            seen = set()
+            for r_id in arrays.ids:
+                if r_id in seen:
+                    raise ValueError("Duplicate id: {}".format(r_id))
+                seen.add(r_id)
+        for rows, cols, values in arrays.entries.values():
+            if len(rows) > 0 and not 0 <= np.min(rows) <= np.max(rows) < self.I:
+                raise ValueError("Species indices must refer to the {} species".format(self.I))
+        return self.compile()
+
+    def _setup(self, id, species, nasa, stoichiometry, trusted, rate_cache_size):
+        """
+        Set the options, species and NASA coefficients of a new instance
+        """
+        if stoichiometry not in STOICHIOMETRY_FORMATS:
+            raise ValueError("stoichiometry must be one of {}".format(sorted(STOICHIOMETRY_FORMATS)))
+        self.stoichiometry_format = stoichiometry
+        self.trusted = trusted
+        self.set_rate_cache(rate_cache_size)
+        self.id = id
+        self.species = species
+        self.I = len(self.species)
+        self.nasa_coeffs = np.zeros((self.I, 2, 7))
+        self.nasa_tmin = np.full(self.I, np.nan)
+        self.nasa_tmid = np.full(self.I, np.nan)
+        self.nasa_tmax = np.full(self.I, np.nan)
+        if isinstance(nasa, NASATable):
+            self.nasa_coeffs, self.nasa_tmin, self.nasa_tmid, self.nasa_tmax = nasa.lookup(self.species)
+        else:
+            for (i, s) in enumerate(self.species):
+                try:
+                    low_coeffs, low_tmin, low_tmax = nasa.get_coeffs(s, 'low')
+                    high_coeffs, high_tmin, high_tmax = nasa.get_coeffs(s, 'high')
+                except KeyError:
+                    # don't raise exception here, possible to have mixed system
+                    continue
+
+                self.nasa_coeffs[i, 0, :] = low_coeffs
+                self.nasa_coeffs[i, 1, :] = high_coeffs
+                self.nasa_tmin[i] = low_tmin
+                self.nasa_tmid[i] = low_tmax
+                self.nasa_tmax[i] = high_tmax
+        self.nasa_known = ~np.isnan(self.nasa_tmin)
+
+    @property
+    def reactions(self):
+        """
+        List[Reaction] of the mechanism, built on first access for reaction data created from arrays
+        """
+        if self._reactions is None:
+            self._reactions = self.arrays.to_reactions(self.species)
+            # the reactions may be modified from now on, compile from them
+            self.arrays = None
+        return self._reactions
+
+    @reactions.setter
+    def reactions(self, reactions):
+        self._reactions = reactions
+        self.arrays = None
+
+    def compile(self):
+        """
+        Precompute the stoichiometry of the mechanism once so that rate evaluations can reuse it.
+
+        Must be called again if species or reactions are modified after construction.
+
+        Returns
+        -------
+        ReactionData
+            self, compiled
+        """
+        self.I = len(self.species)
+        self.species_index = {s: i for (i, s) in enumerate(self.species)}
+        if self._reactions is None:
+            arrays = self.arrays
+        else:
+            arrays = ReactionArrays.from_reactions(self._reactions, self.species_index)
+        self.J = arrays.J
+        self._arrays_nbytes = arrays.nbytes
+        reversible = np.array(arrays.reversible, dtype=bool)
+        self.unsupported_type = None
+        for type_ in arrays.types:
+            if type_ != "Elementary":
+                self.unsupported_type = type_
+                break
+
+        self.stoichiometry = STOICHIOMETRY_FORMATS[self.stoichiometry_format](self.I, self.J, arrays.entries,
+                                                                              reversible)
+        self._dense = {}
+        self.reversible = _read_only(reversible)
+        self.reversible_species = self.stoichiometry.reversible_species
+        self.gamma = self.stoichiometry.gamma
+        self.rate_coeffs = RateCoeffSet.from_groups(self.J, arrays.rate_groups, arrays.rate_others)
+        self.rate_table = None
+        if self.rate_cache is not None:
+            self.rate_cache.clear()
+        return self.validate()
+
+    def validate(self):
+        """
+        Check the invariants of the compiled mechanism once, so that rate evaluations do not repeat it.
+
+        Rate coefficient parameters are checked here. Negative stoichiometric coefficients are recorded
+        and reported by checked rate evaluations, with the same message as before.
+
+        Returns
+        -------
+        ReactionData
+            self
+
+        Raises
+        ------
+        ValueError
+            if a rate coefficient parameter is out of its valid range
+        """
+        self.rate_coeffs.validate()
+        self._stoichiometry_errors = {}
+        for which in ('react', 'prod'):
+            negative = self.stoichiometry.first_negative(which)
+            if negative is None:
+                self._stoichiometry_errors[which] = None
+            else:
+                self._stoichiometry_errors[which] = \
+                    "nu_{0}{1} = {2}:  Negative stoichiometric coefficients are prohibited!".format(*negative)
+        return self
+
+    def tabulate_rates(self, T_min, T_max, num=256, method='cubic', rtol=None):
+        """
+        Precompute log kf and log Kc of every reaction over a temperature window.
+
+        get_k, get_kb and the progress rates then interpolate in 1/T for temperatures inside the window
+        and use the exact expressions outside of it. The table is dropped by `compile`.
+
+        Parameters
+        ----------
+        T_min, T_max: float
+            temperature window
+        num: int
+            number of nodes, evenly spaced in 1/T (optional; default 256)
+        method: str
+            'cubic' (Hermite, with exact derivatives) or 'linear' interpolation (optional; default 'cubic')
+        rtol: float
+            refine the table until the maximum relative error is below rtol (optional)
+
+        Returns
+        -------
+        chemkin.rate_table.RateTable
+            the table, whose `max_rel_error` reports the error against the exact rate coefficients
+
+        Examples
+        --------
+        >>> from .parser import DataParser
+        >>> from .nasa import NASACoeffs
+        >>> reaction_data = DataParser().parse_file("chemkin/example_data/rxns_reversible.xml", NASACoeffs())
+        >>> table = reaction_data.tabulate_rates(800, 3000, rtol=1e-6)
+        >>> bool(max(table.max_rel_error.values()) <= 1e-6)
+        True
+        """
+        self.rate_table = None
+        self.rate_table = RateTable(self, T_min, T_max, num, method, rtol)
+        if self.rate_cache is not None:
+            self.rate_cache.clear()
+        return self.rate_table
+
+    def set_rate_cache(self, maxsize=128, tolerance=0.0):
+        """
+        Memoize the forward rate and equilibrium coefficients of scalar temperatures.
+
+        Evaluations at a cached temperature skip all exponential and NASA polynomial work, but every
+        evaluation pays for the lookup, so the cache only suits callers whose temperatures recur (e.g. a
+        server answering isothermal requests), not a temperature that changes on every call. The cache is
+        cleared by `compile` and `tabulate_rates` and is not pickled; its hit and miss counters are in
+        `rate_cache.stats()`.
+
+        Parameters
+        ----------
+        maxsize: int
+            number of temperatures kept, least recently used first evicted; 0 or None disables the cache
+        tolerance: float
+            temperatures are rounded to multiples of tolerance, and the coefficients evaluated at the
+            rounded temperature, so that nearby temperatures share an entry (optional; default 0, exact)
+
+        Examples
+        --------
+        >>> from .parser import DataParser
+        >>> from .nasa import NASACoeffs
+        >>> reaction_data = DataParser().parse_file("chemkin/example_data/rxns_reversible.xml", NASACoeffs())
+        >>> reaction_data.set_rate_cache(maxsize=16, tolerance=0.01)
+        >>> for concs in np.eye(len(reaction_data.species)):
+        ...     rates = reaction_data.get_progress_rate(concs, 1500)
+        >>> reaction_data.rate_cache.stats()['misses']
+        2
+        """
+        if tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+        self.rate_cache = LRUCache(maxsize) if maxsize else None
+        self.rate_cache_tolerance = float(tolerance)
+
+    def _cached(self, kind, T, compute):
+        """
+        Returns compute(T), memoized in the rate cache under (kind, T) for scalar non-negative temperatures
+        """
+        if self.rate_cache is None or np.ndim(T) != 0 or not T >= 0:
+            return compute(T)
+        T = float(T)
+        if self.rate_cache_tolerance > 0:
+            T = round(T / self.rate_cache_tolerance) * self.rate_cache_tolerance
+        key = (kind, T)
+        value = self.rate_cache.get(key)
+        if value is None:
+            value = compute(T)
+            self.rate_cache.put(key, value)
+        return value
+
+    def _tabulated(self, T):
+        """
+        Whether the rate coefficients at T are interpolated from the rate table
+        """
+        return self.rate_table is not None and self.rate_table.covers(T)
+
+    def _checked(self, check):
+        """
+        Resolve the `check` argument of rate evaluations, None meaning the default of the instance
+        """
+        return not self.trusted if check is None else check
+
+    def _dense_matrix(self, which):
+        """
+        Dense 'react', 'prod' or 'nu' matrix of the compiled stoichiometry, built once
+        """
+        if which not in self._dense:
+            self._dense[which] = _read_only(self.stoichiometry.to_dense(which))
+        return self._dense[which]
+
+    @property
+    def nu_react(self):
+        return self._dense_matrix('react')
+
+    @property
+    def nu_prod(self):
+        return self._dense_matrix('prod')
+
+    @property
+    def nu(self):
+        return self._dense_matrix('nu')
+
     def get_nu(self):
         """
         Get nu (stoichiometric coefficients) for reactants and products
@@ -75,16 +400,9 @@ class ReactionData:
         -------
         (np.array, np.array)
             a tuple of (stoichiometric coefficients for reactants, stoichiometric coefficients for products)
+            both arrays are read-only views of the compiled stoichiometry
         """
-        inv_dict = {v: k for (k, v) in enumerate(self.species)}
-        nu_react = np.zeros((self.I, self.J))
-        nu_prod = np.zeros((self.I, self.J))
-        for (j, reaction) in enumerate(self.reactions):
-            for reactant in reaction.reactants:
-                nu_react[inv_dict[reactant], j] = reaction.reactants[reactant]
-            for product in reaction.products:
-                nu_prod[inv_dict[product], j] = reaction.products[product]
-        return nu_react, nu_prod
+        return self.nu_react, self.nu_prod
 
     def get_nasa_coeff(self, species, temp):
         """
@@ -102,59 +420,134 @@ class ReactionData:
         np.ndarray
             nasa coefficients for specified species at given temperature
         """
-        if species not in self.nasa:
+        i = self.species_index.get(species)
+        if i is None or not self.nasa_known[i]:
             raise NotImplementedError("NASA coefficient for {} is not specified".format(species))
-        nasa = self.nasa[species]
-        if nasa['l']['Tmin'] <= temp <= nasa['l']['Tmax']:
-            nasa_coeff = nasa['l']['coeffs']
-        elif nasa['h']['Tmin'] <= temp <= nasa['h']['Tmax']:
-            nasa_coeff = nasa['h']['coeffs']
+        if self.nasa_tmin[i] <= temp <= self.nasa_tmid[i]:
+            nasa_coeff = self.nasa_coeffs[i, 0]
+        elif self.nasa_tmid[i] <= temp <= self.nasa_tmax[i]:
+            nasa_coeff = self.nasa_coeffs[i, 1]
         else:
             raise NotImplementedError("NASA coefficient for {} at T={} is not specified".format(species, temp))
-        return np.array(nasa_coeff)
+        return nasa_coeff.copy()
 
-    def get_nasa_coeff_matrix(self, T):
+    def get_nasa_coeff_matrix(self, T, all_species=False):
         """
-        Get nasa coefficient matrix for all species
+        Get nasa coefficient matrix for all species taking part in a reversible reaction
+        (rows of other species are zero)
 
         Parameters
         ----------
-        T: float
-            temperature
+        T: float or array-like
+            temperature, or an array of temperatures
+        all_species: bool
+            require and return the coefficients of every species, not only the reversible ones
 
         Returns
         -------
         np.ndarray
             nasa coefficient matrix for all species at given temperature
+            size: num_species X 7, or T.shape + (num_species, 7) for an array of temperatures
+
+        Raises
+        ------
+        NotImplementedError
+            listing every required species whose coefficients are unknown or do not cover the temperature(s)
         """
-        inv_dict = {v: k for (k, v) in enumerate(self.species)}
-        result = np.zeros((self.I, 7))
-        species_set = set()
+        T = np.asarray(T, dtype=float)
+        T_column = T[..., np.newaxis]  # broadcast over species
+        needed = np.ones(self.I, dtype=bool) if all_species else self.reversible_species
+        self._check_nasa_coverage(T, needed)
+
+        # 0 selects the low range, 1 the high range, for every (temperature, species) pair
+        with np.errstate(invalid='ignore'):
+            high = (T_column > self.nasa_tmid).astype(int)
+        result = self.nasa_coeffs[np.arange(self.I), high]
+        result[..., ~needed, :] = 0.0
+        return result
+
+    def _check_nasa_coverage(self, T, needed):
+        """
+        Raise NotImplementedError listing every needed species whose NASA coefficients are unknown
+        or do not cover the temperature(s) T
+        """
+        T_column = T[..., np.newaxis]
+        unknown = needed & ~self.nasa_known
+        if unknown.any():
+            raise NotImplementedError("NASA coefficient for {} is not specified".format(
+                ", ".join(self.species[i] for i in np.flatnonzero(unknown))))
+
+        with np.errstate(invalid='ignore'):
+            out_of_range = needed & ((T_column < self.nasa_tmin) | (T_column > self.nasa_tmax))
+        if out_of_range.any():
+            reports = []
+            for i in np.flatnonzero(out_of_range.reshape(-1, self.I).any(axis=0)):
+                temps = np.unique(T[out_of_range[..., i]])
+                reports.append("{} at T={} (valid range [{}, {}])".format(
+                    self.species[i], ", ".join(str(t) for t in temps), self.nasa_tmin[i], self.nasa_tmax[i]))
+            raise NotImplementedError("NASA coefficient for {} is not specified".format("; ".join(reports)))
+
+    def get_thermo(self, T):
+        """
+        Thermodynamic properties of every species and equilibrium constants of every reaction
+
+        Parameters
+        ----------
+        T: float or array-like
+            temperature, or an array of temperatures (e.g. the grid of a thermo table)
+
+        Returns
+        -------
+        dict
+            'Cp_over_R', 'H_over_RT', 'S_over_R', 'G_over_RT': np.ndarray of size T.shape + (num_species,)
+            'Kc': np.ndarray of size T.shape + (num_reactions,), concentration based equilibrium constants
 
-        for reaction in self.reactions:
-            if reaction.reversible:
-                species_set = species_set | set(reaction.reactants.keys())
-                species_set = species_set | set(reaction.products.keys())
-        for species in species_set:
-            result[inv_dict[species], :] = self.get_nasa_coeff(species, T)
+        Raises
+        ------
+        NotImplementedError
+            listing every species whose coefficients are unknown or do not cover the temperature(s)
 
+        Examples
+        --------
+        >>> from .parser import DataParser
+        >>> from .nasa import NASACoeffs
+        >>> reaction_data = DataParser().parse_file("chemkin/example_data/rxnset_long.xml", NASACoeffs())
+        >>> thermo = reaction_data.get_thermo(np.linspace(300, 3000, 1000))
+        >>> thermo['H_over_RT'].shape, thermo['Kc'].shape
+        ((1000, 8), (1000, 11))
+        """
+        T = np.asarray(T, dtype=float)
+        self._check_nasa_coverage(T, np.ones(self.I, dtype=bool))
+        result = thermochem.nasa_properties(self.nasa_coeffs, self.nasa_tmid, T)
+        delta_G_over_RT = self.stoichiometry.reaction_sums(result['G_over_RT'])
+        result['Kc'] = thermochem.equilibrium_constants(delta_G_over_RT, self.gamma, T)
         return result
 
-    def get_k(self, T):
+    def get_k(self, T, check=None):
         """
         Get reaction coefficients for all reactions
 
         Parameters
         ----------
-        T: float
-            current temperature
+        T: float or array-like
+            current temperature, or an array of temperatures
+        check: bool
+            validate the temperature(s) (optional; default: not self.trusted)
 
         Returns
         -------
         np.ndarray
             reaction coefficients for all reactions
+            size: num_reactions, or T.shape + (num_reactions,) for an array of temperatures
         """
-        return np.array([reaction.rate_coeff.get_K(T) for reaction in self.reactions])
+        check = self._checked(check)
+
+        def compute(T):
+            if self._tabulated(T):
+                return self.rate_table.get_k(T)
+            return self.rate_coeffs.get_K(T, check)
+
+        return np.array(self._cached('kf', T, compute))
 
     def get_kb(self, kf, nu, T):
         """
@@ -164,25 +557,59 @@ class ReactionData:
         ----------
         kf: np.ndarray
             forward reaction coefficients for all reactions
-        nu: np.ndarray
-            stoichiometric coefficients for reactions (products - reactants)
-        T: float
-            current temperature
+            size: num_reactions, or T.shape + (num_reactions,) for an array of temperatures
+        nu: np.ndarray or None
+            stoichiometric coefficients for reactions (products - reactants);
+            None uses the compiled stoichiometry (dense or sparse)
+        T: float or array-like
+            current temperature, or an array of temperatures
 
         Returns
         -------
         np.ndarray
-            backward reaction coefficients for all reactions
+            backward reaction coefficients for all reactions (0 for irreversible reactions)
+            size: num_reactions, or T.shape + (num_reactions,) for an array of temperatures
         """
+        return self.__backward(kf, nu, T)[0]
+
+    def __backward(self, kf, nu, T):
+        """
+        Returns (backward reaction coefficients, d(ln Kc)/dT of the reversible reactions or None if there is none)
+        """
+        result = np.zeros(np.shape(T) + (self.J,))
+        if not self.reversible.any():
+            return result, None
+        rev = self.reversible
+        kf = np.broadcast_to(kf, result.shape)
+        if nu is None:
+            equilibrium, dlnKc_dT = self._equilibrium(T)
+            result[..., rev] = kf[..., rev] / equilibrium
+            return result, dlnKc_dT
+        nasa = self.get_nasa_coeff_matrix(T)
+        tc = thermochem.ThermoChem(thermochem.ThermochemRXNSetWrapper(nasa), T)
+        result[..., rev] = tc.backward_coeffs_all(nu[:, rev], kf[..., rev])
+        return result, None
+
+    def _equilibrium(self, T, tabulated=True):
+        """
+        Returns the equilibrium constants of the reversible reactions and their temperature derivatives
+        d(ln Kc)/dT, both of size T.shape + (num_reversible,); if tabulated, looked up in the rate cache
+        and interpolated from the rate table when T is inside its window
+        """
+        if tabulated:
+            return self._cached('Kc', T, lambda T: self.rate_table.equilibrium(T) if self._tabulated(T)
+                                else self._equilibrium(T, tabulated=False))
+        rev = self.reversible
+        T = np.asarray(T, dtype=float)
         nasa = self.get_nasa_coeff_matrix(T)
         tc = thermochem.ThermoChem(thermochem.ThermochemRXNSetWrapper(nasa), T)
-        result = [0] * len(self.reactions)
-        for j, reaction in enumerate(self.reactions):
-            if reaction.reversible:
-                result[j] = tc.backward_coeffs(nu[:, j], kf[j])
-        return np.array(result)
+        delta_H_over_RT = self.stoichiometry.reaction_sums(tc.h_rt)[..., rev]
+        delta_S_over_R = self.stoichiometry.reaction_sums(tc.s_rt)[..., rev]
+        equilibrium = tc.equilibrium_coeffs(delta_H_over_RT, delta_S_over_R, self.gamma[rev])
+        # van 't Hoff: d(ln Kc)/dT = (delta H / RT - gamma) / T for concentration based Kc
+        return equilibrium, (delta_H_over_RT - self.gamma[rev]) / T[..., np.newaxis]
 
-    def get_progress_rate(self, concs, T):
+    def get_progress_rate(self, concs, T, check=None):
         """
         Returns the progress rate of a system of elementary reactions
 
@@ -192,6 +619,10 @@ class ReactionData:
               concentration of species
         T: array-like
               temperature
+        check: bool
+              validate temperature, concentrations, rate and stoichiometric coefficients
+              (optional; default: not self.trusted).
+              Time integrators pass False since their iterates may dip slightly below zero.
 
         Returns
         -------
@@ -212,20 +643,70 @@ class ReactionData:
         """
         if len(concs) != self.I:
             raise ValueError("concs must be a list of concentrations of size {}".format(self.I))
-        for r in self.reactions:
-            if r.type != "Elementary":
-                raise NotImplementedError("Progress rate for {} reactions is not supported.", format(r.type))
-        nus = self.get_nu()
+        if self.unsupported_type is not None:
+            raise NotImplementedError("Progress rate for {} reactions is not supported.".format(self.unsupported_type))
 
-        nu = nus[1] - nus[0]
+        check = self._checked(check)
+        kf = self.get_k(T, check)
+        forward_part = self.__progress_rate('react', np.array(concs, dtype=float), kf, check)
 
-        kf = self.get_k(T)
-        forward_part = self.__progress_rate(nus[0], np.array(concs), kf)
-        # print("kf", forward_part)
+        kb = self.get_kb(kf=kf, nu=None, T=T)
+        backward_part = self.__progress_rate('prod', np.array(concs, dtype=float), kb, check)
 
-        kb = self.get_kb(kf=kf, nu=nu, T=T)
-        # print("kb", kb)
-        backward_part = self.__progress_rate(nus[1], np.array(concs), kb)
+        return forward_part - backward_part
+
+    def get_progress_rate_batch(self, concs, T, check=None):
+        """
+        Returns the progress rates of a system of elementary reactions for many states at once
+
+        Parameters
+        ----------
+        concs: array-like
+              size: num_states X num_species
+              concentration of species, one state per row
+        T: float or array-like
+              temperature shared by all states, or one temperature per state (size: num_states)
+        check: bool
+              validate temperatures, concentrations, rate and stoichiometric coefficients
+              (optional; default: not self.trusted)
+
+        Returns
+        -------
+        np.ndarray
+               size: num_states X num_reactions
+               progress rate of each reaction for each state
+
+        Examples
+        --------
+        >>> from .parser import DataParser
+        >>> from .nasa import NASACoeffs
+        >>> nasa = NASACoeffs()
+        >>> data_parser = DataParser()
+        >>> reaction_data = data_parser.parse_file("chemkin/example_data/rxns.xml", nasa)
+        >>> progress_rates = reaction_data.get_progress_rate_batch([[1,2,3,4,5,6], [1,1,1,1,1,1]], [100, 200])
+        >>> progress_rates.shape
+        (2, 3)
+        >>> reaction_data.get_reaction_rate(progress_rates).shape
+        (2, 6)
+        """
+        concs = np.array(concs, dtype=float)
+        if concs.ndim != 2 or concs.shape[1] != self.I:
+            raise ValueError("concs must be an array of concentrations of size N X {}".format(self.I))
+        try:
+            T = np.broadcast_to(np.asarray(T, dtype=float), (concs.shape[0],))
+        except ValueError:
+            raise ValueError("T must be a scalar or an array of size {}".format(concs.shape[0]))
+        if self.unsupported_type is not None:
+            raise NotImplementedError("Progress rate for {} reactions is not supported.".format(self.unsupported_type))
+
+        # rate coefficients only depend on temperature, evaluate them once per distinct temperature
+        check = self._checked(check)
+        temps, inverse = np.unique(T, return_inverse=True)
+        kf = self.get_k(temps, check)
+        kb = self.get_kb(kf=kf, nu=None, T=temps)
+
+        forward_part = self.__progress_rate('react', concs, kf[inverse], check)
+        backward_part = self.__progress_rate('prod', concs, kb[inverse], check)
 
         return forward_part - backward_part
 
@@ -237,11 +718,11 @@ class ReactionData:
         ----------
         progress_rates: np.ndarray
                 progress rates of the reactions
-                size: num_species X num_reactions
+                size: num_reactions, or num_states X num_reactions for a batch
 
         Returns
         -------
-        array: reaction rate of each species
+        array: reaction rate of each species (size: num_species, or num_states X num_species for a batch)
 
         Examples
         --------
@@ -255,71 +736,148 @@ class ReactionData:
         >>> print(reaction_rates[:4])
         [  1.20000000e+04  -1.85794997e-09  -1.20000000e+04  -1.20000000e+04]
         """
-        nu_react, nu_prod = self.get_nu()
-        return self.__reaction_rate(nu_react, nu_prod, progress_rates)
+        return self.__reaction_rate(progress_rates)
 
-    def __progress_rate(self, nu_react, concs, k):
+    def get_jacobian(self, concs, T, check=None):
         """
-        Returns the progress rate of a system of elementary reactions
+        Returns the analytic Jacobian of the species reaction rates
 
         Parameters
         ----------
-        nu_react: np.ndarray
-              size: num_species X num_reactions
-              stoichiometric coefficients for the reaction
         concs: array-like
               concentration of species
-        k: array-like
+              size: num_species, or num_states X num_species for a batch
+        T: float or array-like
+              temperature, or one temperature per state for a batch
+        check: bool
+              validate temperature, concentrations, rate and stoichiometric coefficients
+              (optional; default: not self.trusted)
+
+        Returns
+        -------
+        (np.ndarray, np.ndarray)
+               a tuple of (d(reaction rates)/d(concs), d(reaction rates)/dT)
+               size: (num_species X num_species, num_species), or with a leading num_states axis for a batch;
+               element [i, k] of the first one is the derivative of the rate of species i w.r.t. concentration k
+
+        Examples
+        --------
+        >>> from .parser import DataParser
+        >>> from .nasa import NASACoeffs
+        >>> nasa = NASACoeffs()
+        >>> data_parser = DataParser()
+        >>> reaction_data = data_parser.parse_file("chemkin/example_data/rxns.xml", nasa)
+        >>> d_concs, d_T = reaction_data.get_jacobian([1,2,3,4,5,6], 1500)
+        >>> d_concs.shape, d_T.shape
+        ((6, 6), (6,))
+        """
+        concs = np.array(concs, dtype=float)
+        if concs.ndim not in (1, 2) or concs.shape[-1] != self.I:
+            raise ValueError("concs must be a list of concentrations of size {}".format(self.I))
+        try:
+            T = np.broadcast_to(np.asarray(T, dtype=float), concs.shape[:-1])
+        except ValueError:
+            raise ValueError("T must be a scalar or an array of size {}".format(concs.shape[0]))
+        if self.unsupported_type is not None:
+            raise NotImplementedError("Progress rate for {} reactions is not supported.".format(self.unsupported_type))
+
+        check = self._checked(check)
+        kf = self.get_k(T, check)
+        dlnkf_dT = self.rate_coeffs.get_dlnK_dT(T, check)
+        dkf_dT = kf * dlnkf_dT
+        kb, dlnKc_dT = self.__backward(kf, None, T)
+        dkb_dT = np.zeros_like(kf)
+        if dlnKc_dT is not None:
+            # use d(ln kf)/dT directly, dkf_dT / kf is 0/0 when kf underflows
+            rev = self.reversible
+            dkb_dT[..., rev] = kb[..., rev] * (dlnkf_dT[..., rev] - dlnKc_dT)
+
+        ones = np.ones(self.J)
+        forward_part = self.__progress_rate('react', concs, ones, check)
+        backward_part = self.__progress_rate('prod', concs, ones, check)
+
+        # dense or sparse, following the compiled stoichiometry
+        d_concs = self.stoichiometry.jacobian(concs, kf, kb)
+        d_T = self.__reaction_rate(dkf_dT * forward_part - dkb_dT * backward_part)
+        return d_concs, d_T
+
+    def __progress_rate(self, which, concs, k, check=True):
+        """
+        Returns the progress rate of a system of elementary reactions
+
+        Parameters
+        ----------
+        which: str
+              'react' for the forward (reactant) or 'prod' for the backward (product) part
+        concs: np.ndarray
+              size: num_species, or num_states X num_species
+              concentration of species
+        k: np.ndarray
+              size: num_reactions, or num_states X num_reactions
               Reaction rate coefficient for the reaction
+        check: bool
+              validate k, concs and the stoichiometric coefficients
 
         Returns
         -------
         np.ndarray
-               size: num_reactions
+               size: num_reactions, or num_states X num_reactions
                progress rate of each reaction
         """
-        progress = k.copy()  # Initialize progress rates with reaction rate coefficients
-        for jdx, rj in enumerate(progress):
-            if rj < 0:
-                raise ValueError("k = {0:18.16e}:  Negative reaction rate coefficients are prohibited!".format(rj))
-            for idx, xi in enumerate(concs):
-                nu_ij = nu_react[idx, jdx]
-                if xi < 0.0:
-                    raise ValueError("x{0} = {1:18.16e}:  Negative concentrations are prohibited!".format(idx, xi))
-                if nu_ij < 0:
-                    raise ValueError(
-                        "nu_{0}{1} = {2}:  Negative stoichiometric coefficients are prohibited!".format(idx, jdx,
-                                                                                                        nu_ij))
-                progress[jdx] *= xi ** nu_ij
-        return progress
-
-    def __reaction_rate(self, nu_react, nu_prod, rj):
+        if not check:
+            return k * self.stoichiometry.powers_product(concs, which)
+        negative = np.argwhere(k < 0)
+        if len(negative) > 0:
+            raise ValueError(
+                "k = {0:18.16e}:  Negative reaction rate coefficients are prohibited!".format(k[tuple(negative[0])]))
+        negative = np.argwhere(concs < 0.0)
+        if len(negative) > 0:
+            idx = negative[0][-1]
+            raise ValueError("x{0} = {1:18.16e}:  Negative concentrations are prohibited!".format(
+                idx, concs[tuple(negative[0])]))
+        if self._stoichiometry_errors[which] is not None:
+            raise ValueError(self._stoichiometry_errors[which])
+        # product over species of x_i ** nu_ij for every reaction at once
+        return k * self.stoichiometry.powers_product(concs, which)
+
+    def __reaction_rate(self, rj):
         """
         Returns the reaction rate of a system of elementary reactions
 
         Parameters
         ----------
-        nu_react: np.ndarray
-              size: num_species X num_reactions
-              stoichiometric coefficients for the reactants
-        nu_prod:  np.ndarray
-              size: num_species X num_reactions
-              stoichiometric coefficients for the products
         rj:    np.ndarray
-            progress rates for the reactions
+            progress rates for the reactions (size: num_reactions, or num_states X num_reactions)
 
         Returns
         -------
         np.ndarray
-           size: num_species
+           size: num_species, or num_states X num_species
            reaction rate of each specie
         """
-        nu = nu_prod - nu_react
-        return np.dot(nu, rj)
+        return self.stoichiometry.reaction_rates(np.asarray(rj))
+
+    @property
+    def nbytes(self):
+        return (self._arrays_nbytes + _nbytes(vars(self.stoichiometry)) + _nbytes(self._dense)
+                + _nbytes([self.nasa_coeffs, self.nasa_tmin, self.nasa_tmid, self.nasa_tmax]))
 
     def __len__(self):
         return self.J
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # memoized rate coefficients are not worth their size in pickles; keep an empty cache
+        if self.rate_cache is not None:
+            state['rate_cache'] = LRUCache(self.rate_cache.maxsize)
+        return state
+
+    def __setstate__(self, state):
+        # pickling does not preserve the read-only flag of arrays
+        self.__dict__.update(state)
+        _freeze(self.reversible)
+        _freeze(self._dense)
+
 
 class Reaction:
     def __init__(self, id, reversible, type_, reactants, products, rate_coeff, equation):
@@ -350,3 +908,100 @@ class Reaction:
         self.products = products
         self.rate_coeff = rate_coeff
         self.equation = equation
+
+
+class ReactionArrays:
+    """
+    Columnar description of the reactions of a mechanism
+
+    Attributes
+    ----------
+    ids, equations, types: List[str]
+        identifier, equation and type of each reaction
+    reversible: np.ndarray
+        size: num_reactions, mask of reversible reactions
+    entries: dict
+        'react' and 'prod' to (species indices, reaction indices, coefficients) arrays
+    rate_groups: List[(type, np.ndarray, List[np.ndarray])]
+        (rate coefficient type, reaction indices, parameter arrays in the order of `param_names`)
+    rate_others: List[(int, RateCoeff)]
+        (reaction index, rate coefficient) for types that can not be vectorized
+    """
+
+    def __init__(self, ids, equations, types, reversible, entries, rate_groups, rate_others=()):
+        self.ids = ids
+        self.equations = equations
+        self.types = types
+        self.reversible = np.asarray(reversible, dtype=bool)
+        self.entries = entries
+        self.rate_groups = rate_groups
+        self.rate_others = list(rate_others)
+
+    @property
+    def J(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        """
+        Estimated size of the columns: their arrays and the characters of their strings
+        """
+        strings = sum(len(text) for column in (self.ids, self.equations, self.types) for text in column)
+        groups = [(indices, params) for (_, indices, params) in self.rate_groups]
+        return strings + _nbytes([self.reversible, self.entries, groups])
+
+    @classmethod
+    def from_reactions(cls, reactions, species_index):
+        """
+        Collect the columns of a list of reactions
+
+        Parameters
+        ----------
+        reactions: List[Reaction]
+            list of reactions
+        species_index: dict
+            species name to index
+
+        Returns
+        -------
+        ReactionArrays
+        """
+        entries = {'react': ([], [], []), 'prod': ([], [], [])}
+        for (j, reaction) in enumerate(reactions):
+            for which, coeffs in (('react', reaction.reactants), ('prod', reaction.products)):
+                rows, cols, values = entries[which]
+                for name, coeff in coeffs.items():
+                    rows.append(species_index[name])
+                    cols.append(j)
+                    values.append(float(coeff))
+        entries = {which: (np.array(rows, dtype=int), np.array(cols, dtype=int), np.array(values, dtype=float))
+                   for which, (rows, cols, values) in entries.items()}
+        rate_coeffs = RateCoeffSet([reaction.rate_coeff for reaction in reactions])
+        return cls([r.id for r in reactions], [r.equation for r in reactions], [r.type for r in reactions],
+                   [r.reversible for r in reactions], entries, rate_coeffs.groups, rate_coeffs.others)
+
+    def to_reactions(self, species):
+        """
+        Build the Reaction objects described by the columns
+
+        Parameters
+        ----------
+        species: List[str]
+            names of the species the indices refer to
+
+        Returns
+        -------
+        List[Reaction]
+        """
+        coeffs = {which: [{} for _ in range(self.J)] for which in self.entries}
+        for which, (rows, cols, values) in self.entries.items():
+            for i, j, v in zip(rows, cols, values):
+                coeffs[which][j][species[i]] = float(v)
+        rate_coeffs = [None] * self.J
+        for rc_type, indices, params in self.rate_groups:
+            for n, j in enumerate(indices):
+                rate_coeffs[j] = rc_type(*[float(p[n]) for p in params])
+        for j, rc in self.rate_others:
+            rate_coeffs[j] = rc
+        return [Reaction(self.ids[j], bool(self.reversible[j]), self.types[j], coeffs['react'][j], coeffs['prod'][j],
+                         rate_coeffs[j], self.equations[j]) for j in range(self.J)]
@@ -0,0 +1,462 @@
+import h5py
+import numpy as np
+from scipy.linalg import lu_factor, lu_solve
+
+from . import thermochem
+
+# variable order BDF (orders 1-5) in the quasi-constant step size, difference array formulation
+MAX_ORDER = 5
+NEWTON_MAXITER = 4
+MIN_FACTOR = 0.2
+MAX_FACTOR = 10
+_KAPPA = np.array([0, -0.1850, -1 / 9, -0.0823, -0.0415, 0])
+_GAMMA = np.hstack((0, np.cumsum(1 / np.arange(1, MAX_ORDER + 1))))
+_ALPHA = (1 - _KAPPA) * _GAMMA
+_ERROR_CONST = _KAPPA * _GAMMA + 1 / np.arange(1, MAX_ORDER + 2)
+# raised when the right hand side or its Jacobian can not be evaluated at a trial state, e.g. a
+# temperature outside the range of the NASA polynomials; the step is retried with a smaller size
+_EVALUATION_ERRORS = (ValueError, NotImplementedError, ArithmeticError, np.linalg.LinAlgError)
+
+
+def _rms(x):
+    """
+    Root mean square norm used for error control
+    """
+    return np.linalg.norm(x) / np.sqrt(x.size)
+
+
+def _compute_R(order, factor):
+    """
+    Matrix for rescaling the difference array when the step size changes by factor
+    """
+    I = np.arange(1, order + 1)[:, np.newaxis]
+    J = np.arange(1, order + 1)
+    M = np.zeros((order + 1, order + 1))
+    M[1:, 1:] = (I - 1 - factor * J) / I
+    M[0] = 1
+    return np.cumprod(M, axis=0)
+
+
+def _change_D(D, order, factor):
+    """
+    Rescale the difference array in place for a step size change by factor
+    """
+    R = _compute_R(order, factor)
+    U = _compute_R(order, 1)
+    RU = R.dot(U)
+    D[:order + 1] = np.dot(RU.T, D[:order + 1])
+
+
+class ReactorResult:
+    """
+    Trajectory of a batch reactor integration
+
+    Attributes
+    ----------
+    time: np.ndarray
+        size: num_times
+    concs: np.ndarray
+        size: num_times X num_species, concentration of species
+    temperature: np.ndarray
+        size: num_times
+    species: List[str]
+        names of species (columns of concs)
+    stats: dict
+        integrator statistics: steps, rejected_steps, rhs_evaluations, jacobian_evaluations,
+        factorizations and newton_iterations
+    """
+
+    def __init__(self, time, concs, temperature, species, stats):
+        self.time = time
+        self.concs = concs
+        self.temperature = temperature
+        self.species = species
+        self.stats = stats
+
+    def ignition(self):
+        """
+        Returns the ignition point, defined as the time of the steepest temperature rise
+
+        Returns
+        -------
+        np.ndarray
+            [ignition time, temperature at ignition]
+        """
+        if len(self.time) < 2:
+            return np.array([self.time[0], self.temperature[0]])
+        n = np.argmax(np.diff(self.temperature) / np.diff(self.time))
+        return np.array([self.time[n], self.temperature[n]])
+
+    def save(self, file, scenario, parameters=None):
+        """
+        Write the trajectory to an hdf5 file in the layout read by chemkin.time_evo.TimeEvo
+
+        The scenario group holds 'time', 'truth' (concentrations followed by temperature as the last column)
+        and 'ignition' ([time, temperature]) datasets.
+
+        Parameters
+        ----------
+        file: str
+            path to the hdf5 file, created if it does not exist
+        scenario: str
+            name of the scenario group, replaced if it exists
+        parameters: array-like
+            optional scenario parameters stored as the 'Scenario Parameters' attribute of 'truth'
+        """
+        with h5py.File(file, 'a') as f:
+            if scenario in f:
+                del f[scenario]
+            group = f.create_group(scenario)
+            group.create_dataset('time', data=self.time)
+            truth = group.create_dataset('truth', data=np.column_stack([self.concs, self.temperature]))
+            group.create_dataset('ignition', data=self.ignition())
+            if parameters is not None:
+                truth.attrs['Scenario Parameters'] = np.asarray(parameters, dtype=float)
+
+
+class BatchReactor:
+    """
+    Homogeneous, closed batch reactor integrated in time with a stiff (BDF) integrator
+
+    Attributes
+    ----------
+    reaction_data: chemkin.reaction.ReactionData
+        mechanism driving the reactor
+    mode: str
+        'volume' for a constant-volume or 'pressure' for a constant-pressure (ideal gas) reactor
+    energy: bool
+        solve the adiabatic energy equation (requires NASA coefficients of every species);
+        when False the reactor is isothermal
+    rtol, atol: float
+        relative and absolute error tolerances
+    max_step: float
+        maximum step size
+
+    Examples
+    --------
+    >>> from .parser import DataParser
+    >>> from .nasa import NASACoeffs
+    >>> reaction_data = DataParser().parse_file("chemkin/example_data/rxnset_long.xml", NASACoeffs())
+    >>> result = BatchReactor(reaction_data).integrate([1, 1, 0, 2, 0, 1, 0, 0], 1000, 1e-4)
+    >>> result.concs.shape[1], result.stats['steps'] > 0
+    (8, True)
+    """
+
+    def __init__(self, reaction_data, mode='volume', energy=False, rtol=1e-6, atol=1e-12, max_step=np.inf):
+        """
+        Create a new batch reactor
+
+        Parameters
+        ----------
+        reaction_data: chemkin.reaction.ReactionData
+            mechanism driving the reactor
+        mode: str
+            'volume' (constant volume) or 'pressure' (constant pressure)
+        energy: bool
+            solve the adiabatic energy equation instead of holding the temperature constant
+        rtol, atol: float
+            relative and absolute error tolerances
+        max_step: float
+            maximum step size
+        """
+        if mode not in ('volume', 'pressure'):
+            raise ValueError("mode must be 'volume' or 'pressure'")
+        if energy and not reaction_data.nasa_known.all():
+            raise ValueError("The energy equation requires NASA coefficients for every species")
+        self.reaction_data = reaction_data
+        self.mode = mode
+        self.energy = energy
+        self.rtol = rtol
+        self.atol = atol
+        self.max_step = max_step
+        self._stats = None
+        # last failed evaluation of a rejected trial state, reported if the step size collapses
+        self._evaluation_error = None
+
+    def _thermo(self, T):
+        """
+        Returns (H/RT, Cp/R) of every species at temperature T
+        """
+        nasa = self.reaction_data.get_nasa_coeff_matrix(T, all_species=True)
+        tc = thermochem.ThermoChem(thermochem.ThermochemRXNSetWrapper(nasa), T)
+        return tc.h_rt, tc.Cp_over_R(T)
+
+    def _rhs(self, y):
+        """
+        Time derivative of the state y = [concs..., T]
+        """
+        self._stats['rhs_evaluations'] += 1
+        concs = y[:-1]
+        T = y[-1]
+        omega = self.reaction_data.get_reaction_rate(self.reaction_data.get_progress_rate(concs, T, check=False))
+        dT = 0.0
+        if self.energy:
+            h_rt, cp_r = self._thermo(T)
+            if self.mode == 'volume':
+                dT = -T * np.dot(h_rt - 1, omega) / np.dot(concs, cp_r - 1)
+            else:
+                dT = -T * np.dot(h_rt, omega) / np.dot(concs, cp_r)
+        dconcs = omega
+        if self.mode == 'pressure':
+            dconcs = omega - concs * (np.sum(omega) / np.sum(concs) + dT / T)
+        return np.append(dconcs, dT)
+
+    def _jacobian(self, y):
+        """
+        Jacobian of _rhs; exact in the concentrations, the temperature dependence of the heat
+        capacities and enthalpies is neglected in the energy equation terms
+        """
+        self._stats['jacobian_evaluations'] += 1
+        concs = y[:-1]
+        T = y[-1]
+        I = len(concs)
+        d_concs, d_T = self.reaction_data.get_jacobian(concs, T, check=False)
+        jac = np.zeros((I + 1, I + 1))
+        jac[:I, :I] = d_concs
+        jac[:I, I] = d_T
+        if not self.energy and self.mode == 'volume':
+            return jac
+
+        omega = self.reaction_data.get_reaction_rate(self.reaction_data.get_progress_rate(concs, T, check=False))
+        dT = 0.0
+        if self.energy:
+            h_rt, cp_r = self._thermo(T)
+            if self.mode == 'volume':
+                u, cv = h_rt - 1, cp_r - 1
+            else:
+                u, cv = h_rt, cp_r
+            heat = np.dot(concs, cv)
+            dT = -T * np.dot(u, omega) / heat
+            jac[I, :I] = (-T * np.dot(u, d_concs) - dT * cv) / heat
+            jac[I, I] = dT / T - T * np.dot(u, d_T) / heat
+        if self.mode == 'pressure':
+            total = np.sum(concs)
+            dilution = np.sum(omega) / total + dT / T
+            d_dilution = np.append(np.sum(d_concs, axis=0) / total - np.sum(omega) / total ** 2, 0.0)
+            d_dilution += jac[I] / T
+            d_dilution[I] = np.sum(d_T) / total + jac[I, I] / T - dT / T ** 2
+            jac[:I] -= np.outer(concs, d_dilution)
+            jac[np.arange(I), np.arange(I)] -= dilution
+        return jac
+
+    def _initial_step(self, y0, f0, t_span):
+        """
+        Empirical initial step size (Hairer, Norsett & Wanner)
+        """
+        scale = self.atol + np.abs(y0) * self.rtol
+        d0 = _rms(y0 / scale)
+        d1 = _rms(f0 / scale)
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+        h0 = min(h0, t_span)
+        try:
+            f1 = self._rhs(y0 + h0 * f0)
+        except _EVALUATION_ERRORS:
+            return min(h0 * 1e-3, t_span, self.max_step)
+        d2 = _rms((f1 - f0) / scale) / h0
+        if d1 <= 1e-15 and d2 <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2)) ** 0.5
+        return min(100 * h0, h1, t_span, self.max_step)
+
+    def _solve_newton(self, y_predict, c, psi, lu, scale, tol):
+        """
+        Simplified Newton iterations for the implicit BDF equation
+        """
+        d = 0
+        y = y_predict.copy()
+        dy_norm_old = None
+        converged = False
+        for k in range(NEWTON_MAXITER):
+            try:
+                f = self._rhs(y)
+            except _EVALUATION_ERRORS as err:
+                self._evaluation_error = err
+                break
+            if not np.all(np.isfinite(f)):
+                break
+            dy = lu_solve(lu, c * f - psi - d, check_finite=False)
+            if not np.all(np.isfinite(dy)):
+                # singular iteration matrix
+                break
+            dy_norm = _rms(dy / scale)
+            rate = None if dy_norm_old is None else dy_norm / dy_norm_old
+            if rate is not None and (rate >= 1 or rate ** (NEWTON_MAXITER - k) / (1 - rate) * dy_norm > tol):
+                break
+            y += dy
+            d += dy
+            if dy_norm == 0 or rate is not None and rate / (1 - rate) * dy_norm < tol:
+                converged = True
+                break
+            dy_norm_old = dy_norm
+        self._stats['newton_iterations'] += k + 1
+        return converged, k + 1, y, d
+
+    def integrate(self, concs, T, t_end, t_eval=None, max_steps=100000):
+        """
+        Evolve the mixture from time 0 to t_end
+
+        Parameters
+        ----------
+        concs: array-like
+            initial concentration of species
+        T: float
+            initial temperature
+        t_end: float
+            final time
+        t_eval: array-like
+            times at which the state is reported (interpolated); every accepted step if None
+        max_steps: int
+            maximum number of steps before giving up
+
+        Returns
+        -------
+        ReactorResult
+            trajectory and integrator statistics
+        """
+        rd = self.reaction_data
+        y = np.append(np.array(concs, dtype=float), float(T))
+        if len(y) != rd.I + 1:
+            raise ValueError("concs must be a list of concentrations of size {}".format(rd.I))
+        if np.any(y[:-1] < 0) or y[-1] <= 0:
+            raise ValueError("Initial concentrations must be non-negative and temperature positive")
+        if t_end <= 0:
+            raise ValueError("t_end must be positive")
+        n = len(y)
+        self._stats = {'steps': 0, 'rejected_steps': 0, 'rhs_evaluations': 0, 'jacobian_evaluations': 0,
+                       'factorizations': 0, 'newton_iterations': 0}
+        self._evaluation_error = None
+        newton_tol = max(10 * np.finfo(float).eps / self.rtol, min(0.03, self.rtol ** 0.5))
+
+        t = 0.0
+        f = self._rhs(y)
+        h_abs = self._initial_step(y, f, t_end)
+        D = np.zeros((MAX_ORDER + 3, n))
+        D[0] = y
+        D[1] = f * h_abs
+        order = 1
+        n_equal_steps = 0
+        jac = self._jacobian(y)
+        lu = None
+
+        if t_eval is None:
+            times, states = [t], [y.copy()]
+        else:
+            t_eval = np.asarray(t_eval, dtype=float)
+            times, states = [], []
+            next_eval = 0
+            while next_eval < len(t_eval) and t_eval[next_eval] <= t:
+                times.append(t_eval[next_eval])
+                states.append(y.copy())
+                next_eval += 1
+
+        while t < t_end:
+            if self._stats['steps'] >= max_steps:
+                raise RuntimeError("Maximum number of steps ({}) exceeded at t={}".format(max_steps, t))
+            min_step = 10 * np.abs(np.nextafter(t, np.inf) - t)
+            if h_abs > self.max_step:
+                _change_D(D, order, self.max_step / h_abs)
+                h_abs = self.max_step
+                n_equal_steps = 0
+                lu = None
+            current_jac = False
+            step_accepted = False
+            while not step_accepted:
+                if h_abs < min_step:
+                    reason = "" if self._evaluation_error is None else " ({})".format(self._evaluation_error)
+                    raise RuntimeError("Step size became too small at t={}{}".format(t, reason))
+                t_new = t + h_abs
+                if t_new > t_end:
+                    t_new = t_end
+                    _change_D(D, order, (t_new - t) / h_abs)
+                    n_equal_steps = 0
+                    lu = None
+                h = t_new - t
+                h_abs = h
+
+                y_predict = np.sum(D[:order + 1], axis=0)
+                scale = self.atol + self.rtol * np.abs(y_predict)
+                psi = np.dot(D[1:order + 1].T, _GAMMA[1:order + 1]) / _ALPHA[order]
+                c = h / _ALPHA[order]
+
+                converged = False
+                while not converged:
+                    if lu is None:
+                        self._stats['factorizations'] += 1
+                        try:
+                            lu = lu_factor(np.eye(n) - c * jac)
+                        except (np.linalg.LinAlgError, ValueError):
+                            break
+                    converged, n_iter, y_new, d = self._solve_newton(y_predict, c, psi, lu, scale, newton_tol)
+                    if not converged:
+                        if current_jac:
+                            break
+                        try:
+                            jac = self._jacobian(y_predict)
+                        except _EVALUATION_ERRORS as err:
+                            # handled like a failed Newton iteration: reject the step
+                            self._evaluation_error = err
+                            break
+                        lu = None
+                        current_jac = True
+
+                if not converged:
+                    self._stats['rejected_steps'] += 1
+                    h_abs *= 0.5
+                    _change_D(D, order, 0.5)
+                    n_equal_steps = 0
+                    lu = None
+                    continue
+
+                safety = 0.9 * (2 * NEWTON_MAXITER + 1) / (2 * NEWTON_MAXITER + n_iter)
+                scale = self.atol + self.rtol * np.abs(y_new)
+                error_norm = _rms(_ERROR_CONST[order] * d / scale)
+                if error_norm > 1:
+                    self._stats['rejected_steps'] += 1
+                    factor = max(MIN_FACTOR, safety * error_norm ** (-1 / (order + 1)))
+                    h_abs *= factor
+                    _change_D(D, order, factor)
+                    n_equal_steps = 0
+                else:
+                    step_accepted = True
+
+            self._stats['steps'] += 1
+            self._evaluation_error = None
+            n_equal_steps += 1
+            t = t_new
+
+            D[order + 2] = d - D[order + 1]
+            D[order + 1] = d
+            for i in reversed(range(order + 1)):
+                D[i] += D[i + 1]
+
+            if t_eval is None:
+                times.append(t)
+                states.append(y_new.copy())
+            else:
+                # interpolate the requested outputs inside the step from the BDF polynomial
+                t_shift = t - h * np.arange(order)
+                denom = h * (1 + np.arange(order))
+                while next_eval < len(t_eval) and t_eval[next_eval] <= t:
+                    p = np.cumprod((t_eval[next_eval] - t_shift) / denom)
+                    times.append(t_eval[next_eval])
+                    states.append(np.dot(D[1:order + 1].T, p) + D[0])
+                    next_eval += 1
+
+            if n_equal_steps < order + 1:
+                continue
+
+            error_m_norm = _rms(_ERROR_CONST[order - 1] * D[order] / scale) if order > 1 else np.inf
+            error_p_norm = _rms(_ERROR_CONST[order + 1] * D[order + 2] / scale) if order < MAX_ORDER else np.inf
+            error_norms = np.array([error_m_norm, error_norm, error_p_norm])
+            with np.errstate(divide='ignore'):
+                factors = error_norms ** (-1 / np.arange(order, order + 3))
+            order += int(np.argmax(factors)) - 1
+            factor = min(MAX_FACTOR, safety * np.max(factors))
+            h_abs *= factor
+            _change_D(D, order, factor)
+            n_equal_steps = 0
+            lu = None
+
+        states = np.array(states).reshape(len(times), n)
+        return ReactorResult(np.array(times), states[:, :-1], states[:, -1], list(rd.species), dict(self._stats))
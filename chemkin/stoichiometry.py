@@ -0,0 +1,422 @@
+import numpy as np
+
+
+def _read_only(array):
+    """
+    Mark a numpy array as read-only and return it
+    """
+    array.setflags(write=False)
+    return array
+
+
+def _freeze(value):
+    """
+    Mark the numpy arrays in value, or in a tuple or dict of them, as read-only
+    """
+    if isinstance(value, np.ndarray):
+        _read_only(value)
+    elif isinstance(value, tuple):
+        for item in value:
+            _freeze(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+
+
+def _segment_reduce(ufunc, values, pointers, identity):
+    """
+    Reduce values[..., pointers[n]:pointers[n + 1]] with ufunc for every segment n
+
+    Parameters
+    ----------
+    ufunc: np.ufunc
+        np.add or np.multiply
+    values: np.ndarray
+        size: ... X num_entries, entries sorted by segment
+    pointers: np.ndarray
+        size: num_segments + 1, start of every segment and the total number of entries
+    identity: float
+        result of empty segments
+
+    Returns
+    -------
+    np.ndarray
+        size: ... X num_segments
+    """
+    result = np.full(values.shape[:-1] + (len(pointers) - 1,), identity, dtype=float)
+    nonempty = pointers[:-1] < pointers[1:]
+    if nonempty.any():
+        # empty segments have zero length, so the starts of the non-empty ones delimit them exactly
+        result[..., nonempty] = ufunc.reduceat(values, pointers[:-1][nonempty], axis=-1)
+    return result
+
+
+def _power_derivative(nu, concs):
+    """
+    Returns the derivatives of prod_l(x_l ** nu_lj) w.r.t. every concentration x_k
+
+    Parameters
+    ----------
+    nu: np.ndarray
+        size: num_species X num_reactions
+    concs: np.ndarray
+        size: num_species, or num_states X num_species
+
+    Returns
+    -------
+    np.ndarray
+        size: num_species X num_reactions, or num_states X num_species X num_reactions
+    """
+    powers = concs[..., np.newaxis] ** nu
+    # products over all other species, from exclusive prefix and suffix products (safe for zero concentrations)
+    ones = np.ones(powers.shape[:-2] + (1, nu.shape[1]))
+    prefix = np.cumprod(np.concatenate([ones, powers[..., :-1, :]], axis=-2), axis=-2)
+    suffix = np.cumprod(np.concatenate([ones, powers[..., :0:-1, :]], axis=-2), axis=-2)[..., ::-1, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_power = np.where(nu > 0, nu * concs[..., np.newaxis] ** (nu - 1), 0.0)
+    return d_power * prefix * suffix
+
+
+def _ranges(starts, lengths):
+    """
+    Returns the concatenation of np.arange(start, start + length) for every start and length
+    """
+    ends = np.cumsum(lengths)
+    return np.repeat(starts - ends + lengths, lengths) + np.arange(ends[-1] if len(ends) else 0)
+
+
+class Stoichiometry:
+    """
+    Stoichiometric coefficients of a mechanism
+
+    Subclasses implement the kernels the rate and thermochemistry computations need:
+    `powers_product`, `reaction_rates`, `reaction_sums` and `jacobian`.
+
+    Attributes
+    ----------
+    I: int
+        number of species
+    J: int
+        number of reactions
+    gamma: np.ndarray
+        size: num_reactions, read-only net change of moles of each reaction
+    reversible_species: np.ndarray
+        size: num_species, read-only mask of species taking part in a reversible reaction
+    """
+
+    def __init__(self, I, J, entries, reversible):
+        """
+        Build the representation from the stoichiometric coefficients in coordinate format
+
+        Parameters
+        ----------
+        I: int
+            number of species
+        J: int
+            number of reactions
+        entries: dict
+            'react' and 'prod' to (species indices, reaction indices, coefficients) arrays;
+            zero coefficients are dropped
+        reversible: np.ndarray
+            size: num_reactions, mask of reversible reactions
+        """
+        self.I = I
+        self.J = J
+        self._entries = {}
+        for which in ('react', 'prod'):
+            rows, cols, values = (np.asarray(a) for a in entries[which])
+            nonzero = values != 0
+            self._entries[which] = (rows[nonzero].astype(int), cols[nonzero].astype(int),
+                                    values[nonzero].astype(float))
+        reversible_species = np.zeros(self.I, dtype=bool)
+        gamma = np.zeros(self.J)
+        for which, sign in (('prod', 1.0), ('react', -1.0)):
+            rows, cols, values = self._entries[which]
+            reversible_species[rows[np.asarray(reversible, dtype=bool)[cols]]] = True
+            np.add.at(gamma, cols, sign * values)
+        self.reversible_species = _read_only(reversible_species)
+        self.gamma = _read_only(gamma)
+
+    def __setstate__(self, state):
+        # pickling does not preserve the read-only flag of arrays
+        self.__dict__.update(state)
+        for value in state.values():
+            _freeze(value)
+
+    def powers_product(self, concs, which):
+        """
+        Returns prod_i(x_i ** nu_ij) for every reaction j
+
+        Parameters
+        ----------
+        concs: np.ndarray
+            size: num_species, or num_states X num_species
+        which: str
+            'react' for reactant or 'prod' for product coefficients
+
+        Returns
+        -------
+        np.ndarray
+            size: num_reactions, or num_states X num_reactions
+        """
+        raise NotImplementedError()
+
+    def reaction_rates(self, rj):
+        """
+        Returns sum_j(nu_ij * r_j) for every species i
+
+        Parameters
+        ----------
+        rj: np.ndarray
+            size: num_reactions, or num_states X num_reactions
+
+        Returns
+        -------
+        np.ndarray
+            size: num_species, or num_states X num_species
+        """
+        raise NotImplementedError()
+
+    def reaction_sums(self, x):
+        """
+        Returns sum_i(nu_ij * x_i) for every reaction j, e.g. the change of enthalpy of every reaction
+
+        Parameters
+        ----------
+        x: np.ndarray
+            size: ... X num_species
+
+        Returns
+        -------
+        np.ndarray
+            size: ... X num_reactions
+        """
+        raise NotImplementedError()
+
+    def jacobian(self, concs, kf, kb):
+        """
+        Returns the derivatives of the reaction rates w.r.t. the concentrations,
+        sum_j(nu_ij * d(kf_j * prod_l(x_l ** react_lj) - kb_j * prod_l(x_l ** prod_lj))/d(x_k))
+
+        Parameters
+        ----------
+        concs: np.ndarray
+            size: num_species, or num_states X num_species
+        kf, kb: np.ndarray
+            size: num_reactions, or num_states X num_reactions, forward and backward rate coefficients
+
+        Returns
+        -------
+        np.ndarray
+            size: num_species X num_species, or num_states X num_species X num_species, indexed [..., i, k]
+        """
+        raise NotImplementedError()
+
+    def first_negative(self, which):
+        """
+        Returns (species index, reaction index, coefficient) of the first negative 'react' or 'prod'
+        coefficient, or None if there is none
+        """
+        raise NotImplementedError()
+
+    def to_dense(self, which):
+        """
+        Returns the dense num_species X num_reactions matrix of 'react', 'prod' or 'nu' (prod - react) coefficients
+        """
+        if which == 'nu':
+            return self.to_dense('prod') - self.to_dense('react')
+        result = np.zeros((self.I, self.J))
+        rows, cols, values = self._entries[which]
+        np.add.at(result, (rows, cols), values)
+        return result
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the arrays of the representation, in bytes
+        """
+        raise NotImplementedError()
+
+
+class DenseStoichiometry(Stoichiometry):
+    """
+    Stoichiometric coefficients stored as dense num_species X num_reactions matrices
+
+    Attributes
+    ----------
+    nu_react, nu_prod, nu: np.ndarray
+        size: num_species X num_reactions, read-only
+    """
+
+    def __init__(self, I, J, entries, reversible):
+        super().__init__(I, J, entries, reversible)
+        self.nu_react = _read_only(Stoichiometry.to_dense(self, 'react'))
+        self.nu_prod = _read_only(Stoichiometry.to_dense(self, 'prod'))
+        self.nu = _read_only(self.nu_prod - self.nu_react)
+        del self._entries
+
+    def powers_product(self, concs, which):
+        nu = self.nu_react if which == 'react' else self.nu_prod
+        return np.prod(concs[..., np.newaxis] ** nu, axis=-2)
+
+    def reaction_rates(self, rj):
+        return np.dot(rj, self.nu.T)
+
+    def reaction_sums(self, x):
+        return np.dot(x, self.nu)
+
+    def jacobian(self, concs, kf, kb):
+        # d(progress rate j)/d(conc k), stored as [..., k, j]
+        d_progress = (kf[..., np.newaxis, :] * _power_derivative(self.nu_react, concs)
+                      - kb[..., np.newaxis, :] * _power_derivative(self.nu_prod, concs))
+        return np.einsum('ij,...kj->...ik', self.nu, d_progress)
+
+    def to_dense(self, which):
+        return {'react': self.nu_react, 'prod': self.nu_prod, 'nu': self.nu}[which]
+
+    def first_negative(self, which):
+        negative = np.argwhere(self.to_dense(which) < 0)
+        if len(negative) == 0:
+            return None
+        i, j = negative[0]
+        return i, j, self.to_dense(which)[i, j]
+
+    @property
+    def nbytes(self):
+        return self.nu_react.nbytes + self.nu_prod.nbytes + self.nu.nbytes
+
+
+class SparseStoichiometry(Stoichiometry):
+    """
+    Stoichiometric coefficients stored as index lists of the non-zero entries
+
+    Reactant and product coefficients are kept grouped by reaction (compressed sparse columns),
+    the net coefficients nu additionally grouped by species (compressed sparse rows), so that
+    every kernel is a gather followed by a segmented np.multiply/np.add.reduceat.
+    Dense matrices are only built on request (`to_dense`).
+
+    Attributes
+    ----------
+    columns: dict
+        'react', 'prod' and 'nu' to (pointers (num_reactions + 1), species indices, coefficients)
+    nu_rows: (np.ndarray, np.ndarray, np.ndarray)
+        (pointers (num_species + 1), reaction indices, coefficients) of nu grouped by species
+    jacobian_pattern: (np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+        (flat indices i * num_species + k of the non-zero Jacobian entries, pointers, indices of the
+        'react' then 'prod' entries (k, j), coefficients nu_ij) of the terms of every Jacobian entry
+    """
+
+    def __init__(self, I, J, entries, reversible):
+        super().__init__(I, J, entries, reversible)
+        self.columns = {}
+        for which in ('react', 'prod'):
+            rows, cols, values = self._entries[which]
+            self.columns[which] = self._compress(cols, rows, values, self.J)
+        # net coefficients: products minus reactants, merging species on both sides
+        rows = np.concatenate([self._entries['prod'][0], self._entries['react'][0]])
+        cols = np.concatenate([self._entries['prod'][1], self._entries['react'][1]])
+        values = np.concatenate([self._entries['prod'][2], -self._entries['react'][2]])
+        pairs, inverse = np.unique(rows * self.J + cols, return_inverse=True)
+        values = np.bincount(inverse, weights=values, minlength=len(pairs))
+        nonzero = values != 0
+        rows, cols, values = pairs[nonzero] // self.J, pairs[nonzero] % self.J, values[nonzero]
+        self.columns['nu'] = self._compress(cols, rows, values, self.J)
+        self.nu_rows = self._compress(rows, cols, values, self.I)
+        self.jacobian_pattern = self._jacobian_pattern()
+        del self._entries
+
+    def _jacobian_pattern(self):
+        """
+        Pair every 'react' and 'prod' entry (k, j) with the non-zero nu_ij of its reaction, see `jacobian_pattern`
+        """
+        nu_pointers, nu_species, nu_coeffs = self.columns['nu']
+        nu_lengths = np.diff(nu_pointers)
+        targets, entries, coeffs = [], [], []
+        offset = 0
+        for which in ('react', 'prod'):
+            pointers, species, _ = self.columns[which]
+            reactions = np.repeat(np.arange(self.J), np.diff(pointers))
+            lengths = nu_lengths[reactions]
+            entry = np.repeat(np.arange(len(species)), lengths)
+            nu_entry = _ranges(nu_pointers[:-1][reactions], lengths)
+            targets.append(nu_species[nu_entry] * self.I + species[entry])
+            entries.append(entry + offset)
+            coeffs.append(nu_coeffs[nu_entry])
+            offset += len(species)
+        targets, inverse = np.unique(np.concatenate(targets), return_inverse=True)
+        return (_read_only(targets),) + self._compress(inverse, np.concatenate(entries), np.concatenate(coeffs),
+                                                      len(targets))
+
+    @staticmethod
+    def _compress(keys, indices, values, size):
+        """
+        Sort entries by key and return (pointers, indices, values)
+        """
+        keys = np.array(keys, dtype=int)
+        order = np.argsort(keys, kind='mergesort')
+        pointers = np.zeros(size + 1, dtype=int)
+        pointers[1:] = np.cumsum(np.bincount(keys, minlength=size))
+        return (_read_only(pointers), _read_only(np.array(indices, dtype=int)[order]),
+                _read_only(np.array(values, dtype=float)[order]))
+
+    def powers_product(self, concs, which):
+        pointers, species, coeffs = self.columns[which]
+        return _segment_reduce(np.multiply, concs[..., species] ** coeffs, pointers, 1.0)
+
+    def reaction_rates(self, rj):
+        pointers, reactions, coeffs = self.nu_rows
+        return _segment_reduce(np.add, np.asarray(rj)[..., reactions] * coeffs, pointers, 0.0)
+
+    def reaction_sums(self, x):
+        pointers, species, coeffs = self.columns['nu']
+        return _segment_reduce(np.add, np.asarray(x)[..., species] * coeffs, pointers, 0.0)
+
+    def _power_derivatives(self, concs, which):
+        """
+        Returns d(prod_l(x_l ** nu_lj))/d(x_k) for every 'react' or 'prod' entry (k, j), in the order of `columns`
+        """
+        pointers, species, coeffs = self.columns[which]
+        reactions = np.repeat(np.arange(self.J), np.diff(pointers))
+        x = concs[..., species]
+        zero = x == 0
+        products = _segment_reduce(np.multiply, x ** coeffs, pointers, 1.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            derivatives = coeffs * products[..., reactions] / x
+            # x_k = 0: only the power of x_k is differentiated, the other factors are the product of
+            # the non-zero concentrations when x_k is the only zero of its reaction
+            nonzero_products = _segment_reduce(np.multiply, np.where(zero, 1.0, x ** coeffs), pointers, 1.0)
+            num_zeros = _segment_reduce(np.add, zero.astype(float), pointers, 0.0)
+            others = np.where(num_zeros == 1, nonzero_products, 0.0)[..., reactions]
+            at_zero = np.where(coeffs > 0, coeffs * x ** (coeffs - 1), 0.0) * others
+        return np.where(zero, at_zero, derivatives)
+
+    def jacobian(self, concs, kf, kb):
+        targets, pointers, entries, coeffs = self.jacobian_pattern
+        terms = []
+        for which, k in (('react', kf), ('prod', -np.asarray(kb))):
+            reactions = np.repeat(np.arange(self.J), np.diff(self.columns[which][0]))
+            terms.append(k[..., reactions] * self._power_derivatives(concs, which))
+        terms = np.concatenate(terms, axis=-1)
+        result = np.zeros(concs.shape[:-1] + (self.I * self.I,))
+        result[..., targets] = _segment_reduce(np.add, terms[..., entries] * coeffs, pointers, 0.0)
+        return result.reshape(concs.shape[:-1] + (self.I, self.I))
+
+    def first_negative(self, which):
+        pointers, species, coeffs = self.columns[which]
+        negative = np.flatnonzero(coeffs < 0)
+        if len(negative) == 0:
+            return None
+        n = negative[0]
+        return species[n], np.searchsorted(pointers, n, side='right') - 1, coeffs[n]
+
+    def to_dense(self, which):
+        pointers, species, coeffs = self.columns[which]
+        result = np.zeros((self.I, self.J))
+        result[species, np.repeat(np.arange(self.J), np.diff(pointers))] = coeffs
+        return result
+
+    @property
+    def nbytes(self):
+        arrays = [a for column in self.columns.values() for a in column] + list(self.nu_rows) + list(
+            self.jacobian_pattern)
+        return sum(a.nbytes for a in arrays)
@@ -2,6 +2,105 @@
 
 import numpy as np
 
+P0 = 1.0e+05  # Pa
+R = 8.3144598  # J / mol / K
+PROPERTIES = ('Cp_over_R', 'H_over_RT', 'S_over_R')
+
+
+def power_basis(T):
+    """
+    NASA polynomial bases of Cp/R, H/RT and S/R, built once from the powers of T
+
+    Each property is the dot product of its basis with the 7 NASA coefficients.
+
+    Parameters
+    ----------
+    T: float or array-like
+        temperature(s)
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, np.ndarray)
+        size: T.shape + (7,) each, the bases of Cp/R, H/RT and S/R
+    """
+    T = np.asarray(T, dtype=float)
+    T_column = T[..., np.newaxis]
+    powers = T_column ** np.arange(5)  # 1, T, T^2, T^3, T^4
+    zeros = np.zeros_like(T_column)
+    cp = np.concatenate([powers, zeros, zeros], axis=-1)
+    h = np.concatenate([powers / np.arange(1, 6), 1.0 / T_column, zeros], axis=-1)
+    s = np.concatenate([np.log(T_column), powers[..., 1:] / np.arange(1, 5), zeros, np.ones_like(T_column)], axis=-1)
+    return cp, h, s
+
+
+def nasa_properties(coeffs, tmid, T):
+    """
+    Cp/R, H/RT, S/R and G/RT of many species over an array of temperatures
+
+    Every property is one matrix product of its power basis with the low and high range coefficients
+    of all species, followed by the selection of the range of each (temperature, species) pair.
+
+    Parameters
+    ----------
+    coeffs: np.ndarray
+        size: num_species X 2 X 7, low (index 0) and high (index 1) temperature range coefficients
+    tmid: np.ndarray
+        size: num_species, temperatures above which the high range coefficients apply
+    T: float or array-like
+        temperature(s)
+
+    Returns
+    -------
+    dict
+        'Cp_over_R', 'H_over_RT', 'S_over_R' and 'G_over_RT' to arrays of size T.shape + (num_species,)
+
+    Examples
+    --------
+    >>> coeffs = np.zeros((1, 2, 7))
+    >>> coeffs[0, :, 0] = [2.5, 3.5]
+    >>> nasa_properties(coeffs, np.array([1000.0]), [300, 2000])['Cp_over_R'].tolist()
+    [[2.5], [3.5]]
+    """
+    T = np.asarray(T, dtype=float)
+    num_species = coeffs.shape[0]
+    with np.errstate(invalid='ignore'):
+        high = T[..., np.newaxis] > tmid
+    # columns: species 0 low, species 0 high, species 1 low, ...
+    stacked = np.reshape(coeffs, (2 * num_species, 7)).T
+    result = {}
+    for name, basis in zip(PROPERTIES, power_basis(T)):
+        both = np.dot(basis, stacked).reshape(T.shape + (num_species, 2))
+        result[name] = np.where(high, both[..., 1], both[..., 0])
+    result['G_over_RT'] = result['H_over_RT'] - result['S_over_R']
+    return result
+
+
+def equilibrium_constants(delta_G_over_RT, gamma, T, p0=P0, R=R):
+    """
+    Concentration based equilibrium constants of many reactions
+
+    Parameters
+    ----------
+    delta_G_over_RT: np.ndarray
+        size: T.shape + (num_reactions,), change of Gibbs free energy of each reaction
+    gamma: np.ndarray
+        size: num_reactions, net change of moles of each reaction
+    T: float or array-like
+        temperature(s)
+    p0: float
+        reference pressure
+    R: float
+        ideal gas constant
+
+    Returns
+    -------
+    np.ndarray
+        size: T.shape + (num_reactions,)
+    """
+    # Prefactor in Ke
+    fact = p0 / R / np.asarray(T, dtype=float)[..., np.newaxis]
+    return fact ** gamma * np.exp(-delta_G_over_RT)
+
 
 class ThermochemRXNSetWrapper:
     """
@@ -33,36 +132,41 @@ class ThermoChem:
 
     def __init__(self, rxnset, T):
         self.rxnset = rxnset
-        self.p0 = 1.0e+05  # Pa
-        self.R = 8.3144598  # J / mol / K
-        self.h_rt = self.H_over_RT(T)
-        self.s_rt = self.S_over_R(T)
+        self.p0 = P0
+        self.R = R
+        # powers of T are computed once for both properties
+        cp, h, s = power_basis(T)
+        self.h_rt = self._evaluate(h)
+        self.s_rt = self._evaluate(s)
         self.T = T
 
-    def H_over_RT(self, T):
+    def _evaluate(self, basis):
+        """
+        Dot product of a power basis (T.shape + (7,)) with the coefficients of every species
+        """
+        a = self.rxnset.nasa7_coeffs
+        return np.matmul(a, basis[..., np.newaxis])[..., 0]
+
+    def Cp_over_R(self, T):
         # WARNING:  This line will depend on your own data structures!
         # Be careful to get the correct coefficients for the appropriate
         # temperature range.  That is, for T <= Tmid get the low temperature
         # range coeffs and for T > Tmid get the high temperature range coeffs.
-        a = self.rxnset.nasa7_coeffs
+        return self._evaluate(power_basis(T)[0])
 
-        H_RT = (a[:, 0] + a[:, 1] * T / 2.0 + a[:, 2] * T ** 2.0 / 3.0
-                + a[:, 3] * T ** 3.0 / 4.0 + a[:, 4] * T ** 4.0 / 5.0
-                + a[:, 5] / T)
-
-        return H_RT
+    def H_over_RT(self, T):
+        # WARNING:  This line will depend on your own data structures!
+        # Be careful to get the correct coefficients for the appropriate
+        # temperature range.  That is, for T <= Tmid get the low temperature
+        # range coeffs and for T > Tmid get the high temperature range coeffs.
+        return self._evaluate(power_basis(T)[1])
 
     def S_over_R(self, T):
         # WARNING:  This line will depend on your own data structures!
         # Be careful to get the correct coefficients for the appropriate
         # temperature range.  That is, for T <= Tmid get the low temperature
         # range coeffs and for T > Tmid get the high temperature range coeffs.
-        a = self.rxnset.nasa7_coeffs
-
-        S_R = (a[:, 0] * np.log(T) + a[:, 1] * T + a[:, 2] * T ** 2.0 / 2.0
-               + a[:, 3] * T ** 3.0 / 3.0 + a[:, 4] * T ** 4.0 / 4.0 + a[:, 6])
-
-        return S_R
+        return self._evaluate(power_basis(T)[2])
 
     def backward_coeffs(self, nuij, kf):
         gamma = np.sum(nuij, axis=0)
@@ -85,3 +189,49 @@ class ThermoChem:
         kb = fact ** gamma * np.exp(delta_G_over_RT)
 
         return kf / kb
+
+    def backward_coeffs_all(self, nu, kf):
+        """
+        Backward reaction rate coefficients of many reactions in one pass
+
+        Parameters
+        ----------
+        nu: np.ndarray
+            size: num_species X num_reactions
+            stoichiometric coefficients (products - reactants)
+        kf: np.ndarray
+            size: T.shape + (num_reactions,)
+            forward reaction rate coefficients
+
+        Returns
+        -------
+        np.ndarray
+            size: T.shape + (num_reactions,)
+            backward reaction rate coefficients
+        """
+        # Change in enthalpy and entropy for every reaction (and temperature) at once
+        delta_H_over_RT = np.dot(self.h_rt, nu)
+        delta_S_over_R = np.dot(self.s_rt, nu)
+
+        return kf / self.equilibrium_coeffs(delta_H_over_RT, delta_S_over_R, np.sum(nu, axis=0))
+
+    def equilibrium_coeffs(self, delta_H_over_RT, delta_S_over_R, gamma):
+        """
+        Equilibrium constants of many reactions from their changes of enthalpy and entropy
+
+        Parameters
+        ----------
+        delta_H_over_RT: np.ndarray
+            size: T.shape + (num_reactions,)
+        delta_S_over_R: np.ndarray
+            size: T.shape + (num_reactions,)
+        gamma: np.ndarray
+            size: num_reactions, net change of moles of each reaction
+
+        Returns
+        -------
+        np.ndarray
+            size: T.shape + (num_reactions,)
+            equilibrium constants
+        """
+        return equilibrium_constants(delta_H_over_RT - delta_S_over_R, gamma, self.T, self.p0, self.R)
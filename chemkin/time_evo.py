@@ -1,10 +1,6 @@
-import base64
-
 import h5py
-import matplotlib
-from io import BytesIO
 
-matplotlib.use('Agg')
+from chemkin.plot import DEFAULT_DPI, encode_png, get_figure
 
 
 class TimeEvo:
@@ -20,7 +16,7 @@ class TimeEvo:
         self.file = h5py.File(file, 'r')
         self.scenarios = list(self.file.keys())
 
-    def plot(self, scenario, pic_width=16, pic_length=10):
+    def plot(self, scenario, pic_width=16, pic_length=10, dpi=DEFAULT_DPI):
         """
         Returns a base64 encoded image of time temperature evolution of specified scenario
 
@@ -32,6 +28,8 @@ class TimeEvo:
             width of output picture
         pic_length:
             height of output picture
+        dpi:
+            resolution of output picture (optional; default DEFAULT_DPI)
 
         Returns
         -------
@@ -43,17 +41,29 @@ class TimeEvo:
         >>> time_evo = TimeEvo("chemkin/example_data/detailed_profile.h5")
         >>> plot = time_evo.plot(time_evo.scenarios[0], 0.1, 0.1)
         """
-        import matplotlib.pyplot as plt
         data = self.file[scenario + '/truth']
         time = self.file[scenario + '/time']
-        plt.figure(figsize=(pic_width, pic_length))
-        plt.plot(time.value, data.value[:, -1], label="Temperature")
-        plt.xlabel("Time")
-        plt.ylabel("Temp")
-        plt.title("Temperature Evolution")
-        plt.legend()
-        figfile = BytesIO()
-        plt.savefig(figfile, format='png')
-        figfile.seek(0)  # rewind to beginning of file
-        figdata_png = base64.b64encode(figfile.getvalue())
-        return figdata_png.decode('utf8')
+        figure = get_figure(pic_width, pic_length, dpi)
+        ax = figure.add_subplot(111)
+        ax.plot(time[()], data[:, -1], label="Temperature")
+        ax.set_xlabel("Time")
+        ax.set_ylabel("Temp")
+        ax.set_title("Temperature Evolution")
+        ax.legend()
+        return encode_png(figure)
+
+
+def plot_file(file, scenario, pic_width=16, pic_length=10, dpi=DEFAULT_DPI):
+    """
+    Returns a base64 encoded image of time temperature evolution of a scenario of an hdf5 file,
+    see `TimeEvo.plot`; suits rendering in a worker process
+
+    Examples
+    --------
+    >>> plot = plot_file("chemkin/example_data/detailed_profile.h5", "Scenario1", 0.1, 0.1)
+    """
+    time_evo = TimeEvo(file)
+    try:
+        return time_evo.plot(scenario, pic_width, pic_length, dpi)
+    finally:
+        time_evo.file.close()
@@ -1,6 +1,13 @@
+import multiprocessing
 import os
+import pickle
+import threading
+import time
 import traceback
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import numpy as np
 from flask import Flask, request, send_from_directory
@@ -11,11 +18,431 @@ import base64
 
 import chemkin.nasa
 import chemkin.parser
+import chemkin.time_evo
+from chemkin.cache import ContentCache, LRUCache, content_key, private_directory
 from chemkin.time_evo import TimeEvo
 from . import webserver as ws
 
 import chemkin.plot
 
+# parsed mechanisms, shared by all sessions and keyed by the content of their xml file; a directory
+# private to the server user (see `configure_cache`), or None to parse every new session
+PARSED_CACHE_FOLDER = None
+
+
+# number of temperatures whose rate coefficients are memoized per session mechanism
+RATE_CACHE_SIZE = 128
+
+# largest number of states evaluated by one batch rates request
+MAX_BATCH_STATES = 100000
+
+# largest num_states X num_species X num_reactions of one batch rates request, the work of its dense kernels
+MAX_BATCH_ELEMENTS = 10 ** 9
+
+# largest num_states X num_species X num_reactions temporary of the kernels, batches are evaluated in
+# chunks of states below it
+BATCH_CHUNK_ELEMENTS = 2 ** 22
+
+# bytes allowed per JSON value of a batch rates request, bounding its body before it is parsed
+JSON_BYTES_PER_VALUE = 32
+
+
+class SessionStore:
+    """
+    Thread-safe least recently used store of the compiled mechanism of every session
+
+    Entries expire ttl seconds after they were last used, and the least recently used entries are
+    evicted beyond maxsize entries or max_bytes of mechanisms (see `put`).
+
+    Attributes
+    ----------
+    maxsize: int
+        maximum number of sessions
+    ttl: float
+        seconds after which an unused session is dropped, or None to keep sessions until evicted
+    max_bytes: int
+        maximum total size of the stored mechanisms
+    nbytes: int
+        total size of the stored mechanisms
+    hits, misses: int
+        number of successful and failed lookups
+
+    Examples
+    --------
+    >>> now = [0.0]
+    >>> store = SessionStore(maxsize=2, ttl=60, clock=lambda: now[0])
+    >>> store.put('a', [1, 2, 3])
+    >>> store.get('a')
+    [1, 2, 3]
+    >>> now[0] = 61.0
+    >>> store.get('a') is None
+    True
+    >>> store.stats()['hits'], store.stats()['misses'], store.stats()['size']
+    (1, 1, 0)
+    """
+
+    def __init__(self, maxsize=128, ttl=3600.0, max_bytes=256 * 2 ** 20, clock=time.monotonic):
+        """
+        Create an empty store
+
+        Parameters
+        ----------
+        maxsize: int
+            maximum number of sessions (optional; default 128)
+        ttl: float
+            seconds after which an unused session is dropped (optional; default 3600, None never expires)
+        max_bytes: int
+            maximum total size of the stored mechanisms (optional; default 256 MB)
+        clock: callable
+            source of the current time in seconds (optional; default time.monotonic)
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        # sid -> (value, size, time of last use), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """
+        Returns the value stored for a session and marks it as recently used, or None if it is
+        not stored or has expired
+        """
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            entry = self._entries.get(sid)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, _ = entry
+            self._entries[sid] = (value, size, now)
+            self._entries.move_to_end(sid)
+            self.hits += 1
+            return value
+
+    def put(self, sid, value, nbytes=None):
+        """
+        Store the value of a session, evicting the least recently used sessions beyond the limits
+
+        Parameters
+        ----------
+        sid: str
+            session id
+        value: object
+            value to store, e.g. a ReactionData
+        nbytes: int
+            size of the value, e.g. `ReactionData.nbytes` (optional; default the length of its pickle,
+            which serializes the whole value)
+        """
+        if nbytes is None:
+            nbytes = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        with self._lock:
+            self._remove(sid)
+            if nbytes > self.max_bytes:
+                # would evict every other session and still not fit
+                return
+            self._entries[sid] = (value, nbytes, self._clock())
+            self.nbytes += nbytes
+            while len(self._entries) > self.maxsize or self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, sid):
+        """
+        Drop the value of a session if it is stored
+        """
+        with self._lock:
+            self._remove(sid)
+
+    def clear(self):
+        """
+        Drop all sessions; the counters are kept
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """
+        Returns
+        -------
+        dict
+            hits, misses, hit_rate, size, maxsize, nbytes and max_bytes of the store
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'size': len(self._entries), 'maxsize': self.maxsize, 'nbytes': self.nbytes,
+                    'max_bytes': self.max_bytes}
+
+    def _remove(self, sid):
+        entry = self._entries.pop(sid, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def _expire(self, now):
+        if self.ttl is None:
+            return
+        # entries are ordered by last use, so the expired ones come first
+        while self._entries:
+            sid, (_, _, last_used) = next(iter(self._entries.items()))
+            if now - last_used <= self.ttl:
+                break
+            self._remove(sid)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, sid):
+        return sid in self._entries
+
+
+class PoolBusyError(RuntimeError):
+    """
+    Raised when a RenderPool has no free worker or queue slot
+    """
+
+
+class RenderPool:
+    """
+    Process pool rendering plots off the request threads, with a bounded number of pending jobs
+
+    At most `processes` jobs run at once and `queue_limit` more wait for a worker; further jobs are
+    refused with PoolBusyError instead of queueing without bound. The worker processes are spawned
+    rather than forked, since a fork from a request thread copies the locks other threads hold (caches,
+    matplotlib) into the workers. Python < 3.7 can only fork: call `start` before starting any thread.
+
+    Attributes
+    ----------
+    processes: int
+        number of worker processes
+    queue_limit: int
+        number of jobs that may wait for a worker
+    retry_after: int
+        seconds after which refused clients are told to retry
+
+    Examples
+    --------
+    >>> pool = RenderPool(processes=1, queue_limit=0)
+    >>> pool.run(max, 1, 2)
+    2
+    >>> pool.shutdown()
+    """
+
+    def __init__(self, processes=None, queue_limit=16, retry_after=1):
+        """
+        Create a new pool
+
+        Parameters
+        ----------
+        processes: int
+            number of worker processes (optional; default the number of CPUs)
+        queue_limit: int
+            number of jobs that may wait for a worker (optional; default 16)
+        retry_after: int
+            seconds after which refused clients are told to retry (optional; default 1)
+        """
+        self.processes = processes or os.cpu_count() or 1
+        if queue_limit < 0:
+            raise ValueError("queue_limit must not be negative")
+        self.queue_limit = queue_limit
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(self.processes + queue_limit)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                try:
+                    self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                except TypeError:
+                    # Python < 3.7 has no mp_context
+                    self._executor = ProcessPoolExecutor(max_workers=self.processes)
+            return self._executor
+
+    def start(self):
+        """
+        Start the worker processes now instead of on the first job
+        """
+        self._get_executor().submit(int).result()
+
+    def submit(self, fn, *args):
+        """
+        Schedule fn(*args) in a worker process
+
+        Returns
+        -------
+        concurrent.futures.Future
+            future of the result
+
+        Raises
+        ------
+        PoolBusyError
+            if all workers are busy and the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusyError("All {} render workers are busy and {} jobs are queued".format(
+                self.processes, self.queue_limit))
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenProcessPool:
+                # a worker died, e.g. killed for its memory use: start a fresh pool
+                with self._lock:
+                    self._executor = None
+                future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda f: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """
+        Returns fn(*args) computed in a worker process, see `submit`
+        """
+        return self.submit(fn, *args).result()
+
+    def shutdown(self):
+        """
+        Stop the worker processes; they are started again on the next job
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+# renders the plots of all requests of this process
+RENDER_POOL = RenderPool()
+
+# mechanisms parsed by a render worker process, keyed by their content hash
+_WORKER_MECHANISMS = LRUCache(maxsize=16)
+
+
+def render_rate_plots(filename, mechanism_key, cache_dir, *args):
+    """
+    Returns the rate plots of the mechanism of a file, see `chemkin.plot.rate_plots`
+
+    Runs in a render worker, which parses the mechanism (through the parsed-mechanism cache in
+    cache_dir) and keeps it by its content hash, so that jobs send its path instead of pickling it.
+    """
+    reaction_data = None if mechanism_key is None else _WORKER_MECHANISMS.get(mechanism_key)
+    if reaction_data is None:
+        data_parser = chemkin.parser.DataParser(cache_dir=cache_dir)
+        reaction_data = data_parser.parse_file(filename, chemkin.nasa.NASACoeffs(), key=mechanism_key)
+        if mechanism_key is not None:
+            _WORKER_MECHANISMS.put(mechanism_key, reaction_data)
+    return chemkin.plot.rate_plots(reaction_data, *args)
+
+
+def busy_response(pool):
+    """
+    Returns the 503 response telling the client to retry when the render pool is full
+    """
+    return ({'status': 'failed', 'reason': 'Server is busy, retry in {} s'.format(pool.retry_after)}, 503,
+            {'Retry-After': str(pool.retry_after)})
+
+
+# compiled mechanisms of the sessions of this process, with their content hash
+SESSIONS = SessionStore()
+
+# rendered plots and rate results, shared by all sessions and keyed by the content of their inputs;
+# kept on disk in the private cache directory of the server once configured (see `configure_cache`)
+RESULT_CACHE = ContentCache()
+
+# content hashes of uploaded files, keyed by path, modification time and size
+_FILE_KEYS = LRUCache(maxsize=1024)
+
+
+def configure_cache(cache_dir=None):
+    """
+    Set the directory of the caches of the server
+
+    Parameters
+    ----------
+    cache_dir: str
+        directory private to the server user, created with mode 0700 if needed
+        (optional; default none: mechanisms are parsed for every new session and results are
+        cached in memory only, so that nothing is left behind on disk)
+    """
+    global PARSED_CACHE_FOLDER, RESULT_CACHE
+    if cache_dir is None:
+        PARSED_CACHE_FOLDER = None
+        RESULT_CACHE = ContentCache()
+        return
+    PARSED_CACHE_FOLDER = private_directory(os.path.join(private_directory(cache_dir), "parsed"))
+    RESULT_CACHE = ContentCache(directory=os.path.join(cache_dir, "results"))
+
+
+def session_folder(sid):
+    """
+    Returns the folder of the uploaded files of a session
+    """
+    return "/tmp/chemkin/webserver/{}".format(sid)
+
+
+def parse_session(sid):
+    """
+    Parse the mechanism uploaded to a session and store it in SESSIONS
+
+    Returns
+    -------
+    (ReactionData, str)
+        compiled mechanism of the session and its content hash
+    """
+    nasa = chemkin.nasa.NASACoeffs()
+    data_parser = chemkin.parser.DataParser(cache_dir=PARSED_CACHE_FOLDER)
+    filename = os.path.join(session_folder(sid), "data.xml")
+    # hash the file once, the parsed-mechanism cache reuses the key
+    key = data_parser.mechanism_key(filename, nasa)
+    reaction_data = data_parser.parse_file(filename, nasa, key=key)
+    # rate requests of a session mostly repeat the same few temperatures
+    reaction_data.set_rate_cache(RATE_CACHE_SIZE)
+    entry = (reaction_data, key)
+    SESSIONS.put(sid, entry, nbytes=reaction_data.nbytes)
+    return entry
+
+
+def session_entry(sid):
+    """
+    Returns the compiled mechanism of a session and its content hash from SESSIONS, parsing its file
+    again only when it is not stored (e.g. expired, evicted, or created by another server process)
+    """
+    entry = SESSIONS.get(sid)
+    if entry is None:
+        entry = parse_session(sid)
+    return entry
+
+
+def load_session(sid):
+    """
+    Returns the compiled mechanism of a session, see `session_entry`
+    """
+    return session_entry(sid)[0]
+
+
+def file_key(path):
+    """
+    Returns the content hash of a file, hashing it again only when it was modified
+    """
+    stat = os.stat(path)
+    version = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    key = _FILE_KEYS.get(version)
+    if key is None:
+        with open(path, "rb") as f:
+            key = content_key(f.read())
+        _FILE_KEYS.put(version, key)
+    return key
+
 
 class Session(Resource):
     def post(self):
@@ -29,15 +456,12 @@ class Session(Resource):
         sid = str(uuid.uuid1())
         data = request.json['data']
         print(data)
-        folder = "/tmp/chemkin/webserver/{}".format(sid)
+        folder = session_folder(sid)
         os.makedirs(folder, exist_ok=True)
         with open(os.path.join(folder, "data.xml"), "w") as f:
             f.write(data)
         try:
-            nasa = chemkin.nasa.NASACoeffs()
-            data_parser = chemkin.parser.DataParser()
-            # parse the data file and return an instance of ReactionData class
-            reaction_data = data_parser.parse_file(os.path.join(folder, "data.xml"), nasa)
+            reaction_data = parse_session(sid)[0]
             return {'status': 'success', 'id': sid,
                     'species': reaction_data.species,
                     'equations': [r.equation for r in reaction_data.reactions]}
@@ -59,12 +483,7 @@ class Rates(Resource):
         -------
         response containing reaction and progress rates (if succeed) or failure information (if failed)
         """
-        folder = "/tmp/chemkin/webserver/{}".format(sid)
-        nasa = chemkin.nasa.NASACoeffs()
-        # create a data parser class
-        data_parser = chemkin.parser.DataParser()
-        # parse the data file and return an instance of ReactionData class
-        reaction_data = data_parser.parse_file(os.path.join(folder, "data.xml"), nasa)
+        reaction_data, mechanism_key = session_entry(sid)
 
         try:
             conc = [0] * len(reaction_data.species)
@@ -74,9 +493,156 @@ class Rates(Resource):
 
             T = float(request.json['_temp'])
 
-            progress_rates = reaction_data.get_progress_rate(conc, T)  # type: np.ndarray
+            def compute():
+                progress_rates = reaction_data.get_progress_rate(conc, T)  # type: np.ndarray
+                reaction_rates = reaction_data.get_reaction_rate(progress_rates)
+                ks = reaction_data.get_k(T)
+                return {
+                    "status": "success",
+                    'progress_rates': progress_rates.tolist(),
+                    'reaction_rates': reaction_rates.tolist(),
+                    'ks': ks.tolist(),
+                    'species': reaction_data.species,
+                }
+
+            key = content_key('rates', mechanism_key, np.array(conc, dtype=float), T)
+            return jsonify(RESULT_CACHE.get_or_compute(key, compute))
+        except Exception as e:
+            return {'status': 'failed', 'reason': 'Failed to get rates ({})'.format(str(e))}
+
+
+def decode_states(payload, num_species, binary=False):
+    """
+    Decode the states of a batch rates request
+
+    Parameters
+    ----------
+    payload: dict or bytes
+        JSON object with 'concs' (num_states X num_species) and 'temps' (one per state, or a single
+        temperature shared by all states), or with binary=True little-endian float64 values, every
+        state being num_species concentrations followed by its temperature
+    num_species: int
+        number of species of the mechanism
+    binary: bool
+        whether payload is binary (optional; default False)
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        concentrations (num_states X num_species) and temperatures (num_states)
+
+    Examples
+    --------
+    >>> concs, temps = decode_states({'concs': [[1, 2], [3, 4]], 'temps': 1500}, 2)
+    >>> concs.shape, temps.tolist()
+    ((2, 2), [1500.0, 1500.0])
+    >>> concs, temps = decode_states(np.array([[1, 2, 1000], [3, 4, 2000]], dtype='<f8').tobytes(), 2, True)
+    >>> concs[1].tolist(), temps.tolist()
+    ([3.0, 4.0], [1000.0, 2000.0])
+    """
+    if binary:
+        if len(payload) % (8 * (num_species + 1)) != 0:
+            raise ValueError("binary states must be float64 rows of {} concentrations and a temperature".format(
+                num_species))
+        states = np.frombuffer(payload, dtype='<f8').reshape(-1, num_species + 1)
+        concs, temps = states[:, :-1], states[:, -1]
+    else:
+        concs = np.array(payload['concs'], dtype=float)
+        if concs.ndim != 2 or concs.shape[1] != num_species:
+            raise ValueError("concs must be an array of concentrations of size N X {}".format(num_species))
+        try:
+            temps = np.broadcast_to(np.asarray(payload['temps'], dtype=float), (concs.shape[0],))
+        except ValueError:
+            raise ValueError("temps must be a scalar or an array of size {}".format(concs.shape[0]))
+    if concs.shape[0] > MAX_BATCH_STATES:
+        raise ValueError("At most {} states are allowed per request".format(MAX_BATCH_STATES))
+    return concs, temps
+
+
+def max_batch_states(num_species, num_reactions):
+    """
+    Returns the largest number of states of a batch rates request on a mechanism of given size
+
+    Examples
+    --------
+    >>> max_batch_states(2, 3) == MAX_BATCH_STATES
+    True
+    >>> max_batch_states(500, 400) == MAX_BATCH_ELEMENTS // (500 * 400)
+    True
+    """
+    return max(1, min(MAX_BATCH_STATES, MAX_BATCH_ELEMENTS // max(1, num_species * num_reactions)))
+
+
+def max_batch_bytes(num_species, binary=False, num_states=None):
+    """
+    Returns the largest body accepted for a batch rates request of num_states (default MAX_BATCH_STATES) states
+
+    Examples
+    --------
+    >>> max_batch_bytes(2, binary=True) == MAX_BATCH_STATES * 3 * 8
+    True
+    >>> max_batch_bytes(2, binary=True, num_states=10)
+    240
+    """
+    bytes_per_value = 8 if binary else JSON_BYTES_PER_VALUE
+    num_states = MAX_BATCH_STATES if num_states is None else num_states
+    return num_states * (num_species + 1) * bytes_per_value
+
+
+class BatchRates(Resource):
+    def post(self, sid):
+        """
+        Returns progress rates, reaction rates and rate coefficients of many states of given session
+
+        The states are sent either as JSON (see `decode_states`) or, with content type
+        application/octet-stream, as binary float64 rows of concentrations followed by the temperature.
+
+        Parameters
+        ----------
+        sid: str
+            session id
+
+        Returns
+        -------
+        response containing num_states X num_reactions progress rates and rate coefficients and
+        num_states X num_species reaction rates (if succeed) or failure information (if failed)
+        """
+        reaction_data = load_session(sid)
+
+        # refuse oversized bodies before reading and decoding them
+        binary = request.mimetype == 'application/octet-stream'
+        num_species, num_reactions = len(reaction_data.species), len(reaction_data)
+        max_states = max_batch_states(num_species, num_reactions)
+        limit = max_batch_bytes(num_species, binary, max_states)
+        # an empty Content-Length header is parsed as 0 by some Werkzeug versions, reject it explicitly
+        if not request.headers.get('Content-Length') or request.content_length is None:
+            return {'status': 'failed', 'reason': 'Request body must have a Content-Length'}, 411
+        if request.content_length > limit:
+            return {'status': 'failed',
+                    'reason': 'Request body must have a length of at most {} bytes'.format(limit)}, 413
+
+        try:
+            if binary:
+                concs, T = decode_states(request.get_data(), num_species, binary=True)
+            else:
+                concs, T = decode_states(request.json, num_species)
+        except Exception as e:
+            return {'status': 'failed', 'reason': 'Failed to get rates ({})'.format(str(e))}
+        if len(concs) > max_states:
+            return {'status': 'failed',
+                    'reason': 'At most {} states are allowed per request for this mechanism'.format(max_states)}, 413
+
+        try:
+            # the dense kernels allocate num_states X num_species X num_reactions temporaries, bound them
+            chunk = max(1, BATCH_CHUNK_ELEMENTS // max(1, num_species * num_reactions))
+            progress_rates = np.empty((len(concs), num_reactions))
+            for start in range(0, len(concs), chunk):
+                progress_rates[start:start + chunk] = reaction_data.get_progress_rate_batch(
+                    concs[start:start + chunk], T[start:start + chunk])
             reaction_rates = reaction_data.get_reaction_rate(progress_rates)
-            ks = reaction_data.get_k(T)
+            # rate coefficients only depend on temperature, evaluate them once per distinct temperature
+            temps, inverse = np.unique(T, return_inverse=True)
+            ks = reaction_data.get_k(temps)[inverse]
             result = {
                 "status": "success",
                 'progress_rates': progress_rates.tolist(),
@@ -107,12 +673,7 @@ class Plots(Resource):
         -------
         response containing base64 encoded plots (reaction and progress) (if succeed) or failure information (if failed)
         """
-        folder = "/tmp/chemkin/webserver/{}".format(sid)
-        nasa = chemkin.nasa.NASACoeffs()
-        # create a data parser class
-        data_parser = chemkin.parser.DataParser()
-        # parse the data file and return an instance of ReactionData class
-        reaction_data = data_parser.parse_file(os.path.join(folder, "data.xml"), nasa)
+        reaction_data, mechanism_key = session_entry(sid)
 
         try:
             tlow = float(tlow)
@@ -125,27 +686,23 @@ class Plots(Resource):
 
             T = float(request.json['_temp'])
 
-            T_range, progress_rate_range, reaction_rate_range, current_T, species, pc, rc, equations = chemkin.plot.range_data_collection(
-                reaction_data, conc, tlow, thigh, T)
-
             pic_width = 1200 // 75
             pic_length = 800 // 75
 
-            progress_plot = chemkin.plot.progress_rate_plot_generation(T_range, progress_rate_range, current_T, pc,
-                                                                       equations,
-                                                                       pic_width,
-                                                                       pic_length)
-
-            reaction_plot = chemkin.plot.reaction_rate_plot_generation(T_range, reaction_rate_range, current_T, rc,
-                                                                       species,
-                                                                       pic_width,
-                                                                       pic_length)
+            key = content_key('plots', mechanism_key, np.array(conc, dtype=float), tlow, thigh, T, pic_width,
+                              pic_length, chemkin.plot.DEFAULT_DPI)
+            filename = os.path.join(session_folder(sid), "data.xml")
+            progress_plot, reaction_plot = RESULT_CACHE.get_or_compute(key, lambda: RENDER_POOL.run(
+                render_rate_plots, filename, mechanism_key, PARSED_CACHE_FOLDER, conc, tlow, thigh, T, pic_width,
+                pic_length))
 
             return {
                 "status": "success",
                 'progress_rates': progress_plot,
                 'reaction_rates': reaction_plot
             }
+        except PoolBusyError:
+            return busy_response(RENDER_POOL)
         except Exception as e:
             traceback.print_exc()
             print(e)
@@ -163,7 +720,7 @@ class TempEvoSession(Resource):
         """
         sid = str(uuid.uuid1())
         data_decoded = base64.b64decode(request.json['data'][13:])
-        folder = "/tmp/chemkin/webserver/{}".format(sid)
+        folder = session_folder(sid)
         os.makedirs(folder, exist_ok=True)
         with open(os.path.join(folder, "data.h5"), "wb") as f:
             f.write(data_decoded)
@@ -190,12 +747,28 @@ class TempEvoPlot(Resource):
         response containing base64 encoded plot (if succeed) or failure information (if failed)
         """
         try:
-            timeevo = TimeEvo(os.path.join("/tmp/chemkin/webserver/{}".format(sid), "data.h5"))
-            return {'status': 'success', 'plot': timeevo.plot(scenario)}
+            file = os.path.join(session_folder(sid), "data.h5")
+            key = content_key('timeevo', file_key(file), scenario, chemkin.plot.DEFAULT_DPI)
+            plot = RESULT_CACHE.get_or_compute(key, lambda: RENDER_POOL.run(chemkin.time_evo.plot_file, file, scenario))
+            return {'status': 'success', 'plot': plot}
+        except PoolBusyError:
+            return busy_response(RENDER_POOL)
         except Exception as e:
             return {'status': 'failed', 'reason': 'Failed to plot given hdf5 file ({})'.format(str(e))}
 
 
+class Stats(Resource):
+    def get(self):
+        """
+        Returns the hit rates and sizes of the session store and the result cache
+
+        Returns
+        -------
+        response containing the statistics of SESSIONS and RESULT_CACHE
+        """
+        return {'status': 'success', 'sessions': SESSIONS.stats(), 'results': RESULT_CACHE.stats()}
+
+
 class WebServer:
     """
     chemkin web server class
@@ -205,7 +778,7 @@ class WebServer:
     >>> ws = WebServer(8080)
     """
 
-    def __init__(self, port):
+    def __init__(self, port, render_processes=None, render_queue_limit=16, cache_dir=None):
         """
         Create a new instance of chemkin web server
 
@@ -213,15 +786,31 @@ class WebServer:
         ----------
         port: int
             port the server will be listening to
+        render_processes: int
+            number of processes rendering plots (optional; default the number of CPUs)
+        render_queue_limit: int
+            number of plots that may wait for a render process before requests are answered with
+            503 (optional; default 16)
+        cache_dir: str
+            directory of the caches, which must be private to the server user (optional; default the
+            caches configured before, see `configure_cache`)
         """
+        if cache_dir is not None:
+            configure_cache(cache_dir)
+        global RENDER_POOL
+        if render_processes is not None or render_queue_limit != RENDER_POOL.queue_limit:
+            RENDER_POOL.shutdown()
+            RENDER_POOL = RenderPool(render_processes, render_queue_limit)
         self.port = port
         self.app = Flask("chemkin web server")
         self.api = Api(self.app)
         self.api.add_resource(Session, '/session')
         self.api.add_resource(Rates, '/rates/<sid>')
+        self.api.add_resource(BatchRates, '/batchrates/<sid>')
         self.api.add_resource(Plots, '/plots/<sid>/<tlow>/<thigh>')
         self.api.add_resource(TempEvoSession, '/timeevosession')
         self.api.add_resource(TempEvoPlot, '/timeevo/<sid>/<scenario>')
+        self.api.add_resource(Stats, '/stats')
         path = os.path.dirname(ws.__file__)
         self.web_folder = os.path.join(path, "web")
 
@@ -238,4 +827,6 @@ class WebServer:
         def send_index():
             return send_from_directory(self.web_folder, "index.html")
 
-        self.app.run(port=self.port)
+        # start the render workers before the request threads exist
+        RENDER_POOL.start()
+        self.app.run(port=self.port, threaded=True)
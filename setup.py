@@ -36,7 +36,7 @@ setup(
     packages=find_packages(exclude=['data', 'documentation', 'tests']),
 
     install_requires=['numpy', 'pandas', 'pytest-runner', 'flask', 'flask-jsonpify', 'flask-restful', 'h5py',
-                      'matplotlib'],
+                      'matplotlib', 'scipy'],
 
     tests_require=['coverage', 'pytest', 'pytest-cov', 'pytest_runner', 'flask', 'flask-jsonpify', 'flask-restful',
                    'h5py'],
@@ -0,0 +1,112 @@
+from chemkin.cache import ContentCache, content_key
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+
+
+def test_content_key():
+    assert content_key('a', 'bc') != content_key('ab', 'c')
+    assert content_key(np.zeros(4)) != content_key(np.zeros((2, 2)))
+    assert content_key(np.zeros(2)) != content_key(np.zeros(2, dtype=np.float32))
+    assert content_key(b'x', 1.5, None) == content_key(b'x', 1.5, None)
+
+
+def test_memory_tier_limit():
+    cache = ContentCache(max_bytes=300)
+    values = {n: 'x' * 100 + str(n) for n in range(3)}
+    for n, value in values.items():
+        cache.put(content_key(n), value)
+    # entries are sized by their compact JSON encoding: 101 characters and two quotes, so only two fit
+    sizes = [len(json.dumps(value, separators=(',', ':')).encode('utf8')) for value in values.values()]
+    assert sizes == [103] * 3
+    assert len(cache) == 2 and cache.nbytes == 2 * 103
+    assert content_key(0) not in cache and cache.get(content_key(2)) == values[2]
+    cache.put(content_key('big'), 'y' * 1000)
+    assert content_key('big') not in cache
+    assert cache.stats()['memory_hits'] == 1
+
+
+def test_disk_tier():
+    folder = tempfile.mkdtemp()
+    try:
+        cache = ContentCache(max_bytes=1000, directory=folder, disk_max_bytes=10 ** 6)
+        key = content_key('plot', np.arange(3.0), 1500.0)
+        cache.put(key, ['progress', 'reaction'])
+        # another process sharing the directory
+        other = ContentCache(directory=folder)
+        calls = []
+        assert other.get_or_compute(key, lambda: calls.append(1)) == ['progress', 'reaction']
+        assert other.get(key) == ['progress', 'reaction'] and calls == []
+        stats = other.stats()
+        assert stats['disk_hits'] == 1 and stats['memory_hits'] == 1 and stats['hit_rate'] == 1.0
+        assert stats['disk_files'] == 1
+        with open(os.path.join(folder, key + '.json')) as f:
+            assert json.load(f) == ['progress', 'reaction']
+
+        # corrupt files are misses
+        with open(os.path.join(folder, content_key('bad') + '.json'), 'wb') as f:
+            f.write(b'corrupt')
+        assert other.get(content_key('bad')) is None and other.misses == 1
+
+        # the least recently used files are evicted beyond the disk limit
+        small = ContentCache(max_bytes=1000, directory=folder, disk_max_bytes=700)
+        small.clear()
+        for n in range(10):
+            small.put(content_key(n), 'z' * 200)
+            os.utime(os.path.join(folder, content_key(n) + '.json'), (n, n))
+        assert small.stats()['disk_nbytes'] <= 700
+        assert json_files(folder) == sorted(content_key(n) + '.json' for n in (7, 8, 9))
+    finally:
+        shutil.rmtree(folder)
+
+
+def json_files(folder):
+    return sorted(name for name in os.listdir(folder) if name.endswith('.json'))
+
+
+def test_disk_tier_shared_limit():
+    folder = tempfile.mkdtemp()
+    try:
+        ContentCache(directory=folder).put(content_key('old'), 'z' * 200)
+        # two processes sharing the directory, the limit holds for their files together
+        first = ContentCache(max_bytes=1000, directory=folder, disk_max_bytes=700)
+        second = ContentCache(max_bytes=1000, directory=folder, disk_max_bytes=700)
+
+        def listed():
+            raise AssertionError("the directory was listed")
+
+        first._disk_files = second._disk_files = listed
+        for n in range(10):
+            (first if n % 2 else second).put(content_key(n), 'z' * 200)
+        assert json_files(folder) == sorted(content_key(n) + '.json' for n in (7, 8, 9))
+        stats = first.stats()
+        assert stats['disk_files'] == 3 and stats['disk_nbytes'] == 3 * 202 and second.stats() == stats
+
+        # a lookup marks a file as recently used for both
+        assert first.get(content_key(8)) == 'z' * 200
+        second.put(content_key(10), 'z' * 200)
+        assert json_files(folder) == sorted(content_key(n) + '.json' for n in (8, 9, 10))
+
+        # a file removed by another process is dropped from the index on lookup
+        os.remove(os.path.join(folder, content_key(9) + '.json'))
+        assert second.get(content_key(9)) is None
+        assert first.stats()['disk_files'] == 2 and first.stats()['disk_nbytes'] == 2 * 202
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_disk_tier_private():
+    folder = tempfile.mkdtemp()
+    try:
+        ContentCache(directory=os.path.join(folder, 'results'))
+        assert os.stat(os.path.join(folder, 'results')).st_mode & 0o777 == 0o700
+        os.chmod(folder, 0o777)
+        try:
+            ContentCache(directory=folder)
+            assert False
+        except PermissionError:
+            assert True
+    finally:
+        shutil.rmtree(folder)
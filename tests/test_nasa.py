@@ -20,3 +20,134 @@ def test_create_db():
         raise
     finally:
         os.remove("temp.sqlite")
+
+
+def test_shared_cache():
+    import sqlite3
+    try:
+        nasa = NASACoeffs("temp_cache.sqlite")
+        nasa.create_db(get_example_data_file("example_thermo.xml"))
+        tables = nasa.get_tables()
+        assert NASACoeffs("temp_cache.sqlite").get_tables() is tables
+        assert NASACoeffs().get_tables() is not tables
+        try:
+            nasa.get_coeffs("not a species", 'low')
+            assert False
+        except KeyError:
+            assert True
+
+        # modified by another process: reloaded on the next lookup
+        db = sqlite3.connect("temp_cache.sqlite")
+        db.execute("UPDATE high SET COEFF_1 = 3.5 WHERE SPECIES_NAME = 'H'")
+        db.commit()
+        db.close()
+        stat = os.stat("temp_cache.sqlite")
+        os.utime("temp_cache.sqlite", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert nasa.get_coeffs("H", 'high')[0][0] == 3.5
+        assert nasa.get_tables() is not tables
+    finally:
+        os.remove("temp_cache.sqlite")
+
+
+def test_nasa_table():
+    from chemkin.nasa import NASATable
+    from chemkin.parser import DataParser
+    nasa = NASACoeffs()
+    table = NASATable.from_nasa(nasa)
+    try:
+        table.save("temp_table.npy")
+        loaded = NASATable.load("temp_table.npy")
+        assert loaded.species == table.species
+        assert isinstance(loaded.coeffs.base, np.memmap) or isinstance(loaded.coeffs, np.memmap)
+        for species in ("H", "O2", "H2O"):
+            for temp_range in ("low", "high"):
+                expected = nasa.get_coeffs(species, temp_range)
+                actual = loaded.get_coeffs(species, temp_range)
+                assert np.allclose(actual[0], expected[0]) and actual[1:] == expected[1:]
+        try:
+            loaded.get_coeffs("not a species", "low")
+            assert False
+        except KeyError:
+            assert True
+
+        file = get_example_data_file("rxns_unknownNASA.xml")
+        expected = DataParser().parse_file(file, nasa)
+        rd = DataParser().parse_file(file, loaded)
+        assert np.array_equal(rd.nasa_known, expected.nasa_known)
+        assert np.array_equal(rd.nasa_coeffs, expected.nasa_coeffs)
+        for name in ("nasa_tmin", "nasa_tmid", "nasa_tmax"):
+            assert np.allclose(getattr(rd, name), getattr(expected, name), equal_nan=True)
+        del loaded, rd
+    finally:
+        os.remove("temp_table.npy")
+
+
+def test_create_db_update():
+    thermo = """<?xml version="1.0"?>
+<ctml>
+    <speciesData id="species_data">
+        <species name="{0}">
+            <thermo>
+                <NASA P0="100000.0" Tmax="1000.0" Tmin="200.0">
+                    <floatArray name="coeffs" size="7"> {1}, 0, 0, 0, 0, 0, 0 </floatArray>
+                </NASA>
+                <NASA P0="100000.0" Tmax="3500.0" Tmin="1000.0">
+                    <floatArray name="coeffs" size="7"> {1}, 1, 0, 0, 0, 0, 0 </floatArray>
+                </NASA>
+            </thermo>
+        </species>
+    </speciesData>
+</ctml>
+"""
+    try:
+        nasa = NASACoeffs("temp_update.sqlite")
+        stats = nasa.create_db(get_example_data_file("example_thermo.xml"), batch_size=3)
+        assert stats['species'] == 8 and stats['rows'] == 16 and stats['rows_per_second'] > 0
+        for name, value in (("X", 1.5), ("H", 2.0)):
+            with open("temp_update.xml", "w") as f:
+                f.write(thermo.format(name, value))
+            assert nasa.create_db("temp_update.xml", update=True)['species'] == 1
+        assert len(nasa.get_tables()['low']) == 9
+        assert nasa.get_coeffs("X", 'high') == ([1.5, 1, 0, 0, 0, 0, 0], 1000, 3500)
+        assert nasa.get_coeffs("H", 'low')[0][0] == 2.0
+        assert nasa.get_coeffs("O2", 'low')[1:] == (200, 1000)
+    finally:
+        os.remove("temp_update.sqlite")
+        os.remove("temp_update.xml")
+
+
+def test_create_db_atomic():
+    species = """        <species name="{0}">
+            <thermo>
+                <NASA P0="100000.0" Tmax="1000.0" Tmin="200.0">
+                    <floatArray name="coeffs" size="7"> {1}, 0, 0, 0, 0, 0, 0 </floatArray>
+                </NASA>
+                <NASA P0="100000.0" Tmax="3500.0" Tmin="1000.0">
+                    <floatArray name="coeffs" size="7"> {1}, 1, 0, 0, 0, 0, 0 </floatArray>
+                </NASA>
+            </thermo>
+        </species>
+"""
+    thermo = '<?xml version="1.0"?>\n<ctml>\n    <speciesData id="species_data">\n{}    </speciesData>\n</ctml>\n'
+    try:
+        nasa = NASACoeffs("temp_atomic.sqlite")
+        nasa.create_db(get_example_data_file("example_thermo.xml"))
+        expected = nasa.get_tables()
+        for body in (species.format("A", 1.0) + species.format("H", 2.0) + species.format("H", 3.0),
+                     species.format("A", 1.0) + species.format("B", "not a number")):
+            with open("temp_atomic.xml", "w") as f:
+                f.write(thermo.format(body))
+            for update in (False, True):
+                try:
+                    nasa.create_db("temp_atomic.xml", update=update, batch_size=1)
+                    assert False
+                except ValueError as err:
+                    assert "more than once" in str(err) or "float" in str(err)
+                # unchanged, and no journal files left behind
+                assert nasa.get_tables() == expected
+                assert sorted(f for f in os.listdir(".") if f.startswith("temp_atomic.sqlite")) == \
+                    ["temp_atomic.sqlite"]
+    finally:
+        for file in ("temp_atomic.sqlite", "temp_atomic.xml"):
+            if os.path.exists(file):
+                os.remove(file)
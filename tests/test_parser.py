@@ -207,4 +207,113 @@ def test_highlow():
         nasa.get_coeffs("O2", 'low')[1:] == np.array([200,1000])
         assert True
     except Exception:
-        assert False
\ No newline at end of file
+        assert False
+
+def test_parsed_cache():
+    import os
+    import shutil
+    import tempfile
+    folder = tempfile.mkdtemp()
+    try:
+        parser = DataParser(cache_dir=folder)
+        file = get_example_data_file("rxns_reversible.xml")
+        expected = parser.parse_file(file, nasa, stoichiometry='sparse')
+        entries = os.listdir(folder)
+        assert len(entries) == 1
+
+        def fail(*args):
+            raise AssertionError("parsed again")
+
+        cached_parser = DataParser(cache_dir=folder)
+        cached_parser._parse_file = fail
+        rd = cached_parser.parse_file(file, nasa, stoichiometry='sparse')
+        assert rd.species == expected.species and rd.stoichiometry_format == 'sparse'
+        assert np.array_equal(rd.nu, expected.nu) and not rd.reversible.flags.writeable
+        assert not rd.stoichiometry.columns['nu'][2].flags.writeable
+        concs = np.arange(1.0, len(rd.species) + 1)
+        assert np.allclose(rd.get_progress_rate(concs, 1500), expected.get_progress_rate(concs, 1500))
+
+        # a different stoichiometry format is a different entry; a corrupt entry is parsed again
+        parser.parse_file(file, nasa)
+        assert len(os.listdir(folder)) == 2
+        with open(os.path.join(folder, entries[0]), "wb") as f:
+            f.write(b"corrupt")
+        rd = parser.parse_file(file, nasa, stoichiometry='sparse')
+        assert np.array_equal(rd.nu, expected.nu)
+        assert DataParser(cache_dir=folder)._cache_key(file, nasa, 'dense') != \
+            DataParser(cache_dir=folder)._cache_key(file, NASACoeffs("chemkin/example_data/none.sqlite"), 'dense')
+    finally:
+        shutil.rmtree(folder)
+
+
+def test_streaming_parser():
+    for name in ('rxns.xml', 'rxns_reversible_mixed.xml', 'rxnset_long.xml', 'test_nonele.xml'):
+        file = get_example_data_file(name)
+        tree = DataParser().parse_file(file, nasa)
+        for stoichiometry in ('dense', 'sparse'):
+            rd = DataParser().parse_file(file, nasa, stoichiometry=stoichiometry, streaming=True)
+            assert rd.id == tree.id and rd.species == tree.species and len(rd) == len(tree)
+            assert np.array_equal(rd.nu, tree.nu) and np.array_equal(rd.reversible, tree.reversible)
+            assert np.allclose(rd.get_k(1500.0), tree.get_k(1500.0))
+            assert rd.unsupported_type == tree.unsupported_type
+            # Reaction objects are only built on request
+            assert rd.arrays is not None
+            assert [r.equation for r in rd.reactions] == [r.equation for r in tree.reactions]
+            assert [r.reactants for r in rd.reactions] == [r.reactants for r in tree.reactions]
+            assert rd.arrays is None
+
+
+def test_streaming_parser_errors():
+    for name in ('test_wrongSp.xml', 'test_idCollision.xml', 'test_negA.xml', 'test_parse.xml'):
+        try:
+            DataParser().parse_file(get_example_data_file(name), nasa, streaming=True)
+            assert False
+        except Exception as err:
+            assert not isinstance(err, AssertionError)
+    try:
+        DataParser().parse_file(get_example_data_file("test_notimplementedCoeff.xml"), nasa, streaming=True)
+        assert False
+    except NotImplementedError:
+        assert True
+
+
+def test_parse_files():
+    names = ['rxns.xml', 'test_negA.xml', 'rxns_reversible.xml', 'test_idCollision.xml', 'rxnset_long.xml']
+    files = [get_example_data_file(name) for name in names]
+    for processes in (1, 3):
+        results, errors = DataParser().parse_files(files, nasa, stoichiometry='sparse', processes=processes)
+        assert sorted(errors) == [1, 3] and all(isinstance(err, ValueError) for err in errors.values())
+        assert results[1] is None and results[3] is None
+        for i in (0, 2, 4):
+            expected = parse_file(names[i])
+            assert results[i].id == expected.id and np.array_equal(results[i].nu, expected.nu)
+            assert results[i].stoichiometry_format == 'sparse'
+            concs = np.arange(1.0, len(expected.species) + 1)
+            assert np.allclose(results[i].get_progress_rate(concs, 1500), expected.get_progress_rate(concs, 1500))
+    assert DataParser().parse_files([], nasa) == ([], {})
+
+
+def test_parsed_cache_private():
+    import os
+    import shutil
+    import tempfile
+    folder = tempfile.mkdtemp()
+    try:
+        DataParser(cache_dir=os.path.join(folder, "new"))
+        assert os.stat(os.path.join(folder, "new")).st_mode & 0o777 == 0o700
+        shared = os.path.join(folder, "shared")
+        os.mkdir(shared)
+        os.chmod(shared, 0o777)
+        try:
+            DataParser(cache_dir=shared)
+            assert False
+        except PermissionError:
+            assert True
+        os.symlink(os.path.join(folder, "new"), os.path.join(folder, "link"))
+        try:
+            DataParser(cache_dir=os.path.join(folder, "link"))
+            assert False
+        except PermissionError:
+            assert True
+    finally:
+        shutil.rmtree(folder)
@@ -0,0 +1,120 @@
+from chemkin.parser import DataParser
+from chemkin.nasa import NASACoeffs
+from chemkin import plot
+from chemkin.time_evo import TimeEvo
+from matplotlib.figure import Figure
+import numpy as np
+import base64
+import gc
+import struct
+import threading
+import tracemalloc
+
+nasa = NASACoeffs()
+
+
+def png_size(encoded_png):
+    header = base64.b64decode(encoded_png)[:24]
+    assert header[:8] == b'\x89PNG\r\n\x1a\n'
+    return struct.unpack('>II', header[16:24])
+
+
+def range_data():
+    reaction_data = DataParser().parse_file("chemkin/example_data/rxns.xml", nasa)
+    return plot.range_data_collection(reaction_data, [10, 30, 30, 40, 50, 60], 1000, 2000, 1500)
+
+
+def test_plot_size_and_dpi():
+    T, progress_rates, reaction_rates, current_T, species, pc, rc, equations = range_data()
+    img = plot.progress_rate_plot_generation(T, progress_rates, current_T, pc, equations, 4, 3, dpi=50)
+    assert png_size(img) == (200, 150)
+    img = plot.reaction_rate_plot_generation(T, reaction_rates, current_T, rc, species, 4, 3)
+    assert png_size(img) == (400, 300)
+    time_evo = TimeEvo("chemkin/example_data/detailed_profile.h5")
+    assert png_size(time_evo.plot(time_evo.scenarios[0], 2, 1, dpi=80)) == (160, 80)
+
+
+def test_canvas_per_thread():
+    figures = []
+
+    def render():
+        figures.append(plot.get_figure(1, 1))
+        assert plot.get_figure(2, 2).canvas is figures[-1].canvas
+
+    threads = [threading.Thread(target=render) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert figures[0].canvas is not figures[1].canvas
+
+
+def test_encode_earlier_figure():
+    first = plot.get_figure(1, 1, dpi=50)
+    first.add_subplot(111).plot([0, 1], [0, 1])
+    second = plot.get_figure(3, 2, dpi=50)
+    assert png_size(plot.encode_png(first)) == (50, 50)
+    assert png_size(plot.encode_png(second)) == (150, 100)
+    assert png_size(plot.encode_png(first)) == (50, 50)
+
+
+def test_no_figure_leak():
+    T, progress_rates, reaction_rates, current_T, species, pc, rc, equations = range_data()
+
+    def render(n):
+        for _ in range(n):
+            plot.progress_rate_plot_generation(T, progress_rates, current_T, pc, equations, 2, 2, dpi=40)
+            plot.reaction_rate_plot_generation(T, reaction_rates, current_T, rc, species, 2, 2, dpi=40)
+
+    def live_figures():
+        gc.collect()
+        return sum(isinstance(obj, Figure) for obj in gc.get_objects())
+
+    tracemalloc.start()
+    try:
+        render(10)
+        figures = live_figures()
+        baseline = tracemalloc.get_traced_memory()[0]
+        render(100)
+        gc.collect()
+        # growth of the live traced bytes; every leaked figure keeps its artists and pixel buffer
+        growth = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    assert live_figures() <= figures
+    assert growth < 2 * 1024 * 1024, growth
+
+
+def test_range_data_matches_pointwise():
+    reaction_data = DataParser().parse_file("chemkin/example_data/rxns_reversible.xml", nasa)
+    concs = np.arange(1.0, len(reaction_data.species) + 1)
+    for grid in plot.GRIDS:
+        T, progress_rates, reaction_rates, current_T, species, pc, rc, equations = plot.range_data_collection(
+            reaction_data, concs, 900, 2500, 1200, num=37, grid=grid)
+        assert T.shape == (37,) and progress_rates.shape == (37, len(equations))
+        assert reaction_rates.shape == (37, len(species))
+        assert T[0] == 900 and T[-1] == 2500 and np.all(np.diff(T) > 0)
+        for i in (0, 11, 36):
+            expected = reaction_data.get_progress_rate(concs, T[i])
+            assert np.allclose(progress_rates[i], expected)
+            assert np.allclose(reaction_rates[i], reaction_data.get_reaction_rate(expected))
+        assert np.allclose(pc, reaction_data.get_progress_rate(concs, 1200))
+        assert np.allclose(rc, reaction_data.get_reaction_rate(pc))
+    irreversible = DataParser().parse_file("chemkin/example_data/rxns.xml", nasa)
+    log_T = plot.range_data_collection(irreversible, [10, 30, 30, 40, 50, 60], 100, 10000, 1200, num=3, grid='log')[0]
+    assert np.allclose(log_T, [100, 1000, 10000])
+
+
+def test_adaptive_grid():
+    reaction_data = DataParser().parse_file("chemkin/example_data/rxns.xml", nasa)
+    T, progress_rates = plot.range_data_collection(reaction_data, [10, 30, 30, 40, 50, 60], 200, 3000, 1000,
+                                                   num=60, grid='adaptive')[:2]
+    assert len(np.unique(T)) == 60
+    # the Arrhenius rates are flat at low temperatures and rise quickly above 1000 K
+    assert np.sum(T > 1000) > np.sum(T < 1000) * 2
+    for (num, grid) in ((1, 'linear'), (10, 'cubic')):
+        try:
+            plot.range_data_collection(reaction_data, [10, 30, 30, 40, 50, 60], 200, 3000, 1000, num=num, grid=grid)
+            assert False
+        except ValueError:
+            assert True
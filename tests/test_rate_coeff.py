@@ -51,3 +51,26 @@ def test_negativeConstant():
         assert False
     except ValueError:
         assert True
+
+
+def test_rate_coeff_set():
+    import numpy as np
+    from chemkin.rate_coeff import RateCoeffSet
+
+    class Custom(RateCoeff):
+        def get_K(self, T):
+            return 2.0 * T
+
+    rcs = [ModifiedArrhenius(1e7, 0.5, 1e4), Constant(3.0), Arrhenius(1e5, 2e3), Custom(), Arrhenius(2e5, 1e3, R=1.0)]
+    rc_set = RateCoeffSet(rcs)
+    temps = np.array([300.0, 1000.0, 2500.0])
+    ks = rc_set.get_K(temps)
+    assert ks.shape == (3, 5)
+    for n, T in enumerate(temps):
+        assert np.allclose(ks[n], [rc.get_K(T) for rc in rcs])
+        assert np.allclose(rc_set.get_K(T), ks[n])
+    try:
+        rc_set.get_K([300.0, -1.0])
+        assert False
+    except ValueError:
+        assert True
@@ -0,0 +1,62 @@
+from chemkin.parser import DataParser
+from chemkin.nasa import NASACoeffs
+from chemkin.rate_table import RateTable
+from os.path import join
+import numpy as np
+
+nasa = NASACoeffs()
+
+
+def parse_file(file_name):
+    return DataParser().parse_file(join("chemkin/example_data", file_name), nasa)
+
+
+def test_interpolated_progress_rate():
+    rd = parse_file("rxns_reversible.xml")
+    concs = np.arange(1.0, len(rd.species) + 1)
+    temps = [900.0, 1234.5, 2999.0]
+    exact = [rd.get_progress_rate(concs, T) for T in temps]
+    exact_jacobian = rd.get_jacobian(concs, 1234.5)
+    table = rd.tabulate_rates(800, 3000, num=128)
+    assert rd.rate_table is table
+    assert max(table.max_rel_error.values()) < 1e-6
+    for T, expected in zip(temps, exact):
+        assert np.allclose(rd.get_progress_rate(concs, T), expected, rtol=1e-6)
+    assert np.allclose(rd.get_progress_rate_batch([concs, concs], [900.0, 2999.0]), [exact[0], exact[2]], rtol=1e-6)
+    for actual, expected in zip(rd.get_jacobian(concs, 1234.5), exact_jacobian):
+        assert np.allclose(actual, expected, rtol=1e-5)
+
+    # outside of the window the exact expressions are used
+    assert np.array_equal(rd.get_k(3500.0), rd.rate_coeffs.get_K(3500.0))
+    rd.compile()
+    assert rd.rate_table is None
+
+
+def test_linear_refinement():
+    rd = parse_file("rxns_reversible.xml")
+    table = RateTable(rd, 1000, 2000, num=8, method='linear', rtol=1e-4)
+    assert len(table.x) > 8 and max(table.max_rel_error.values()) <= 1e-4
+    try:
+        RateTable(rd, 1000, 2000, num=8, method='linear', rtol=1e-12, max_num=64)
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_refinement_stalls():
+    rd = parse_file("rxns_reversible.xml")
+    try:
+        RateTable(rd, 800, 3000, rtol=1e-9)
+        assert False
+    except ValueError as e:
+        assert 'stalls' in str(e)
+
+
+def test_invalid_table():
+    rd = parse_file("rxns.xml")
+    for args in [(2000, 1000), (-1, 1000), (500, 1000, 256, 'quadratic'), (500, 1000, 1)]:
+        try:
+            RateTable(rd, *args)
+            assert False
+        except ValueError:
+            assert True
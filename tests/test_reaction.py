@@ -1,6 +1,7 @@
 from chemkin.parser import DataParser
 from chemkin.nasa import NASACoeffs
 from os.path import join
+import pickle
 import numpy as np
 
 nasa = NASACoeffs()
@@ -40,3 +41,231 @@ def test_reversible():
 def test_reversible_mixed():
     rd = parse_file("rxns_reversible_mixed.xml")
     rd.get_progress_rate(np.ones(len(rd.species)), 3000)
+
+
+def test_compiled_stoichiometry():
+    rd = parse_file("rxns_reversible.xml")
+    nu_react, nu_prod = rd.get_nu()
+    assert nu_react is rd.nu_react and nu_prod is rd.nu_prod
+    assert np.array_equal(rd.nu, rd.nu_prod - rd.nu_react)
+    assert np.array_equal(rd.gamma, np.sum(rd.nu, axis=0))
+    assert rd.reversible.all()
+    try:
+        rd.nu[0, 0] = 1
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_progress_rate_matches_loop():
+    rd = parse_file("rxnset_long.xml")
+    concs = np.arange(1.0, len(rd.species) + 1)
+    kf = rd.get_k(1500)
+    expected = kf.copy()
+    for j in range(len(rd)):
+        for i in range(len(rd.species)):
+            expected[j] *= concs[i] ** rd.nu_react[i, j]
+    assert np.allclose(rd.get_progress_rate(concs, 1500), expected)
+
+
+def test_negative_concentration():
+    rd = parse_file("rxns.xml")
+    try:
+        rd.get_progress_rate([1, 2, -3, 4, 5, 6], 1000)
+        assert False
+    except ValueError as err:
+        assert "x2" in str(err)
+
+
+def test_progress_rate_batch():
+    rd = parse_file("rxns_reversible.xml")
+    concs = np.random.RandomState(0).uniform(0, 2, (5, len(rd.species)))
+    temps = np.array([900, 1500, 2000, 1500, 3000])
+    rates = rd.get_progress_rate_batch(concs, temps)
+    assert rates.shape == (5, len(rd))
+    for n in range(5):
+        assert np.allclose(rates[n], rd.get_progress_rate(concs[n], temps[n]))
+        assert np.allclose(rd.get_reaction_rate(rates)[n], rd.get_reaction_rate(rates[n]))
+    assert np.allclose(rd.get_progress_rate_batch(concs, 1500)[2], rd.get_progress_rate(concs[2], 1500))
+
+
+def test_progress_rate_batch_wrong_shape():
+    rd = parse_file("rxns.xml")
+    for concs, T in [([1, 2, 3, 4, 5, 6], 1000), (np.ones((3, 5)), 1000), (np.ones((3, 6)), [1000, 2000])]:
+        try:
+            rd.get_progress_rate_batch(concs, T)
+            assert False
+        except ValueError:
+            assert True
+
+
+def test_trusted_skips_validation():
+    rd = parse_file("rxns.xml")
+    concs = [1, 2, 3, 4, 5, 6]
+    checked = rd.get_progress_rate(concs, 1000)
+    rd.trusted = True
+    assert np.allclose(rd.get_progress_rate(concs, 1000), checked)
+    assert np.allclose(rd.get_progress_rate_batch([concs], 1000)[0], checked)
+    rd.get_progress_rate([1, 2, -3, 4, 5, 6], 1000)
+    rd.get_progress_rate_batch([[1, 2, -3, 4, 5, 6]], 1000)
+    rd.get_k(-1000)
+    # an explicit check still validates
+    for call in (lambda: rd.get_progress_rate([1, 2, -3, 4, 5, 6], 1000, check=True),
+                 lambda: rd.get_progress_rate_batch([[1, 2, -3, 4, 5, 6]], 1000, check=True),
+                 lambda: rd.get_k(-1000, check=True)):
+        try:
+            call()
+            assert False
+        except ValueError:
+            assert True
+
+
+def test_validated_at_compile():
+    rd = parse_file("rxns.xml")
+    rd.reactions[0].rate_coeff.A = -1.0
+    try:
+        rd.compile()
+        assert False
+    except ValueError as err:
+        assert "Negative Arrhenius prefactor" in str(err)
+
+
+def test_kb_matches_per_reaction():
+    from chemkin import thermochem
+    rd = parse_file("rxns_reversible_mixed.xml")
+    temps = np.array([1500.0, 3000.0])
+    kf = rd.get_k(temps)
+    kb = rd.get_kb(kf, rd.nu, temps)
+    assert kb.shape == (2, len(rd))
+    assert np.all(kb[:, ~rd.reversible] == 0)
+    for n, T in enumerate(temps):
+        tc = thermochem.ThermoChem(thermochem.ThermochemRXNSetWrapper(rd.get_nasa_coeff_matrix(T)), T)
+        for j in np.flatnonzero(rd.reversible):
+            assert np.isclose(kb[n, j], tc.backward_coeffs(rd.nu[:, j], kf[n, j]))
+        assert np.allclose(rd.get_kb(kf[n], rd.nu, T), kb[n])
+
+
+def test_nasa_coeff_matrix_vectorized():
+    rd = parse_file("rxns_reversible.xml")
+    temps = np.array([[500.0, 1000.0], [1000.1, 3000.0]])
+    matrix = rd.get_nasa_coeff_matrix(temps)
+    assert matrix.shape == (2, 2, len(rd.species), 7)
+    for t in temps.flat:
+        expected = np.array([rd.get_nasa_coeff(s, t) for s in rd.species])
+        assert np.allclose(rd.get_nasa_coeff_matrix(t), expected)
+    assert np.allclose(matrix[1, 1], rd.get_nasa_coeff_matrix(3000.0))
+
+
+def test_nasa_coeff_matrix_out_of_range_report():
+    rd = parse_file("rxns_reversible.xml")
+    try:
+        rd.get_nasa_coeff_matrix([1000.0, 100.0])
+        assert False
+    except NotImplementedError as err:
+        for s in rd.species:
+            assert s in str(err)
+        assert "T=100.0" in str(err)
+
+
+def test_jacobian_finite_difference():
+    rd = parse_file("rxns_reversible_mixed.xml")
+    concs = np.random.RandomState(1).uniform(0.5, 2, len(rd.species))
+    concs[0] = 0.0
+    T = 1500.0
+    d_concs, d_T = rd.get_jacobian(concs, T)
+
+    def rates(c, t):
+        return rd.get_reaction_rate(rd.get_progress_rate(c, t))
+
+    for k in range(len(rd.species)):
+        h = 1e-2
+        dc = np.zeros(len(rd.species))
+        dc[k] = h
+        fd = (rates(concs + dc, T) - rates(np.maximum(concs - dc, 0), T)) / (h + min(h, concs[k]))
+        assert np.allclose(d_concs[:, k], fd, rtol=1e-4, atol=1e-6 * np.abs(fd).max())
+    fd = (rates(concs, T + 1e-3) - rates(concs, T - 1e-3)) / 2e-3
+    assert np.allclose(d_T, fd, rtol=1e-4, atol=1e-6 * np.abs(fd).max())
+
+    batch_concs, batch_T = rd.get_jacobian(np.array([concs, concs]), [T, 2000.0])
+    assert np.allclose(batch_concs[0], d_concs) and np.allclose(batch_T[0], d_T)
+    assert np.allclose(batch_concs[1], rd.get_jacobian(concs, 2000.0)[0])
+
+
+def test_jacobian_underflowing_kf():
+    import os
+    import shutil
+    import tempfile
+    with open(get_example_data_file("rxns_reversible.xml")) as f:
+        xml = f.read()
+    # a huge activation energy makes kf of the first reversible reaction underflow to 0 below about 480 K
+    xml = xml.replace("<E>1.6599e+04</E>", "<E>3e6</E>", 1)
+    folder = tempfile.mkdtemp()
+    try:
+        file = os.path.join(folder, "rxns_underflow.xml")
+        with open(file, "w") as f:
+            f.write(xml)
+        rd = DataParser().parse_file(file, nasa)
+    finally:
+        shutil.rmtree(folder)
+    concs = np.arange(1.0, len(rd.species) + 1)
+
+    def rates(c, t):
+        return rd.get_reaction_rate(rd.get_progress_rate(c, t))
+
+    # strictly inside the NASA range (from 200 K) so that the central differences are defined
+    for T in [300.0, 400.0]:
+        assert rd.get_k(T)[0] == 0
+        d_concs, d_T = rd.get_jacobian(concs, T)
+        assert np.all(np.isfinite(d_concs)) and np.all(np.isfinite(d_T))
+        fd = (rates(concs, T + 1e-3) - rates(concs, T - 1e-3)) / 2e-3
+        assert np.allclose(d_T, fd, rtol=1e-3, atol=1e-6 * np.abs(fd).max())
+
+
+def test_thermo_grid():
+    from chemkin.thermochem import ThermoChem, ThermochemRXNSetWrapper
+    rd = parse_file("rxns_reversible.xml")
+    temps = np.array([[300.0, 1000.0], [1500.0, 3000.0]])
+    thermo = rd.get_thermo(temps)
+    assert thermo['Cp_over_R'].shape == (2, 2, len(rd.species)) and thermo['Kc'].shape == (2, 2, len(rd))
+    for T in temps.flat:
+        n = np.argwhere(temps == T)[0]
+        tc = ThermoChem(ThermochemRXNSetWrapper(rd.get_nasa_coeff_matrix(T, all_species=True)), T)
+        assert np.allclose(thermo['Cp_over_R'][tuple(n)], tc.Cp_over_R(T))
+        assert np.allclose(thermo['H_over_RT'][tuple(n)], tc.h_rt)
+        assert np.allclose(thermo['S_over_R'][tuple(n)], tc.s_rt)
+        assert np.allclose(thermo['G_over_RT'][tuple(n)], tc.h_rt - tc.s_rt)
+        kf = rd.get_k(T)
+        assert np.allclose(thermo['Kc'][tuple(n)], kf / rd.get_kb(kf, None, T))
+    try:
+        rd.get_thermo([1000.0, 10000.0])
+        assert False
+    except NotImplementedError:
+        assert True
+
+
+def test_rate_cache():
+    rd = parse_file("rxns_reversible.xml")
+    assert rd.rate_cache is None
+    concs = np.arange(1.0, len(rd.species) + 1)
+    expected = rd.get_progress_rate(concs, 1500)
+    rd.set_rate_cache(maxsize=2)
+    for n in range(5):
+        assert np.array_equal(rd.get_progress_rate(concs, 1500), expected)
+    stats = rd.rate_cache.stats()
+    assert stats['misses'] == 2 and stats['hits'] == 8 and stats['size'] == 2
+    # returned coefficients are copies
+    rd.get_k(1500)[:] = 0
+    assert np.array_equal(rd.get_progress_rate(concs, 1500), expected)
+    rd.get_progress_rate(concs, 2000)
+    assert rd.rate_cache.stats()['size'] == 2
+    # pickles keep an empty cache of the same size
+    copy = pickle.loads(pickle.dumps(rd))
+    assert len(copy.rate_cache) == 0 and copy.rate_cache.maxsize == 2
+    assert np.array_equal(copy.get_progress_rate(concs, 1500), expected)
+    rd.compile()
+    assert len(rd.rate_cache) == 0
+
+    rd.set_rate_cache(tolerance=1.0)
+    rd.get_progress_rate(concs, 1500.2)
+    assert np.array_equal(rd.get_progress_rate(concs, 1499.9), expected)
+    assert rd.rate_cache.stats()['misses'] == 2
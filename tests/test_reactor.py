@@ -0,0 +1,124 @@
+import os
+from os.path import join
+
+import numpy as np
+
+from chemkin.nasa import NASACoeffs
+from chemkin.parser import DataParser
+from chemkin.reactor import BatchReactor
+from chemkin.time_evo import TimeEvo
+from chemkin import thermochem
+
+nasa = NASACoeffs()
+
+# H O OH H2 H2O O2 HO2 H2O2
+H_ATOMS = np.array([1, 0, 1, 2, 2, 0, 1, 2])
+O_ATOMS = np.array([0, 1, 1, 0, 1, 2, 2, 2])
+INITIAL = np.array([1e-8, 0, 0, 2e-6, 0, 1e-6, 0, 0])
+
+
+def get_example_data_file(file):
+    return join("chemkin/example_data", file)
+
+
+def parse_file(file_name):
+    return DataParser().parse_file(get_example_data_file(file_name), nasa)
+
+
+def test_isothermal_conserves_atoms():
+    rd = parse_file("rxnset_long.xml")
+    result = BatchReactor(rd, rtol=1e-8).integrate(INITIAL, 1200, 1e-3)
+    assert np.allclose(result.temperature, 1200)
+    assert np.allclose(np.dot(result.concs, H_ATOMS), np.dot(INITIAL, H_ATOMS), rtol=1e-6)
+    assert np.allclose(np.dot(result.concs, O_ATOMS), np.dot(INITIAL, O_ATOMS), rtol=1e-6)
+    assert result.concs[-1, 5] < 1e-12  # O2 is consumed
+    assert result.stats['steps'] == len(result.time) - 1
+    assert result.stats['jacobian_evaluations'] > 0
+
+
+def test_adiabatic_constant_volume_conserves_energy():
+    rd = parse_file("rxnset_long.xml")
+    result = BatchReactor(rd, mode='volume', energy=True, rtol=1e-8).integrate(INITIAL, 1200, 1e-3)
+
+    def internal_energy(concs, T):
+        nasa_coeffs = rd.get_nasa_coeff_matrix(T, all_species=True)
+        tc = thermochem.ThermoChem(thermochem.ThermochemRXNSetWrapper(nasa_coeffs), T)
+        return np.dot(concs, tc.h_rt - 1) * T
+
+    assert result.temperature[-1] != result.temperature[0]
+    assert np.isclose(internal_energy(result.concs[0], result.temperature[0]),
+                      internal_energy(result.concs[-1], result.temperature[-1]), rtol=1e-5)
+
+
+def test_constant_pressure_ideal_gas():
+    rd = parse_file("rxnset_long.xml")
+    result = BatchReactor(rd, mode='pressure', energy=True).integrate(INITIAL, 1200, 1e-3)
+    # total concentration follows P / RT
+    total = result.concs.sum(axis=1)
+    assert np.allclose(total * result.temperature, total[0] * result.temperature[0], rtol=1e-4)
+
+
+def test_t_eval_and_save():
+    rd = parse_file("rxnset_long.xml")
+    t_eval = np.linspace(0, 1e-4, 21)
+    result = BatchReactor(rd).integrate(INITIAL, 1200, 1e-4, t_eval=t_eval)
+    assert np.array_equal(result.time, t_eval)
+    assert result.concs.shape == (21, len(rd.species))
+    try:
+        result.save("temp_reactor.h5", "Scenario1", parameters=[1.0, 1e5])
+        time_evo = TimeEvo("temp_reactor.h5")
+        assert time_evo.scenarios == ["Scenario1"]
+        truth = time_evo.file["Scenario1/truth"]
+        assert truth.shape == (21, len(rd.species) + 1)
+        assert np.allclose(truth[:, -1], 1200)
+        assert len(time_evo.file["Scenario1/ignition"]) == 2
+        time_evo.plot("Scenario1", 0.1, 0.1)
+        time_evo.file.close()
+    finally:
+        os.remove("temp_reactor.h5")
+
+
+def test_energy_requires_nasa():
+    rd = parse_file("rxns_unknownNASA.xml")
+    try:
+        BatchReactor(rd, energy=True)
+        assert False
+    except ValueError:
+        assert True
+
+
+def test_failed_trial_evaluation_rejects_step():
+    rd = parse_file("rxnset_long.xml")
+    expected = BatchReactor(rd, energy=True).integrate(INITIAL, 1200, 1e-4)
+    reactor = BatchReactor(rd, energy=True)
+    rhs, jacobian = reactor._rhs, reactor._jacobian
+    calls = {'rhs': 0, 'jacobian': 0}
+
+    # trial states of the Newton iterations can not be evaluated now and then
+    def failing_rhs(y):
+        calls['rhs'] += 1
+        if calls['rhs'] % 50 == 0:
+            raise NotImplementedError("NASA coefficient is not specified")
+        return rhs(y)
+
+    def failing_jacobian(y):
+        calls['jacobian'] += 1
+        if calls['jacobian'] == 3:
+            raise NotImplementedError("NASA coefficient is not specified")
+        return jacobian(y)
+
+    reactor._rhs, reactor._jacobian = failing_rhs, failing_jacobian
+    result = reactor.integrate(INITIAL, 1200, 1e-4)
+    assert result.stats['rejected_steps'] > expected.stats['rejected_steps']
+    assert np.allclose(result.temperature[-1], expected.temperature[-1], rtol=1e-4)
+    assert np.allclose(result.concs[-1], expected.concs[-1], rtol=1e-3, atol=1e-12)
+
+
+def test_leaving_nasa_range_is_reported():
+    rd = parse_file("rxnset_long.xml")
+    # the mixture cools below the 200 K lower bound of the NASA polynomials
+    try:
+        BatchReactor(rd, energy=True).integrate([1, 1, 0, 2, 0, 1, 0, 0], 1000, 1e-7)
+        assert False
+    except RuntimeError as err:
+        assert "Step size became too small" in str(err) and "valid range" in str(err)
@@ -0,0 +1,99 @@
+from os.path import join
+
+import numpy as np
+
+from chemkin.nasa import NASACoeffs
+from chemkin.parser import DataParser
+from chemkin.rate_coeff import Constant
+from chemkin.reaction import Reaction, ReactionData
+from chemkin.stoichiometry import DenseStoichiometry, SparseStoichiometry
+
+nasa = NASACoeffs()
+
+
+def get_example_data_file(file):
+    return join("chemkin/example_data", file)
+
+
+def parse_both(file_name):
+    return [DataParser().parse_file(get_example_data_file(file_name), nasa, stoichiometry=s)
+            for s in ('dense', 'sparse')]
+
+
+def test_sparse_matches_dense():
+    for file_name in ("rxns.xml", "rxnset_long.xml", "rxns_reversible_mixed.xml"):
+        dense, sparse = parse_both(file_name)
+        assert isinstance(dense.stoichiometry, DenseStoichiometry)
+        assert isinstance(sparse.stoichiometry, SparseStoichiometry)
+        assert np.array_equal(dense.nu, sparse.nu)
+        assert np.array_equal(dense.nu_react, sparse.nu_react)
+        assert np.array_equal(dense.gamma, sparse.gamma)
+        assert np.array_equal(dense.reversible_species, sparse.reversible_species)
+
+        concs = np.random.RandomState(0).uniform(0, 2, (4, len(dense.species)))
+        temps = np.array([1500.0, 2000.0, 2500.0, 3000.0])
+        rates = dense.get_progress_rate_batch(concs, temps)
+        assert np.allclose(sparse.get_progress_rate_batch(concs, temps), rates)
+        assert np.allclose(sparse.get_reaction_rate(rates), dense.get_reaction_rate(rates))
+        assert np.allclose(sparse.get_progress_rate(concs[0], 1500.0), dense.get_progress_rate(concs[0], 1500.0))
+        assert np.allclose(sparse.get_jacobian(concs[1], 2000.0)[0], dense.get_jacobian(concs[1], 2000.0)[0])
+
+
+def test_species_on_both_sides():
+    species = ['A', 'B', 'M']
+    reactions = [Reaction('r1', False, 'Elementary', {'A': 1, 'M': 1}, {'B': 1, 'M': 1}, Constant(2.0), 'A+M=]B+M'),
+                 Reaction('r2', False, 'Elementary', {}, {'A': 1}, Constant(1.0), '=]A')]
+    dense = ReactionData('test', species, reactions, nasa)
+    sparse = ReactionData('test', species, reactions, nasa, stoichiometry='sparse')
+    assert np.array_equal(sparse.nu, dense.nu)
+    assert sparse.stoichiometry.columns['nu'][0][-1] == 3  # M does not appear in nu
+    concs = np.array([1.0, 2.0, 3.0])
+    assert np.allclose(sparse.get_progress_rate(concs, 1000), [6.0, 1.0])
+    assert np.allclose(sparse.get_reaction_rate([6.0, 1.0]), dense.get_reaction_rate([6.0, 1.0]))
+
+
+def test_sparse_memory():
+    species = ['S{}'.format(i) for i in range(300)]
+    reactions = [Reaction('r{}'.format(j), False, 'Elementary', {species[j % 300]: 1, species[(j + 1) % 300]: 1},
+                          {species[(j + 2) % 300]: 2}, Constant(1.0), '') for j in range(600)]
+
+    class NoNASA:
+        def get_coeffs(self, species_name, temp_range):
+            raise KeyError(species_name)
+
+    dense = ReactionData('test', species, reactions, NoNASA())
+    sparse = ReactionData('test', species, reactions, NoNASA(), stoichiometry='sparse')
+    assert sparse.stoichiometry.nbytes * 20 < dense.stoichiometry.nbytes
+    concs = np.linspace(0, 1, 300)
+    assert np.allclose(sparse.get_reaction_rate(sparse.get_progress_rate(concs, 1000)),
+                       dense.get_reaction_rate(dense.get_progress_rate(concs, 1000)))
+
+
+def test_sparse_jacobian():
+    for file_name in ("rxns.xml", "rxnset_long.xml", "rxns_reversible.xml"):
+        dense, sparse = parse_both(file_name)
+        concs = np.random.RandomState(1).uniform(0, 2, (5, len(dense.species)))
+        # one and two zero concentrations in a state, and a zero state
+        concs[1, 0] = 0.0
+        concs[2, :2] = 0.0
+        concs[3] = 0.0
+        temps = [900.0, 1200.0, 1500.0, 2000.0, 2500.0]
+        for actual, expected in zip(sparse.get_jacobian(concs, temps), dense.get_jacobian(concs, temps)):
+            assert np.allclose(actual, expected)
+        # the sparse Jacobian does not build the dense stoichiometric matrices
+        assert sparse._dense == {}
+
+    species = ['A', 'B']
+    reactions = [Reaction('r1', False, 'Elementary', {'A': 2, 'B': 1}, {'B': 3}, Constant(2.0), '2A+B=]3B')]
+    dense = ReactionData('test', species, reactions, nasa)
+    sparse = ReactionData('test', species, reactions, nasa, stoichiometry='sparse')
+    for concs in ([0.0, 3.0], [2.0, 0.0], [0.0, 0.0], [1.5, 2.5]):
+        assert np.allclose(sparse.get_jacobian(concs, 1000)[0], dense.get_jacobian(concs, 1000)[0])
+
+
+def test_unknown_format():
+    try:
+        DataParser().parse_file(get_example_data_file("rxns.xml"), nasa, stoichiometry='csr')
+        assert False
+    except ValueError:
+        assert True
@@ -0,0 +1,254 @@
+from chemkin import webserver
+from chemkin.cache import ContentCache
+from chemkin.webserver import PoolBusyError, RenderPool, SessionStore, WebServer
+import chemkin.parser
+from chemkin.nasa import NASACoeffs
+from chemkin.parser import DataParser
+from os.path import join
+import json
+import time
+import numpy as np
+
+
+def get_example_data_file(file):
+    return join("chemkin/example_data", file)
+
+
+def test_session_store_limits():
+    store = SessionStore(maxsize=2, ttl=None, max_bytes=100)
+    store.put('a', 'A', nbytes=40)
+    store.put('b', 'B', nbytes=40)
+    assert store.get('a') == 'A'
+    store.put('c', 'C', nbytes=10)
+    # 'b' is the least recently used
+    assert 'b' not in store and store.get('a') == 'A' and store.get('c') == 'C'
+    store.put('d', 'D', nbytes=55)
+    assert 'a' not in store and store.nbytes == 65
+    store.put('e', 'E', nbytes=101)
+    assert 'e' not in store and len(store) == 2
+    store.put('c', 'C', nbytes=20)
+    assert store.nbytes == 75
+    stats = store.stats()
+    assert stats['hits'] == 3 and stats['misses'] == 0 and stats['nbytes'] == 75
+    store.clear()
+    assert len(store) == 0 and store.nbytes == 0
+
+
+def test_session_store_ttl():
+    now = [0.0]
+    store = SessionStore(ttl=10, clock=lambda: now[0])
+    store.put('a', 1, nbytes=1)
+    store.put('b', 2, nbytes=1)
+    now[0] = 8.0
+    assert store.get('a') == 1
+    now[0] = 15.0
+    # 'a' was used at 8, 'b' last at 0
+    assert store.get('b') is None and store.get('a') == 1
+    assert store.nbytes == 1
+
+
+def test_default_caches_in_memory():
+    webserver.configure_cache()
+    WebServer(8080)
+    assert webserver.PARSED_CACHE_FOLDER is None and webserver.RESULT_CACHE.directory is None
+
+
+def test_rates_from_session_store():
+    client = WebServer(8080).app.test_client()
+    mechanism_key = chemkin.parser.DataParser.mechanism_key
+    hashed = []
+
+    def counted_key(self, *args, **kwargs):
+        hashed.append(args[0])
+        return mechanism_key(self, *args, **kwargs)
+
+    chemkin.parser.DataParser.mechanism_key = counted_key
+    try:
+        with open(get_example_data_file('rxns_reversible.xml')) as f:
+            response = client.post('/session', data=json.dumps({'data': f.read()}), content_type='application/json')
+    finally:
+        chemkin.parser.DataParser.mechanism_key = mechanism_key
+    session = json.loads(response.data.decode())
+    assert session['status'] == 'success' and session['id'] in webserver.SESSIONS
+    # the file is hashed once, and the session is sized from its arrays instead of a pickle
+    assert len(hashed) == 1
+    reaction_data = webserver.load_session(session['id'])
+    assert webserver.SESSIONS.stats()['nbytes'] >= reaction_data.nbytes > 3 * reaction_data.nu.nbytes
+
+    original = chemkin.parser.DataParser.parse_file
+
+    def fail(*args, **kwargs):
+        raise AssertionError("parsed again")
+
+    chemkin.parser.DataParser.parse_file = fail
+    try:
+        state = {sp: 1.0 for sp in session['species']}
+        state['_temp'] = 1500
+        response = client.post('/rates/' + session['id'], data=json.dumps(state), content_type='application/json')
+        rates = json.loads(response.data.decode())
+        assert rates['status'] == 'success' and len(rates['ks']) == len(session['equations'])
+    finally:
+        chemkin.parser.DataParser.parse_file = original
+        webserver.SESSIONS.discard(session['id'])
+
+
+def test_batch_rates():
+    client = WebServer(8080).app.test_client()
+    with open(get_example_data_file('rxns_reversible.xml')) as f:
+        response = client.post('/session', data=json.dumps({'data': f.read()}), content_type='application/json')
+    session = json.loads(response.data.decode())
+    sid = session['id']
+    num_species = len(session['species'])
+    concs = np.arange(1.0, 3 * num_species + 1).reshape(3, num_species)
+    temps = np.array([900.0, 1500.0, 1500.0])
+    reaction_data = webserver.load_session(sid)
+    assert reaction_data.rate_cache.maxsize == webserver.RATE_CACHE_SIZE
+    try:
+        response = client.post('/batchrates/' + sid, data=json.dumps({'concs': concs.tolist(), 'temps': temps.tolist()}),
+                               content_type='application/json')
+        rates = json.loads(response.data.decode())
+        assert rates['status'] == 'success'
+        for i in range(3):
+            progress_rates = reaction_data.get_progress_rate(concs[i], temps[i])
+            assert np.allclose(rates['progress_rates'][i], progress_rates)
+            assert np.allclose(rates['reaction_rates'][i], reaction_data.get_reaction_rate(progress_rates))
+            assert np.allclose(rates['ks'][i], reaction_data.get_k(temps[i]))
+
+        payload = np.column_stack([concs, temps]).astype('<f8').tobytes()
+        response = client.post('/batchrates/' + sid, data=payload, content_type='application/octet-stream')
+        binary_rates = json.loads(response.data.decode())
+        assert np.allclose(binary_rates['progress_rates'], rates['progress_rates'])
+
+        response = client.post('/batchrates/' + sid, data=payload[:-8], content_type='application/octet-stream')
+        assert json.loads(response.data.decode())['status'] == 'failed'
+        response = client.post('/batchrates/' + sid, data=json.dumps({'concs': concs.tolist(), 'temps': [1000, 2000]}),
+                               content_type='application/json')
+        assert json.loads(response.data.decode())['status'] == 'failed'
+
+        original = webserver.MAX_BATCH_STATES
+        webserver.MAX_BATCH_STATES = 2
+        try:
+            response = client.post('/batchrates/' + sid, data=payload, content_type='application/octet-stream')
+            assert response.status_code == 413
+            response = client.post('/batchrates/' + sid, data=json.dumps({'concs': concs.tolist(), 'temps': 1500}),
+                                   content_type='application/json')
+            assert json.loads(response.data.decode())['status'] == 'failed'
+        finally:
+            webserver.MAX_BATCH_STATES = original
+
+        # larger mechanisms allow fewer states, and the states are evaluated in chunks
+        num_elements = num_species * len(reaction_data)
+        original = webserver.MAX_BATCH_ELEMENTS, webserver.BATCH_CHUNK_ELEMENTS
+        webserver.MAX_BATCH_ELEMENTS, webserver.BATCH_CHUNK_ELEMENTS = 2 * num_elements, num_elements
+        try:
+            response = client.post('/batchrates/' + sid, data=payload, content_type='application/octet-stream')
+            assert response.status_code == 413
+            response = client.post('/batchrates/' + sid, data=json.dumps({'concs': concs.tolist(), 'temps': 1500}),
+                                   content_type='application/json')
+            assert response.status_code == 413
+            response = client.post('/batchrates/' + sid, data=payload[:2 * 8 * (num_species + 1)],
+                                   content_type='application/octet-stream')
+            assert np.allclose(json.loads(response.data.decode())['progress_rates'], rates['progress_rates'][:2])
+        finally:
+            webserver.MAX_BATCH_ELEMENTS, webserver.BATCH_CHUNK_ELEMENTS = original
+        response = client.post('/batchrates/' + sid, data=payload, content_type='application/octet-stream',
+                               environ_overrides={'CONTENT_LENGTH': ''})
+        assert response.status_code == 411
+        response = client.post('/batchrates/' + sid, data=payload, content_type='application/octet-stream',
+                               headers={'Transfer-Encoding': 'chunked'})
+        assert response.status_code == 411
+    finally:
+        webserver.SESSIONS.discard(sid)
+
+
+def test_render_pool_backpressure():
+    pool = RenderPool(processes=1, queue_limit=1, retry_after=3)
+    try:
+        running = pool.submit(time.sleep, 0.5)
+        queued = pool.submit(max, 1, 2)
+        try:
+            pool.submit(max, 3, 4)
+            assert False
+        except PoolBusyError:
+            assert True
+        assert running.result() is None and queued.result() == 2
+        time.sleep(0.1)
+        assert pool.run(max, 5, 6) == 6
+        body, status, headers = webserver.busy_response(pool)
+        assert status == 503 and headers['Retry-After'] == '3' and body['status'] == 'failed'
+    finally:
+        pool.shutdown()
+
+
+def test_render_pool_start():
+    pool = RenderPool(processes=1)
+    try:
+        pool.start()
+        assert pool._executor is not None and pool.run(max, 1, 2) == 2
+    finally:
+        pool.shutdown()
+
+
+def test_render_rate_plots_keeps_mechanism():
+    filename = get_example_data_file('rxns.xml')
+    key = DataParser().mechanism_key(filename, NASACoeffs())
+    webserver._WORKER_MECHANISMS.clear()
+    try:
+        plots = webserver.render_rate_plots(filename, key, None, [1.0] * 6, 1000, 2000, 1500, 0.1, 0.1)
+        assert len(plots) == 2 and webserver._WORKER_MECHANISMS.get(key) is not None
+    finally:
+        webserver._WORKER_MECHANISMS.clear()
+
+
+def test_plots_in_render_pool():
+    client = WebServer(8080, render_processes=1, render_queue_limit=0).app.test_client()
+    result_cache = webserver.RESULT_CACHE
+    webserver.RESULT_CACHE = ContentCache()
+    with open(get_example_data_file('rxns.xml')) as f:
+        response = client.post('/session', data=json.dumps({'data': f.read()}), content_type='application/json')
+    session = json.loads(response.data.decode())
+    state = {sp: 1.0 for sp in session['species']}
+    state['_temp'] = 1500
+    try:
+        response = client.post('/plots/{}/1000/2000'.format(session['id']), data=json.dumps(state),
+                               content_type='application/json')
+        plots = json.loads(response.data.decode())
+        assert plots['status'] == 'success' and len(plots['progress_rates']) > 0
+
+        # the only worker is busy and no job may wait, but cached plots are still served
+        webserver.RENDER_POOL.submit(time.sleep, 1.0)
+        response = client.post('/plots/{}/1000/2000'.format(session['id']), data=json.dumps(state),
+                               content_type='application/json')
+        assert json.loads(response.data.decode()) == plots
+        response = client.post('/plots/{}/1000/1900'.format(session['id']), data=json.dumps(state),
+                               content_type='application/json')
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    finally:
+        webserver.SESSIONS.discard(session['id'])
+        webserver.RENDER_POOL.shutdown()
+        webserver.RENDER_POOL = RenderPool()
+        webserver.RESULT_CACHE = result_cache
+
+
+def test_results_shared_across_sessions():
+    client = WebServer(8080).app.test_client()
+    result_cache = webserver.RESULT_CACHE
+    webserver.RESULT_CACHE = ContentCache()
+    sids = []
+    try:
+        with open(get_example_data_file('rxns.xml')) as f:
+            data = json.dumps({'data': f.read()})
+        for _ in range(2):
+            response = client.post('/session', data=data, content_type='application/json')
+            sids.append(json.loads(response.data.decode())['id'])
+        state = {sp: 2.0 for sp in json.loads(response.data.decode())['species']}
+        state['_temp'] = 1200
+        results = [json.loads(client.post('/rates/' + sid, data=json.dumps(state),
+                                          content_type='application/json').data.decode()) for sid in sids]
+        assert results[0] == results[1] and results[0]['status'] == 'success'
+        stats = json.loads(client.get('/stats').data.decode())['results']
+        assert stats['misses'] == 1 and stats['memory_hits'] == 1
+    finally:
+        for sid in sids:
+            webserver.SESSIONS.discard(sid)
+        webserver.RESULT_CACHE = result_cache